@@ -0,0 +1,66 @@
+"""
+Batch benchmark: borrow_many/return_many vs one borrow_book/return_book call per item
+Usage: python benchmarks/batch_benchmark.py [baskets] [min_items] [max_items]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+
+def build(baskets, max_items):
+    library = Library("Benchmark", "n/a")
+    genres = list(BookGenre)
+    library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 500}", genres[i % len(genres)],
+                           1900 + i % 120, 1000) for i in range(max_items * 20))
+    # Premium members can take up to 10 books, so raise the limit for the big baskets
+    member_ids = []
+    for i in range(baskets):
+        member = Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}", "Premium")
+        member.max_books = max_items
+        member_ids.append(library.register_member(member))
+    return library, member_ids
+
+
+def main():
+    baskets = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    min_items = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    max_items = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+    rng = random.Random(11)
+
+    library, member_ids = build(baskets, max_items)
+    isbns = list(library.books)
+    plan = [(member_id, rng.sample(isbns, rng.randint(min_items, max_items))) for member_id in member_ids]
+    items = sum(len(basket) for _, basket in plan)
+
+    start = time.perf_counter()
+    for member_id, basket in plan:
+        for isbn in basket:
+            library.borrow_book(member_id, isbn)
+    for member_id, basket in plan:
+        for isbn in basket:
+            library.return_book(member_id, isbn)
+    single = time.perf_counter() - start
+
+    library, member_ids = build(baskets, max_items)
+    plan = [(member_id, basket) for member_id, (_, basket) in zip(member_ids, plan)]
+    start = time.perf_counter()
+    for member_id, basket in plan:
+        library.borrow_many(member_id, basket)
+    for member_id, basket in plan:
+        library.return_many(member_id, basket)
+    batched = time.perf_counter() - start
+    assert library.get_library_stats(verify=True)["borrowed_books"] == 0
+
+    print(f"{baskets:,} baskets, {items:,} items borrowed and returned")
+    print(f"per item:  {2 * items / single:>12,.0f} items/s")
+    print(f"batched:   {2 * items / batched:>12,.0f} items/s ({single / batched:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Concurrency stress test and thread-scaling benchmark for ConcurrentLibrary
+Many threads hammer a handful of hot titles with borrows, basket borrows,
+returns and fine payments. Then every book and member is checked: no copy
+oversold, no loan lost, and running totals equal to a full recompute. The plain
+Library is put through the same run for comparison.
+Usage: python benchmarks/concurrency_benchmark.py [threads] [operations_per_thread]
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_concurrent import ConcurrentLibrary  # noqa: E402
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+HOT_TITLES = 5
+HOT_COPIES = 3
+COLD_TITLES = 2000
+MEMBERS_PER_THREAD = 4
+
+
+def build(library_class, threads):
+    library = library_class("Benchmark", "n/a")
+    genres = list(BookGenre)
+    library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 100}", genres[i % len(genres)],
+                           1900 + i % 120, HOT_COPIES if i < HOT_TITLES else 2)
+                      for i in range(HOT_TITLES + COLD_TITLES))
+    return library
+
+
+def register(library, thread, count, ids):
+    # Emails and phones must be unique library-wide, so each registrar thread gets its own
+    for i in range(count):
+        ids.append(library.register_member(Member(f"Member {thread}-{i}", f"t{thread}-m{i}@email.com",
+                                                  f"555-{thread:03d}-{i:04d}", "Premium")))
+
+
+def worker(library, member_ids, operations, seed, errors):
+    """Each thread owns its members, so a member never holds two loans of one title"""
+    rng = random.Random(seed)
+    isbns = list(library.books)
+    hot = isbns[:HOT_TITLES]
+    late = datetime.now() + timedelta(days=45)
+    try:
+        for _ in range(operations):
+            member_id = rng.choice(member_ids)
+            member = library.members[member_id]
+            roll = rng.random()
+            if member.fines:
+                library.pay_fine(member_id, member.fines)
+            elif roll < 0.1:
+                basket = [isbn for isbn in rng.sample(hot, 2) + rng.sample(isbns, 2)
+                          if isbn not in member.borrowed_books]
+                library.borrow_many(member_id, list(dict.fromkeys(basket)), atomic=roll < 0.05)
+            elif roll < 0.55:
+                isbn = rng.choice(hot) if roll < 0.45 else rng.choice(isbns)
+                if isbn in member.borrowed_books:
+                    library.return_book(member_id, isbn, late if roll < 0.15 else None)
+                else:
+                    library.borrow_book(member_id, isbn)
+            elif member.borrowed_books:
+                library.return_book(member_id, next(iter(member.borrowed_books)))
+    except Exception as exc:  # An unsafe library can corrupt its own state mid-operation
+        errors.append(exc)
+
+
+def check(library, registered):
+    """List of inconsistencies found in the library after a run"""
+    problems = []
+    loans = {}
+    for member in library.members.values():
+        for isbn in member.borrowed_books:
+            loans[isbn] = loans.get(isbn, 0) + 1
+    for book in library.books.values():
+        out = book.total_copies - book.available_copies
+        if book.available_copies < 0:
+            problems.append(f"{book.isbn}: oversold, {book.available_copies} available")
+        if out != len(book.borrowed_by) or out != loans.get(book.isbn, 0):
+            problems.append(f"{book.isbn}: {out} copies out, {len(book.borrowed_by)} borrowers, "
+                            f"{loans.get(book.isbn, 0)} member loans")
+    if len(set(registered)) != len(registered):
+        problems.append(f"{len(registered) - len(set(registered))} duplicate member IDs")
+    try:
+        library.get_library_stats(verify=True)
+    except RuntimeError as exc:
+        problems.append(str(exc))
+    return problems
+
+
+def run(library_class, threads, operations):
+    library = build(library_class, threads)
+    # Each worker registers its own members concurrently, which exercises the ID allocator
+    groups = [[] for _ in range(threads)]
+    registrars = [threading.Thread(target=register, args=(library, thread, MEMBERS_PER_THREAD, group))
+                  for thread, group in enumerate(groups)]
+    for thread in registrars:
+        thread.start()
+    for thread in registrars:
+        thread.join()
+    registered = [member_id for group in groups for member_id in group]
+
+    errors = []
+    workers = [threading.Thread(target=worker, args=(library, group, operations, seed, errors))
+               for seed, group in enumerate(groups)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return library, registered, errors, threads * operations / elapsed
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    # Switch threads every microsecond instead of every 5ms to make races likely
+    default_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    print(f"Stress: {threads} threads x {operations:,} operations, {HOT_TITLES} hot titles "
+          f"with {HOT_COPIES} copies each")
+    for library_class in (Library, ConcurrentLibrary):
+        Member.member_id_counter = 1000
+        library, registered, errors, _ = run(library_class, threads, operations)
+        problems = check(library, registered)
+        print(f"  {library_class.__name__:<18} {len(problems):>5} inconsistencies, {len(errors):>3} crashed threads")
+        for problem in problems[:3]:
+            print(f"    {problem}")
+        if library_class is ConcurrentLibrary:
+            assert not problems and not errors, "ConcurrentLibrary lost consistency"
+    sys.setswitchinterval(default_interval)
+
+    # Same total work at every thread count
+    total = threads * operations // 4
+    print(f"\nThroughput, {total:,} operations (default switch interval)")
+    _, _, _, baseline = run(Library, 1, total)
+    print(f"  Library, 1 thread:            {baseline:>10,.0f} ops/s")
+    for count in (1, 2, 4, 8, 16, 32):
+        library, registered, errors, rate = run(ConcurrentLibrary, count, total // count)
+        assert not errors and not check(library, registered)
+        print(f"  ConcurrentLibrary, {count:>2} threads: {rate:>10,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Fines benchmark: accrued fines on every open loan, per-member loop vs FineEngine
+The loop is what a nightly job had to do before: visit every member and call
+fine_for on each of their borrowed_books. FineEngine reads the LoanTable
+columns instead, once with NumPy and once with its pure-Python pass. All
+three must agree.
+Usage: python benchmarks/fines_benchmark.py [members] [loans per member]
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+try:
+    import numpy  # noqa: F401  Imported before the repository is on sys.path: its numbers.py shadows the stdlib one
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_fines import FineEngine  # noqa: E402
+from library_system import Book, BookGenre, Library, Member, SimulatedClock  # noqa: E402
+
+
+def per_member_loop(library, as_of):
+    by_member = {}
+    for member in library.members.values():
+        for borrow_date in member.borrowed_books.values():
+            fine = member.fine_for((as_of - borrow_date).days)
+            if fine:
+                by_member[member.member_id] = by_member.get(member.member_id, 0.0) + fine
+    return by_member
+
+
+def timed(label, action, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = action()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<32} {best * 1e3:9.1f} ms")
+    return result
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    loans = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(25)
+    clock = SimulatedClock(datetime(2024, 1, 1))
+    library = Library("Benchmark", "n/a", clock=clock)
+    titles = 20000
+    library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 500}", BookGenre.FICTION, 2000,
+                           members * loans // titles + 10) for i in range(titles))
+    member_ids = [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}",
+                                                 ("Regular", "Premium", "Student")[i % 3]))
+                  for i in range(members)]
+    # Loans spread over 60 days, so about half of them are overdue at the end
+    for day in range(60):
+        now = clock.now() + timedelta(days=day)
+        for member_id in rng.sample(member_ids, len(member_ids) * loans // 60):
+            library.borrow_book(member_id, f"978-{rng.randrange(titles):010d}", now)
+    as_of = clock.now() + timedelta(days=60)
+
+    print(f"{members:,} members, {len(library.loan_table):,} open loans")
+    expected = timed("per-member loop (before)", lambda: per_member_loop(library, as_of))
+    python = timed("FineEngine, pure Python", lambda: FineEngine(library, use_numpy=False).accrue(as_of))
+    assert python.by_member == expected
+    engine = FineEngine(library)
+    if engine.use_numpy:
+        vectorized = timed("FineEngine, NumPy", lambda: engine.accrue(as_of))
+        assert vectorized == python
+    else:
+        print("  NumPy not installed; skipped the vectorized pass")
+    detailed = timed("FineEngine, with details=True", lambda: engine.accrue(as_of, details=True))
+    print(f"  {len(detailed.overdue):,} overdue loans, ${python.total:,.2f} accrued, "
+          f"{len(python.over_limit):,} members at $10 or more")
+
+
+if __name__ == "__main__":
+    main()
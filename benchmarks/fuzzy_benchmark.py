@@ -0,0 +1,81 @@
+"""
+Fuzzy search benchmark: Library.search_fuzzy latency on a large synthetic catalog
+Titles and author names are built from a pseudo-word vocabulary with a skewed
+word frequency. Each query is a word or two from a random title with one or
+two typos (dropped, swapped or substituted letters).
+Usage: python benchmarks/fuzzy_benchmark.py [titles] [queries]
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import Book, BookGenre, Library  # noqa: E402
+
+SYLLABLES = [c + v for c in "bcdfghklmnprstvwz" for v in "aeiou"] + ["th", "ch", "sh", "st", "er", "an", "or"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.choice((1, 2, 2, 3, 3, 3, 4, 5)))))
+    return list(words)
+
+
+def typo(word, rng):
+    position = rng.randrange(len(word))
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:position] + word[position + 1:]
+    if kind == 1 and position + 1 < len(word):
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+
+
+def main():
+    titles = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(15)
+    words = vocabulary(60000, rng)
+    surnames = vocabulary(20000, rng)
+    genres = list(BookGenre)
+
+    def word():
+        # Skewed toward the front of the vocabulary so a few words are very common
+        return words[min(int(rng.paretovariate(0.6)) - 1, len(words) - 1)] if rng.random() < 0.3 \
+            else rng.choice(words)
+
+    library = Library("Benchmark", "n/a")
+    start = time.perf_counter()
+    library.add_books(Book(f"978-{i:010d}", " ".join(word() for _ in range(rng.randint(1, 5))),
+                           f"{rng.choice(surnames)} {rng.choice(surnames)}", genres[i % len(genres)],
+                           1900 + i % 120, 1) for i in range(titles))
+    library.search_fuzzy("warm up")  # Builds the deferred indexes
+    print(f"{titles:,} titles loaded and indexed in {time.perf_counter() - start:.1f}s "
+          f"({len(library.title_index.words):,} title words)")
+
+    books = list(library.books.values())
+    latencies = []
+    hits = 0
+    for _ in range(queries):
+        book = rng.choice(books)
+        source = book.title.split() if rng.random() < 0.7 else book.author.split()
+        picked = rng.sample(source, min(len(source), rng.choice((1, 2))))
+        query = " ".join(typo(w, rng) if len(w) >= 4 else w for w in picked)
+        start = time.perf_counter()
+        results = library.search_fuzzy(query, 10)
+        latencies.append(time.perf_counter() - start)
+        hits += book in results
+
+    latencies.sort()
+    print(f"{queries:,} typo queries: p50 {latencies[len(latencies) // 2] * 1e3:.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms  max {latencies[-1] * 1e3:.2f} ms")
+    print(f"  source book in the top 10 for {hits / queries:.0%} of queries")
+
+
+if __name__ == "__main__":
+    main()
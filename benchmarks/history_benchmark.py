@@ -0,0 +1,99 @@
+"""
+History benchmark: memory of Member.borrowing_history as dicts vs packed records
+Builds the same returned-loan history both ways for a set of members, measures
+it with tracemalloc, then times reading one member's history back, paging old
+entries out with Library.archive_history and reading them back from disk.
+Usage: python benchmarks/history_benchmark.py [members] [entries_per_member]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import BorrowingHistory, Library, Member  # noqa: E402
+
+
+def loans(members, entries, rng):
+    """(member number, isbn, title, borrow_date, return_date) over roughly ten years"""
+    start = datetime(2015, 1, 1)
+    for member in range(members):
+        moment = start + timedelta(days=rng.randrange(365))
+        for _ in range(entries):
+            moment += timedelta(days=rng.randrange(1, 60), hours=rng.randrange(24))
+            book = rng.randrange(200000)
+            yield member, f"978-{book:010d}", sys.intern(f"Title {book}"), moment, moment + timedelta(days=rng.randrange(40))
+
+
+def measure(build):
+    tracemalloc.start()
+    histories = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return histories, size
+
+
+def as_dicts(members, entries):
+    histories = [[] for _ in range(members)]
+    for member, isbn, title, borrowed, returned in loans(members, entries, random.Random(19)):
+        days = (returned - borrowed).days
+        histories[member].append({"isbn": isbn, "book": title, "borrow_date": borrowed, "return_date": returned,
+                                  "days": days, "fine": max(days - 14, 0) * 0.5})
+    return histories
+
+
+def as_records(members, entries):
+    histories = [BorrowingHistory() for _ in range(members)]
+    for member, isbn, title, borrowed, returned in loans(members, entries, random.Random(19)):
+        days = (returned - borrowed).days
+        histories[member].add(isbn, title, borrowed, returned, days, max(days - 14, 0) * 0.5)
+    return histories
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    entries = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    total = members * entries
+    # The title strings are shared by both layouts; measure them once up front so neither pays for them
+    list(loans(members, entries, random.Random(19)))
+
+    _, dict_size = measure(lambda: as_dicts(members, entries))
+    histories, record_size = measure(lambda: as_records(members, entries))
+    print(f"{members:,} members x {entries} returned loans ({total:,} entries)")
+    print(f"  list of dicts:      {dict_size / 1e6:8.1f} MB  {dict_size / total:6.1f} bytes/entry")
+    print(f"  BorrowingHistory:   {record_size / 1e6:8.1f} MB  {record_size / total:6.1f} bytes/entry "
+          f"(book table included)")
+
+    library = Library("Benchmark", "n/a")
+    for number, history in enumerate(histories):
+        member = Member(f"Member {number}", f"m{number}@email.com", f"555-{number:07d}")
+        member.borrowing_history = history
+        library.store_member(member)
+    roster = list(library.members.values())
+    sample = random.Random(1).sample(roster, min(1000, len(roster)))
+
+    start = time.perf_counter()
+    for member in sample:
+        list(member.borrowing_history)
+    print(f"  read one member's history (in memory):  {(time.perf_counter() - start) / len(sample) * 1e6:8.1f} us")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        moved = library.archive_history(directory, datetime(2018, 1, 1))
+        print(f"  archive_history before 2018: {moved:,} entries paged out in {time.perf_counter() - start:.2f}s")
+        remaining = sum(len(member.borrowing_history.records) for member in library.members.values())
+        print(f"  packed records still in memory: {remaining / 1e6:.1f} MB")
+        start = time.perf_counter()
+        for member in sample:
+            list(member.borrowing_history)
+        print(f"  read one member's history (archive + memory): "
+              f"{(time.perf_counter() - start) / len(sample) * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
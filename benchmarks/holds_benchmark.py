@@ -0,0 +1,65 @@
+"""
+Holds benchmark: hold queue operations against the length of the queue
+One title with a single copy gets queues of growing length. For each length,
+place_hold, hold_position (of the last holder), the return that hands the
+copy to the next holder, and cancel_hold from the middle of the queue are
+timed per call. All but cancel should stay flat as the queue grows; a
+cancel renumbers the holds behind it.
+Usage: python benchmarks/holds_benchmark.py [longest queue]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import Book, BookGenre, Library, Member, SimulatedClock  # noqa: E402
+
+
+def per_call(calls, action):
+    start = time.perf_counter()
+    for args in calls:
+        action(*args)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def main():
+    longest = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{'holders':>9} {'place_hold':>11} {'position':>9} {'hand-off':>9} {'cancel':>9}  (us per call)")
+    length = 1000
+    while length <= longest:
+        clock = SimulatedClock(datetime(2024, 1, 1))
+        library = Library("Benchmark", "n/a", clock=clock)
+        isbn = "978-0000000001"
+        library.add_book(Book(isbn, "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 1))
+        member_ids = [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}",
+                                                     ("Regular", "Premium", "Student")[i % 3]))
+                      for i in range(length + 1)]
+        reader = member_ids.pop()
+        library.borrow_book(reader, isbn)
+
+        place = per_call([(member_id, isbn) for member_id in member_ids], library.place_hold)
+        last = member_ids[-1]
+        position = per_call([(last, isbn)] * 10000, library.hold_position)
+
+        # Each return hands the copy to the head of the queue, who then gives it back for the next one
+        handoffs = min(1000, length // 4)
+        holder = reader
+        start = time.perf_counter()
+        for _ in range(handoffs):
+            clock.advance(timedelta(minutes=1))
+            library.return_book(holder, isbn)
+            holder = next(iter(library.books[isbn].borrowed_by))
+        handoff = (time.perf_counter() - start) / handoffs * 1e6
+
+        queue = library.holds[isbn]
+        middle = [member_id for member_id, _ in queue.members()[len(queue) // 2:][:100]]
+        cancel = per_call([(member_id, isbn) for member_id in middle], library.cancel_hold)
+        print(f"{length:>9,} {place:>11.2f} {position:>9.2f} {handoff:>9.2f} {cancel:>9.2f}")
+        length *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Library benchmark suite: ops/sec and latency percentiles for the core Library API
+Generates a reproducible synthetic library (same seed, same books, members and
+requests) with Zipf-skewed title popularity, then times add_book,
+register_member, borrow_book, return_book, every finder and get_library_stats
+one call at a time. Read-only operations keep the best of --repeat rounds;
+the mutating ones run once. Results are written to JSON. With --compare, a
+stored baseline is loaded and every operation whose ops/sec and p50 latency
+both got worse by more than --threshold is flagged as a regression (exit
+status 1).
+Usage: python benchmarks/library_benchmark.py [--books 100000] [--members 10000] [--ops 20000]
+       [--skew 1.0] [--seed 21] [--repeat 3] [--output results.json] [--compare baseline.json]
+       [--threshold 0.25]
+Sizes from 10k to 5M books and 1k to 1M members are supported; heavy finders
+stop early once they have used --budget seconds.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+MEMBERSHIP_TYPES = ["Regular"] * 6 + ["Student"] * 3 + ["Premium"]
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(latencies, successes=None):
+    latencies.sort()
+    total = sum(latencies)
+    result = {"count": len(latencies),
+              "ops_per_sec": len(latencies) / total if total else 0.0,
+              "p50_us": percentile(latencies, 0.50) * 1e6,
+              "p90_us": percentile(latencies, 0.90) * 1e6,
+              "p99_us": percentile(latencies, 0.99) * 1e6,
+              "max_us": latencies[-1] * 1e6}
+    if successes is not None:
+        result["success_rate"] = successes / len(latencies)
+    return result
+
+
+def timed_calls(arguments, function, budget):
+    """Call function(*args) for each args, one at a time; stops early after budget seconds"""
+    latencies = []
+    clock = time.perf_counter
+    deadline = clock() + budget
+    for args in arguments:
+        start = clock()
+        function(*args)
+        finished = clock()
+        latencies.append(finished - start)
+        if finished > deadline:
+            break
+    return latencies
+
+
+def best_of(rounds, arguments, function, budget):
+    """Summary of the fastest of several rounds (by p50), which filters out noisy neighbours"""
+    return min((summarize(timed_calls(arguments, function, budget / rounds)) for _ in range(rounds)),
+               key=lambda result: result["p50_us"])
+
+
+class SyntheticLibrary:
+    """Seeded generator of the catalog, roster and request streams"""
+
+    def __init__(self, books, members, borrows, skew, seed):
+        self.rng = random.Random(seed)
+        self.books = books
+        self.members = members
+        self.borrows = borrows
+        self.words = sorted({"".join(self.rng.choice("bcdfghklmnprstvz") + self.rng.choice("aeiou")
+                                     for _ in range(self.rng.randint(2, 4))) for _ in range(6000)})
+        self.authors = [f"{self.rng.choice(self.words).title()} {self.rng.choice(self.words).title()}"
+                        for _ in range(max(books // 20, 1))]
+        self.popularity = list(accumulate(1 / rank ** skew for rank in range(1, books + 1)))
+        self.isbns = [f"978-{number:010d}" for number in range(books)]
+
+    def catalog(self):
+        genres = list(BookGenre)
+        rng = self.rng
+        # Popular titles get extra copies for the borrows aimed at them, so borrow_book mostly measures loans
+        demand = self.borrows / self.popularity[-1]
+        previous = 0.0
+        for isbn, cumulative in zip(self.isbns, self.popularity):
+            title = " ".join(rng.choice(self.words) for _ in range(rng.randint(1, 4))).title()
+            yield Book(isbn, title, rng.choice(self.authors), rng.choice(genres), rng.randint(1900, 2024),
+                       rng.randint(1, 5) + int(demand * (cumulative - previous)))
+            previous = cumulative
+
+    def roster(self):
+        for number in range(self.members):
+            first, last = self.rng.choice(self.words).title(), self.rng.choice(self.words).title()
+            yield Member(f"{first} {last}", f"{first}.{last}.{number}@example.com".lower(),
+                         f"555-{number:07d}", self.rng.choice(MEMBERSHIP_TYPES))
+
+    def popular_isbns(self, count):
+        return self.rng.choices(self.isbns, cum_weights=self.popularity, k=count)
+
+
+def run(args):
+    synthetic = SyntheticLibrary(args.books, args.members, args.ops, args.skew, args.seed)
+    library = Library("Benchmark", "n/a")
+    rng = synthetic.rng
+    results = {}
+    budget = args.budget
+
+    # Building the library is the add_book and register_member benchmark
+    results["add_book"] = summarize(timed_calls(((book,) for book in synthetic.catalog()), library.add_book,
+                                                float("inf")))
+    members = list(synthetic.roster())
+    results["register_member"] = summarize(timed_calls(((member,) for member in members),
+                                                       library.register_member, float("inf")))
+    member_ids = [member.member_id for member in members]
+
+    outcomes = []
+    borrows = [(rng.choice(member_ids), isbn) for isbn in synthetic.popular_isbns(args.ops)]
+
+    def borrow(member_id, isbn):
+        success, _ = library.borrow_book(member_id, isbn)
+        if success:
+            outcomes.append((member_id, isbn))
+
+    results["borrow_book"] = summarize(timed_calls(borrows, borrow, float("inf")), len(outcomes))
+    rng.shuffle(outcomes)
+    results["return_book"] = summarize(timed_calls(outcomes, library.return_book, float("inf")))
+    # Leave a realistic share of copies out on loan for the availability finders
+    for member_id, isbn in outcomes[:len(outcomes) // 2]:
+        library.borrow_book(member_id, isbn)
+
+    books = [library.books[isbn] for isbn in synthetic.popular_isbns(args.ops)]
+    sample = rng.sample(members, min(args.ops, len(members)))
+    genres = list(BookGenre)
+    years = [(year, year + rng.randint(0, 10)) for year in (rng.randint(1900, 2024) for _ in range(args.ops))]
+    finders = [
+        ("find_book_by_title", library.find_book_by_title, [(rng.choice(book.title.split()),) for book in books]),
+        ("find_books_by_author", library.find_books_by_author,
+         [(book.author.split()[-1],) for book in books]),
+        ("find_books_by_genre", library.find_books_by_genre, [(rng.choice(genres),) for _ in books]),
+        ("find_books_by_year", library.find_books_by_year, years),
+        ("find_available_books", library.find_available_books, [()] * args.ops),
+        ("find_books", library.find_books,
+         [(rng.choice(genres), start, end, True) for start, end in years]),
+        ("search_fuzzy", library.search_fuzzy, [(book.title[:-1],) for book in books]),
+        ("find_member_by_email", library.find_member_by_email, [(member.email.upper(),) for member in sample]),
+        ("find_member_by_phone", library.find_member_by_phone, [(member.phone,) for member in sample]),
+        ("find_members_by_name", library.find_members_by_name, [(member.name[:3],) for member in sample]),
+        ("get_library_stats", library.get_library_stats, [()] * args.ops),
+    ]
+    for name, function, arguments in finders:
+        function(*arguments[0])  # Lazy indexes are built here, not inside the timings
+        results[name] = best_of(args.repeat, arguments, function, budget)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print each operation against the baseline; returns the names that regressed"""
+    regressions = []
+    print(f"\nAgainst baseline from {baseline['timestamp']} (threshold {threshold:.0%})")
+    if baseline["config"] != results["config"]:
+        print(f"  warning: configs differ, baseline {baseline['config']}")
+    for name, now in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  {name:<22} new")
+            continue
+        throughput = now["ops_per_sec"] / before["ops_per_sec"] - 1
+        latency = now["p50_us"] / before["p50_us"] - 1 if before["p50_us"] else 0.0
+        # Both must be worse: one noisy measure alone is not enough to fail a build
+        regressed = throughput < -threshold and latency > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<22} ops/sec {throughput:+7.1%}  p50 {latency:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the core Library API on a synthetic library")
+    parser.add_argument("--books", type=int, default=100000, help="catalog size (10k to 5M)")
+    parser.add_argument("--members", type=int, default=10000, help="roster size (1k to 1M)")
+    parser.add_argument("--ops", type=int, default=20000, help="calls per operation")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of title popularity")
+    parser.add_argument("--seed", type=int, default=21)
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds each finder may run")
+    parser.add_argument("--repeat", type=int, default=3, help="rounds per finder; the fastest is kept")
+    parser.add_argument("--output", default="library_benchmark.json", help="where to write the results")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = {"timestamp": datetime.now().isoformat(timespec="seconds"),
+               "python": platform.python_version(),
+               "config": {"books": args.books, "members": args.members, "ops": args.ops,
+                          "skew": args.skew, "seed": args.seed},
+               "results": run(args)}
+    print(f"{args.books:,} books, {args.members:,} members, {args.ops:,} ops "
+          f"(skew {args.skew}, seed {args.seed}) in {time.perf_counter() - started:.1f}s")
+    for name, result in results["results"].items():
+        success = f"  {result['success_rate']:.0%} succeeded" if "success_rate" in result else ""
+        print(f"  {name:<22} {result['ops_per_sec']:>12,.0f} ops/sec  p50 {result['p50_us']:>9.1f} us  "
+              f"p99 {result['p99_us']:>9.1f} us{success}")
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Member lookup benchmark: desk lookups by email, phone and name prefix
+Registers a large roster and times the indexed lookups against the linear
+scan of Library.members they replace, plus what registration now costs.
+Usage: python benchmarks/member_lookup_benchmark.py [members] [lookups]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import Library, Member  # noqa: E402
+
+FIRST = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+         "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Aisha"]
+
+
+def timed(label, lookups, function):
+    start = time.perf_counter()
+    for argument in lookups:
+        function(argument)
+    print(f"  {label:<42} {(time.perf_counter() - start) / len(lookups) * 1e6:>10.2f} us")
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(18)
+    surnames = ["".join(rng.choice("bcdfghklmnprstvwz") + rng.choice("aeiou") for _ in range(rng.randint(2, 4)))
+                .title() for _ in range(20000)]
+
+    library = Library("Benchmark", "n/a")
+    start = time.perf_counter()
+    for i in range(members):
+        library.register_member(Member(f"{rng.choice(FIRST)} {rng.choice(surnames)}", f"member{i}@email.com",
+                                       f"555-{i:07d}", "Regular"))
+    print(f"{members:,} members registered in {time.perf_counter() - start:.1f}s "
+          f"({(time.perf_counter() - start) / members * 1e6:.1f} us each, duplicate checks included)")
+
+    sample = rng.sample(list(library.members.values()), lookups)
+    emails = [member.email.upper() for member in sample]
+    phones = [member.phone.replace("-", " ") for member in sample]
+    prefixes = [f"{member.name.split()[0][:3]} {member.name.split()[1][:3]}" for member in sample]
+    library.find_members_by_name("warm up")  # Sorts the queued names in
+
+    timed("find_member_by_email", emails, library.find_member_by_email)
+    timed("find_member_by_phone", phones, library.find_member_by_phone)
+    timed("find_members_by_name ('Jam Kob', 20 max)", prefixes, library.find_members_by_name)
+    timed("find_members_by_name (surname prefix)", [prefix.split()[1] for prefix in prefixes],
+          library.find_members_by_name)
+    roster = list(library.members.values())
+    timed("scan of Library.members by email (before)", emails[:20],
+          lambda email: next(member for member in roster if member.email.lower() == email.lower()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Metrics benchmark: what library_metrics instrumentation costs per call
+Times a borrow/return/lookup/stats mix on one library with and without
+instrumentation, alternating in chunks so both see the same growing state
+(history, transaction log) and the same machine noise. Then prints the
+histogram percentiles and the size of the Prometheus export.
+Usage: python benchmarks/metrics_benchmark.py [books] [operations]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_metrics import instrument, uninstrument  # noqa: E402
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+
+def mix(library, plan):
+    start = time.perf_counter()
+    for member_id, isbn in plan:
+        library.borrow_book(member_id, isbn)
+        library.return_book(member_id, isbn)
+        library.find_member_by_email("m7@email.com")
+        library.get_library_stats()
+    return time.perf_counter() - start
+
+
+def main():
+    books = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    rng = random.Random(22)
+    genres = list(BookGenre)
+    library = Library("Benchmark", "n/a")
+    library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 500}", genres[i % len(genres)],
+                           1900 + i % 120, 3) for i in range(books))
+    member_ids = [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}", "Premium"))
+                  for i in range(1000)]
+    plan = [(rng.choice(member_ids), f"978-{rng.randrange(books):010d}") for _ in range(operations)]
+
+    mix(library, plan[:1000])  # Warm up lazy indexes
+    plain = measured = 0.0
+    metrics = None
+    chunk = 1000
+    for position in range(0, operations, 2 * chunk):
+        plain += mix(library, plan[position:position + chunk])
+        metrics = instrument(library, metrics)
+        measured += mix(library, plan[position + chunk:position + 2 * chunk])
+        uninstrument(library)
+    calls = 2 * operations  # Half of the 4 * operations calls ran each way
+    print(f"{4 * operations:,} calls (borrow, return, find_member_by_email, get_library_stats)")
+    print(f"  plain:        {plain / calls * 1e6:7.2f} us/call")
+    print(f"  instrumented: {measured / calls * 1e6:7.2f} us/call  (+{(measured - plain) / calls * 1e6:.2f} us)")
+    for method, row in metrics.report().items():
+        print(f"  {method:<20} p50 {row['p50'] * 1e6:7.1f} us  p99 {row['p99'] * 1e6:7.1f} us  {row['outcomes']}")
+    print(f"  Prometheus export: {len(metrics.prometheus()):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
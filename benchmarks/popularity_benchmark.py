@@ -0,0 +1,87 @@
+"""
+Popularity benchmark: cost of the borrow-count tracker and accuracy of its windows
+A simulated week of Zipf-skewed borrows and returns is run twice over the same
+catalog, once with the tracker and once with on_borrowed doing nothing. The
+difference is the per-borrow overhead. top_borrowed latency and the sliding
+window results are then compared against exact counts of the same borrows.
+Usage: python benchmarks/popularity_benchmark.py [books] [borrows]
+"""
+
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+MEMBERS = 5000
+WEEK = timedelta(weeks=1)
+
+
+class UntrackedLibrary(Library):
+    def on_borrowed(self, isbn, when):
+        pass
+
+
+def circulate(library, books, borrows, seed):
+    """Borrow each title at a Zipf-like rate over one simulated week; returns (seconds, borrow log)"""
+    rng = random.Random(seed)
+    genres = list(BookGenre)
+    library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 5000}", genres[i % len(genres)],
+                           1900 + i % 120, 1000) for i in range(books))
+    member_ids = [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}", "Premium"))
+                  for i in range(MEMBERS)]
+    start_of_week = datetime(2024, 1, 1)
+    plan = [(rng.choice(member_ids), f"978-{min(int(rng.paretovariate(0.9)) - 1, books - 1):010d}",
+             start_of_week + WEEK * (i / borrows)) for i in range(borrows)]
+
+    borrowed = []
+    start = time.perf_counter()
+    for member_id, isbn, now in plan:
+        success, _ = library.borrow_book(member_id, isbn, now)
+        if success:
+            borrowed.append((isbn, now))
+        library.return_book(member_id, isbn, now)
+    return time.perf_counter() - start, borrowed
+
+
+def main():
+    books = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    borrows = int(sys.argv[2]) if len(sys.argv) > 2 else 300000
+
+    baseline, _ = circulate(UntrackedLibrary("Benchmark", "n/a"), books, borrows, 16)
+    library = Library("Benchmark", "n/a")
+    tracked, borrowed = circulate(library, books, borrows, 16)
+    print(f"{len(borrowed):,} borrows (+ returns) of {books:,} titles over a simulated week")
+    print(f"  borrow+return without tracker: {baseline / borrows * 1e6:.2f} us   "
+          f"with tracker: {tracked / borrows * 1e6:.2f} us   "
+          f"(+{(tracked - baseline) / len(borrowed) * 1e6:.2f} us per borrow)")
+
+    end = borrowed[-1][1]
+    popularity = library.popularity
+    for window, span in (("hour", timedelta(hours=1)), ("day", timedelta(days=1)), ("week", WEEK)):
+        sliding = popularity.windows[window]
+        # The window covers whole slices, so compare against exact counts from the same start
+        first_slice = int(end.timestamp() // sliding.slice_seconds) - sliding.slices + 1
+        exact = Counter(isbn for isbn, now in borrowed if now.timestamp() >= first_slice * sliding.slice_seconds)
+        start = time.perf_counter()
+        for _ in range(1000):
+            top = popularity.top(50, window, end)
+        latency = (time.perf_counter() - start) / 1000
+        truth = {isbn for isbn, _ in exact.most_common(50)}
+        error = max(abs(count - exact[isbn]) for isbn, count in top)
+        print(f"  {window:>4}: top 50 in {latency * 1e6:6.1f} us  {len(truth & {isbn for isbn, _ in top})}/50 "
+              f"match the exact top 50  max count error {error} of {sum(exact.values()):,} borrows  "
+              f"({len(sliding.counts):,} titles tracked)")
+    start = time.perf_counter()
+    for _ in range(1000):
+        library.top_borrowed(50)
+    print(f"  all-time top 50 in {(time.perf_counter() - start) * 1e3:.1f} us (exact)")
+
+
+if __name__ == "__main__":
+    main()
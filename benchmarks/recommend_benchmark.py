@@ -0,0 +1,94 @@
+"""
+Recommendation benchmark: CoBorrowIndex build time and query latency
+Members borrow and return titles drawn from a few "taste" clusters with a skewed
+popularity, so co-borrowing has real structure. We time the first build from
+every history, Library.recommend and recommend_for_member, and the cost a
+return pays to keep the index current.
+Usage: python benchmarks/recommend_benchmark.py [members] [returns_per_member] [books]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+CLUSTERS = 50
+
+
+def percentiles(latencies):
+    latencies.sort()
+    return (f"p50 {latencies[len(latencies) // 2] * 1e6:.1f} us  "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us")
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    returns = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    books = int(sys.argv[3]) if len(sys.argv) > 3 else 100000
+    rng = random.Random(17)
+    genres = list(BookGenre)
+    library = Library("Benchmark", "n/a")
+    library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 5000}", genres[i % len(genres)],
+                           1900 + i % 120, 1000) for i in range(books))
+    member_ids = [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}", "Premium"))
+                  for i in range(members)]
+    per_cluster = books // CLUSTERS
+
+    def pick(member_id):
+        # Mostly from the member's own cluster, popular titles first
+        cluster = member_id % CLUSTERS if rng.random() < 0.8 else rng.randrange(CLUSTERS)
+        return f"978-{cluster * per_cluster + min(int(rng.paretovariate(0.8)) - 1, per_cluster - 1):010d}"
+
+    start = time.perf_counter()
+    for member_id in member_ids:
+        for _ in range(returns):
+            isbn = pick(member_id)
+            library.borrow_book(member_id, isbn)
+            library.return_book(member_id, isbn)
+    print(f"{members:,} members x {returns} returns over {books:,} titles "
+          f"(histories built in {time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    index = library.recommendations()
+    pairs = sum(len(row) for row in index.pairs.values())
+    print(f"  first build: {time.perf_counter() - start:.2f}s for {pairs:,} nonzero pair counts")
+
+    isbns = [pick(rng.choice(member_ids)) for _ in range(2000)]
+    latencies = []
+    for isbn in isbns:
+        start = time.perf_counter()
+        library.recommend(isbn, 10)
+        latencies.append(time.perf_counter() - start)
+    print(f"  recommend(isbn, 10):               {percentiles(latencies)}")
+
+    latencies = []
+    for member_id in rng.sample(member_ids, min(2000, len(member_ids))):
+        start = time.perf_counter()
+        library.recommend_for_member(member_id, 10)
+        latencies.append(time.perf_counter() - start)
+    print(f"  recommend_for_member(member, 10):  {percentiles(latencies)}")
+
+    # Returns now update the built index; the next query on a touched title refreshes its list
+    plan = [(member_id, pick(member_id)) for member_id in rng.sample(member_ids, min(2000, len(member_ids)))]
+    for member_id, isbn in plan:
+        library.borrow_book(member_id, isbn)
+    latencies = []
+    for member_id, isbn in plan:
+        start = time.perf_counter()
+        library.return_book(member_id, isbn)
+        latencies.append(time.perf_counter() - start)
+    print(f"  return_book with the index built:  {percentiles(latencies)}")
+    latencies = []
+    for _, isbn in plan:
+        start = time.perf_counter()
+        library.recommend(isbn, 10)
+        latencies.append(time.perf_counter() - start)
+    print(f"  recommend right after a return:    {percentiles(latencies)}")
+
+
+if __name__ == "__main__":
+    main()
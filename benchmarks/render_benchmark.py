@@ -0,0 +1,69 @@
+"""
+Render benchmark: dumping the roster and catalog with render_* vs print per record
+The old display_all_members printed str(member) one record at a time, with a
+datetime.now() inside every str(). render_members pages through a sorted view
+and makes one write() per page with the clock read once. Both write to the
+same buffered file so only the rendering differs. Sorted views are built
+before the dumps (and timed on their own), and page latency is timed too.
+Usage: python benchmarks/render_benchmark.py [members] [books]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+
+def timed(label, rows, action):
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {elapsed:6.2f}s  {rows / elapsed:>12,.0f} rows/sec")
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    books = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    genres = list(BookGenre)
+    library = Library("Benchmark", "n/a")
+    library.add_books(Book(f"978-{(i * 7919) % books:010d}", f"Title {i}", f"Author {i % 5000}",
+                           genres[i % len(genres)], 1900 + i % 120, 3) for i in range(books))
+    for i in range(members):
+        library.register_member(Member(f"Member {(i * 7919) % members}", f"m{i}@email.com", f"555-{i:07d}",
+                                       ("Regular", "Premium", "Student")[i % 3]))
+
+    # Sorted views are built on first use and then kept current; time that once, apart from the dumps
+    for kind, sort in (("members", "member_id"), ("members", "name"), ("books", "isbn"), ("books", "title")):
+        start = time.perf_counter()
+        library.view(kind, sort).page(None, 1)
+        print(f"  first {kind} page by {sort}: {time.perf_counter() - start:.2f}s (builds the sorted view)")
+
+    with tempfile.TemporaryFile("w") as sink:
+        print(f"{members:,} members")
+        timed("print(member) per record (before)", members,
+              lambda: [print(f"\n{member}", file=sink) for member in library.members.values()])
+        timed("render_members text", members, lambda: library.render_members(sink))
+        timed("render_members csv", members, lambda: library.render_members(sink, "csv"))
+        timed("render_members jsonl", members, lambda: library.render_members(sink, "jsonl"))
+        timed("render_members text, by name", members, lambda: library.render_members(sink, "text", "name"))
+        print(f"{books:,} books")
+        timed("print(book) per record (before)", books,
+              lambda: [print(f"  [{book.isbn}] {book}", file=sink) for book in library.books.values()])
+        timed("render_books text (ISBN order)", books, lambda: library.render_books(sink))
+        timed("render_books csv, by title", books, lambda: library.render_books(sink, "csv", "title"))
+
+    cursor = None
+    pages = 0
+    start = time.perf_counter()
+    while pages < 1000:
+        _, cursor = library.page_members("name", cursor, 50)
+        pages += 1
+    print(f"  page_members('name', cursor, 50): {(time.perf_counter() - start) / pages * 1e6:.1f} us per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Load generator for library_server: latency percentiles at a given concurrency
+Opens `connections` pipelining clients, each keeping `depth` requests in
+flight, and drives a borrow/return/search mix. It reports throughput and
+p50/p99 latency. Without --port it starts an in-process server on a fresh
+demo catalog.
+Usage: python benchmarks/server_benchmark.py [--connections 16] [--depth 8] [--requests 50000] [--port PORT]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_server import LibraryClient, LibraryServer  # noqa: E402
+from library_system import Book, BookGenre, Library  # noqa: E402
+
+
+def build(books):
+    library = Library("Benchmark", "n/a")
+    genres = list(BookGenre)
+    library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 500}", genres[i % len(genres)],
+                           1900 + i % 120, 5) for i in range(books))
+    return library
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def drive(client, member_id, catalog, requests, latencies, seed):
+    """One pipelined stream of requests for one member"""
+    rng = random.Random(seed)
+    isbns = list(catalog)
+    borrowed = []
+    for _ in range(requests):
+        roll = rng.random()
+        start = time.perf_counter()
+        if roll < 0.1:
+            await client.request("search", title=catalog[rng.choice(isbns)], limit=5)
+        elif borrowed and (roll < 0.5 or len(borrowed) >= 10):
+            await client.request("return", member_id=member_id, isbn=borrowed.pop())
+        else:
+            isbn = rng.choice(isbns)
+            response = await client.request("borrow", member_id=member_id, isbn=isbn)
+            if response["ok"]:
+                borrowed.append(isbn)
+        latencies.append(time.perf_counter() - start)
+
+
+async def load(host, port, connections, depth, requests, books):
+    clients = [await LibraryClient.connect(host, port) for _ in range(connections)]
+    # Sample the server's own catalog so the same generator works against any running server
+    response = await clients[0].request("search", limit=books)
+    catalog = {book["isbn"]: book["title"] for book in response["books"]}
+    if not catalog:
+        raise SystemExit("The server has no books to borrow")
+    streams = []
+    for c, client in enumerate(clients):
+        for d in range(depth):
+            response = await client.request("register", name=f"Load {c}-{d}", email=f"load{c}-{d}@email.com",
+                                            phone=f"555-{c:04d}-{d:04d}", type="Premium")
+            streams.append((client, response["member_id"]))
+
+    latencies = []
+    per_stream = requests // len(streams)
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(client, member_id, catalog, per_stream, latencies, seed)
+                           for seed, (client, member_id) in enumerate(streams)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+
+    latencies.sort()
+    print(f"{len(latencies):,} requests over {connections} connections x {depth} pipelined: "
+          f"{len(latencies) / elapsed:,.0f} req/s")
+    print(f"  p50 {percentile(latencies, 0.50) * 1e3:.2f} ms  p99 {percentile(latencies, 0.99) * 1e3:.2f} ms  "
+          f"max {latencies[-1] * 1e3:.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Drive a library_server and report latency percentiles")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="connect to a running server instead of starting one")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--depth", type=int, default=8, help="requests kept in flight per connection")
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--books", type=int, default=10000, help="catalog size (or sample size with --port)")
+    args = parser.parse_args()
+
+    server = None
+    host, port = args.host, args.port
+    if port is None:
+        server = LibraryServer(build(args.books))
+        host, port = await server.start(host, 0)
+    await load(host, port, args.connections, args.depth, args.requests, args.books)
+    if server is not None:
+        print(f"  {server.requests / server.batches:.1f} requests per micro-batch on average")
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Sharding benchmark: ShardedLibrary throughput from 1 to N worker processes
+For each shard count the same catalog and members are loaded. Then we time
+batched borrows/returns routed to the owning shards and title searches
+scattered to every shard. The plain in-process Library is the baseline.
+Usage: python benchmarks/sharding_benchmark.py [max_shards] [books] [operations]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_sharded import ShardedLibrary  # noqa: E402
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+MEMBERS = 20000
+BATCH = 2000
+SEARCHES = 200
+
+
+def populate(library, books):
+    genres = list(BookGenre)
+    library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 5000}", genres[i % len(genres)],
+                           1900 + i % 120, 2) for i in range(books))
+    return [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}", "Premium"))
+            for i in range(MEMBERS)]
+
+
+def circulate(library, member_ids, books, operations, rng):
+    """Alternate batches of borrows and returns; returns ops/sec"""
+    start = time.perf_counter()
+    done = 0
+    while done < operations:
+        loans = [(rng.choice(member_ids), f"978-{rng.randrange(books):010d}") for _ in range(BATCH)]
+        if isinstance(library, ShardedLibrary):
+            library.borrow_batch(loans)
+            library.return_batch(loans)
+        else:
+            for member_id, isbn in loans:
+                library.borrow_book(member_id, isbn)
+            for member_id, isbn in loans:
+                library.return_book(member_id, isbn)
+        done += 2 * BATCH
+    return done / (time.perf_counter() - start)
+
+
+def search(library, books, rng):
+    """Selective title searches; returns searches/sec"""
+    library.find_book_by_title("warm up")  # Builds the deferred text index
+    start = time.perf_counter()
+    for _ in range(SEARCHES):
+        library.find_book_by_title(f"Title {rng.randrange(books)}")
+    return SEARCHES / (time.perf_counter() - start)
+
+
+def main():
+    max_shards = int(sys.argv[1]) if len(sys.argv) > 1 else max(4, os.cpu_count() or 1)
+    books = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    operations = int(sys.argv[3]) if len(sys.argv) > 3 else 200000
+    print(f"{books:,} titles, {MEMBERS:,} members, {operations:,} borrows+returns in batches of {BATCH}, "
+          f"{os.cpu_count()} CPUs")
+
+    library = Library("Benchmark", "n/a")
+    member_ids = populate(library, books)
+    rate = circulate(library, member_ids, books, operations, random.Random(1))
+    searches = search(library, books, random.Random(2))
+    print(f"  Library (1 process):   {rate:>10,.0f} ops/s  {searches:>8,.1f} searches/s")
+    assert library.get_library_stats(verify=True)["borrowed_books"] == 0
+
+    shards = 1
+    while shards <= max_shards:
+        with ShardedLibrary("Benchmark", "n/a", shards=shards) as library:
+            member_ids = populate(library, books)
+            rate = circulate(library, member_ids, books, operations, random.Random(1))
+            searches = search(library, books, random.Random(2))
+            print(f"  ShardedLibrary x {shards:<3}   {rate:>10,.0f} ops/s  {searches:>8,.1f} searches/s")
+            assert library.get_library_stats(verify=True)["borrowed_books"] == 0
+        shards *= 2
+
+
+if __name__ == "__main__":
+    main()
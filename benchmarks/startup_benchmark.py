@@ -0,0 +1,86 @@
+"""
+Startup benchmark: newest snapshot + log-tail replay vs replaying the whole log
+Usage: python benchmarks/startup_benchmark.py [members] [books] [tail_operations]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_snapshot import Snapshotter, open_library  # noqa: E402
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+
+def circulate(library, member_ids, isbns, operations, rng):
+    for _ in range(operations):
+        member_id = rng.choice(member_ids)
+        member = library.members[member_id]
+        if member.borrowed_books and rng.random() < 0.5:
+            library.return_book(member_id, next(iter(member.borrowed_books)))
+        else:
+            library.borrow_book(member_id, rng.choice(isbns))
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    books = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    tail = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    rng = random.Random(7)
+    genres = list(BookGenre)
+    types = ["Regular", "Premium", "Student"]
+
+    root = tempfile.mkdtemp()
+    log_directory = os.path.join(root, "log")
+    snapshot_directory = os.path.join(root, "snapshots")
+    try:
+        start = time.perf_counter()
+        library = Library("Benchmark", "n/a", log_directory)
+        library.add_books(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 20000}",
+                               genres[i % len(genres)], 1900 + i % 120, 3) for i in range(books))
+        member_ids = [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}",
+                                                     types[i % 3]))
+                      for i in range(members)]
+        isbns = list(library.books)
+        circulate(library, member_ids, isbns, members // 2, rng)
+        print(f"Built {members:,} members / {books:,} books in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        snapshot = Snapshotter(library, snapshot_directory).snapshot()
+        print(f"Snapshot written in {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(snapshot) / 1e6:.1f} MB)")
+
+        circulate(library, member_ids, isbns, tail, rng)
+        expected = library.get_library_stats()
+        library.transaction_log.close()
+
+        start = time.perf_counter()
+        restored = open_library("Benchmark", "n/a", snapshot_directory, log_directory)
+        elapsed = time.perf_counter() - start
+        print(f"Snapshot + tail startup: {elapsed:.2f}s ({restored.replayed_records:,} records replayed)")
+        # The restore leaves these indexes to the first query that needs them
+        for label, query in (("email lookup", lambda: restored.find_member_by_email("m1@email.com")),
+                             ("name search", lambda: restored.find_members_by_name("member 1")),
+                             ("overdue query", restored.overdue_loans)):
+            start = time.perf_counter()
+            query()
+            print(f"  first {label}: {time.perf_counter() - start:.2f}s")
+        assert restored.get_library_stats(verify=True) == expected
+        restored.transaction_log.close()
+
+        shutil.rmtree(snapshot_directory)
+        start = time.perf_counter()
+        replayed = open_library("Benchmark", "n/a", snapshot_directory, log_directory)
+        elapsed = time.perf_counter() - start
+        print(f"Full log replay startup: {elapsed:.2f}s ({replayed.replayed_records:,} records replayed)")
+        replayed.transaction_log.close()
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
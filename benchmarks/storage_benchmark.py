@@ -0,0 +1,65 @@
+"""
+Storage benchmark: in-memory Library vs SQLiteLibrary
+Usage: python benchmarks/storage_benchmark.py [books] [members] [operations]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from library_sqlite import SQLiteLibrary  # noqa: E402
+from library_system import Book, BookGenre, Library, Member  # noqa: E402
+
+
+def timed(label, count, action):
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    return label, count, count / elapsed if elapsed else float("inf")
+
+
+def run(library, books, members, operations):
+    rng = random.Random(42)
+    genres = list(BookGenre)
+    types = ["Regular", "Premium", "Student"]
+    results = []
+
+    results.append(timed("add_book", books, lambda: [
+        library.add_book(Book(f"978-{i:010d}", f"Title {i}", f"Author {i % 5000}",
+                              genres[i % len(genres)], 1900 + i % 120, 3))
+        for i in range(books)]))
+
+    member_ids = []
+    results.append(timed("register_member", members, lambda: member_ids.extend(
+        library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:07d}", types[i % 3]))
+        for i in range(members))))
+
+    loans = [(rng.choice(member_ids), f"978-{rng.randrange(books):010d}") for _ in range(operations)]
+    results.append(timed("borrow_book", operations, lambda: [
+        library.borrow_book(member_id, isbn) for member_id, isbn in loans]))
+    results.append(timed("return_book", operations, lambda: [
+        library.return_book(member_id, isbn) for member_id, isbn in loans]))
+    return results
+
+
+def main():
+    books = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    members = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    operations = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = run(Library("Memory", "n/a"), books, members, operations)
+        with SQLiteLibrary("SQLite", "n/a", os.path.join(tmp, "library.db")) as library:
+            sqlite = run(library, books, members, operations)
+
+    print(f"{'Operation':<18}{'Count':>8}{'memory ops/s':>16}{'sqlite ops/s':>16}{'ratio':>8}")
+    for (label, count, mem_rate), (_, _, sql_rate) in zip(memory, sqlite):
+        print(f"{label:<18}{count:>8}{mem_rate:>16,.0f}{sql_rate:>16,.0f}{mem_rate / sql_rate:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Thread-safe Library for multi-threaded servers
+ConcurrentLibrary has the same API as Library, but every operation can be called
+from many threads at once. Per-book and per-member state is guarded by striped
+locks. Library-wide state (running totals, availability and due-date indexes,
+search indexes, the transaction log) sits behind one short-held shared lock.
+
+    library = ConcurrentLibrary("City Central Library", "123 Main Street")
+    # e.g. from WSGI worker threads
+    library.borrow_book(member_id, isbn)
+
+Locks are always taken in the same order, so no two operations can deadlock:
+member stripe -> book stripes (ascending stripe number) -> shared lock.
+A return that frees a copy for a hold hands it off only after its own
+locks are released, since the hand-off borrows for another member.
+"""
+
+import threading
+from contextlib import ExitStack, contextmanager
+
+from library_system import HOLD_DAYS, LOG_SEGMENT_BYTES, Library
+
+
+class StripedLocks:
+    """Fixed pool of locks handed out by key hash
+
+    Keys that hash to the same stripe share a lock. This bounds memory no
+    matter how many books or members exist, and contention stays low while
+    stripes outnumber threads.
+    """
+
+    def __init__(self, stripes=64):
+        # Re-entrant: a hold hand-off checks the hold and then borrows under the same stripes
+        self.locks = [threading.RLock() for _ in range(stripes)]
+
+    def stripe(self, key):
+        return hash(key) % len(self.locks)
+
+    def lock_for(self, key):
+        return self.locks[self.stripe(key)]
+
+    @contextmanager
+    def holding(self, keys):
+        """Hold the stripes of every key, taken in ascending stripe order"""
+        with ExitStack() as stack:
+            for stripe in sorted({self.stripe(key) for key in keys}):
+                stack.enter_context(self.locks[stripe])
+            yield
+
+
+class ConcurrentLibrary(Library):
+    """Library that is safe to share between threads
+
+    A copy can never be oversold, and member loans, fines and the running
+    totals stay consistent under concurrent borrows, returns and payments.
+    get_library_stats(verify=True) is only meaningful while no other thread
+    is mutating the library.
+    """
+
+    def __init__(self, name, address, log_directory=None, stripes=64, clock=None, log_segment_bytes=LOG_SEGMENT_BYTES,
+                 max_log_segments=None):
+        super().__init__(name, address, log_directory, clock, log_segment_bytes, max_log_segments)
+        self.member_locks = StripedLocks(stripes)
+        self.book_locks = StripedLocks(stripes)
+        self.shared_lock = threading.RLock()  # Re-entrant: on_fines_changed logs a PAY_FINE
+        self.deferred = threading.local()  # .holds: hand-offs waiting for this thread's stripe locks to go
+
+    # Per-book and per-member operations
+
+    def store_book(self, book):
+        with self.book_locks.lock_for(book.isbn), self.shared_lock:
+            return super().store_book(book)
+
+    def store_member(self, member):
+        with self.member_locks.lock_for(member.member_id), self.shared_lock:
+            super().store_member(member)
+
+    def claim_contacts(self, member):
+        # Check and reserve in one step, so two registrations cannot both take an email
+        with self.shared_lock:
+            return super().claim_contacts(member)
+
+    def borrow_book(self, member_id, isbn, now=None):
+        with self.member_locks.lock_for(member_id), self.book_locks.lock_for(isbn):
+            return super().borrow_book(member_id, isbn, now)
+
+    def return_book(self, member_id, isbn, now=None):
+        with self.holds_deferred(), self.member_locks.lock_for(member_id), self.book_locks.lock_for(isbn):
+            return super().return_book(member_id, isbn, now)
+
+    def borrow_many(self, member_id, isbns, atomic=False, now=None):
+        # Holding the whole basket keeps the atomic dry run valid until the borrows happen
+        with self.member_locks.lock_for(member_id), self.book_locks.holding(isbns):
+            return super().borrow_many(member_id, isbns, atomic, now)
+
+    def return_many(self, member_id, isbns, now=None):
+        with self.holds_deferred(), self.member_locks.lock_for(member_id), self.book_locks.holding(isbns):
+            return super().return_many(member_id, isbns, now)
+
+    @contextmanager
+    def holds_deferred(self):
+        """Run the fill_holds calls made inside the block after it (and its locks) exit"""
+        pending = self.deferred.holds = []
+        try:
+            yield
+        finally:
+            self.deferred.holds = None
+        for isbn, now in pending:
+            self.fill_holds(isbn, now)
+
+    def fill_holds(self, isbn, now=None):
+        pending = getattr(self.deferred, "holds", None)
+        if pending is not None:
+            pending.append((isbn, now))
+            return []
+        return super().fill_holds(isbn, now)
+
+    def pay_fine(self, member_id, amount):
+        with self.member_locks.lock_for(member_id):
+            return super().pay_fine(member_id, amount)
+
+    def place_hold(self, member_id, isbn, now=None, days=HOLD_DAYS):
+        with self.member_locks.lock_for(member_id), self.book_locks.lock_for(isbn), self.shared_lock:
+            return super().place_hold(member_id, isbn, now, days)
+
+    def archive_member_history(self, member, archive, path, before_day):
+        with self.member_locks.lock_for(member.member_id):
+            return super().archive_member_history(member, archive, path, before_day)
+
+    # Library-wide state
+
+    def on_copies_changed(self, book, delta):
+        with self.shared_lock:
+            super().on_copies_changed(book, delta)
+
+    def on_fines_changed(self, member, delta):
+        with self.shared_lock:
+            super().on_fines_changed(member, delta)
+
+    def on_borrowed(self, isbn, when):
+        with self.shared_lock:
+            super().on_borrowed(isbn, when)
+
+    def on_loan_started(self, member, isbn, borrow_date):
+        with self.shared_lock:
+            super().on_loan_started(member, isbn, borrow_date)
+
+    def on_loan_ended(self, member, isbn):
+        with self.shared_lock:
+            super().on_loan_ended(member, isbn)
+
+    def cancel_hold(self, member_id, isbn, now=None):
+        # The member stripe keeps a cancel from slipping between a hand-off's check and its borrow
+        with self.member_locks.lock_for(member_id), self.shared_lock:
+            return super().cancel_hold(member_id, isbn, now)
+
+    def hand_off(self, member_id, isbn, now):
+        with self.member_locks.lock_for(member_id), self.book_locks.lock_for(isbn):
+            return super().hand_off(member_id, isbn, now)
+
+    def hold_position(self, member_id, isbn, as_of=None):
+        with self.shared_lock:
+            return super().hold_position(member_id, isbn, as_of)
+
+    def next_holder(self, isbn, as_of):
+        with self.shared_lock:
+            return super().next_holder(isbn, as_of)
+
+    def open_loans(self):
+        with self.shared_lock:
+            return super().open_loans()
+
+    def log_transaction(self, op, member_id, isbn="", fine=0.0, details=None, now=None):
+        with self.shared_lock:
+            super().log_transaction(op, member_id, isbn, fine, details, now)
+
+    # Readers of indexes that other threads mutate (TextIndex, PrefixIndex and restored contacts build lazily)
+
+    def find_book_by_title(self, title):
+        with self.shared_lock:
+            return super().find_book_by_title(title)
+
+    def find_books_by_author(self, author):
+        with self.shared_lock:
+            return super().find_books_by_author(author)
+
+    def find_books_by_genre(self, genre):
+        with self.shared_lock:
+            return super().find_books_by_genre(genre)
+
+    def find_books_by_year(self, start_year, end_year):
+        with self.shared_lock:
+            return super().find_books_by_year(start_year, end_year)
+
+    def find_available_books(self):
+        with self.shared_lock:
+            return super().find_available_books()
+
+    def fuzzy_matches(self, query, limit=10):
+        with self.shared_lock:
+            return super().fuzzy_matches(query, limit)
+
+    def search_fuzzy(self, query, limit=10):
+        with self.shared_lock:
+            return super().search_fuzzy(query, limit)
+
+    def find_books(self, genre=None, start_year=None, end_year=None, available_only=False):
+        with self.shared_lock:
+            return super().find_books(genre, start_year, end_year, available_only)
+
+    def page_books(self, sort="isbn", after=None, limit=50):
+        with self.shared_lock:
+            return super().page_books(sort, after, limit)
+
+    def page_members(self, sort="member_id", after=None, limit=50):
+        with self.shared_lock:
+            return super().page_members(sort, after, limit)
+
+    def top_borrowed(self, k=10, window=None):
+        with self.shared_lock:
+            return super().top_borrowed(k, window)
+
+    def recommend(self, isbn, k=5):
+        with self.shared_lock:
+            return super().recommend(isbn, k)
+
+    def recommend_for_member(self, member_id, k=5):
+        with self.member_locks.lock_for(member_id), self.shared_lock:
+            return super().recommend_for_member(member_id, k)
+
+    def find_member_by_email(self, email):
+        with self.shared_lock:
+            return super().find_member_by_email(email)
+
+    def find_member_by_phone(self, phone):
+        with self.shared_lock:
+            return super().find_member_by_phone(phone)
+
+    def find_members_by_name(self, prefix, limit=20):
+        with self.shared_lock:
+            return super().find_members_by_name(prefix, limit)
+
+    def recent_transactions(self, count=5):
+        with self.shared_lock:
+            return super().recent_transactions(count)
+
+    def transactions_between(self, start, end):
+        with self.shared_lock:
+            return super().transactions_between(start, end)
+
+    def overdue_loans(self, as_of=None):
+        with self.shared_lock:
+            return super().overdue_loans(as_of)
+
+    def newly_overdue_loans(self, as_of=None):
+        with self.shared_lock:
+            return super().newly_overdue_loans(as_of)
+
+    def get_library_stats(self, verify=False):
+        with self.shared_lock:
+            return super().get_library_stats(verify)
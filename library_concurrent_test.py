@@ -0,0 +1,88 @@
+# Tests for library_concurrent: under heavy thread switching no copy is oversold and the totals stay exact
+import random
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from library_concurrent import ConcurrentLibrary
+from library_system import Book, BookGenre, Member
+
+THREADS = 6
+OPERATIONS = 3000
+ROUNDS = 10  # Each round is short, and any single one catches a race only now and then
+TITLES = 12
+COPIES = 3
+
+
+def worker(library, member_ids, isbns, seed, errors):
+    rng = random.Random(seed)
+    late = datetime.now() + timedelta(days=45)
+    try:
+        for _ in range(OPERATIONS):
+            member_id = rng.choice(member_ids)
+            member = library.members[member_id]
+            isbn = rng.choice(isbns)
+            roll = rng.random()
+            if member.fines:
+                library.pay_fine(member_id, member.fines)
+            elif roll < 0.1:
+                basket = [candidate for candidate in rng.sample(isbns, 2) if candidate not in member.borrowed_books]
+                library.borrow_many(member_id, basket, atomic=roll < 0.05)
+            elif roll < 0.2:
+                library.place_hold(member_id, isbn)
+            elif isbn in member.borrowed_books:
+                library.return_book(member_id, isbn, late if roll < 0.3 else None)
+            else:
+                library.borrow_book(member_id, isbn)
+    except Exception as exc:
+        errors.append(exc)
+
+
+class ConcurrentLibraryStressTest(unittest.TestCase):
+    def setUp(self):
+        # Switch threads every microsecond instead of every 5ms to make races likely
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_copies_are_never_oversold(self):
+        for round_number in range(ROUNDS):
+            with self.subTest(round=round_number):
+                self.run_round(round_number)
+
+    def run_round(self, seed):
+        library = ConcurrentLibrary("Test", "n/a", stripes=8)
+        isbns = [f"978-{i:010d}" for i in range(TITLES)]
+        library.add_books(Book(isbn, f"Title {i}", "Author", BookGenre.FICTION, 2000, COPIES)
+                          for i, isbn in enumerate(isbns))
+        # Each thread works for its own members; only hold hand-offs borrow for another thread's members
+        groups = [[library.register_member(Member(f"Member {t}-{i}", f"t{t}-m{i}@email.com", f"555-{t:03d}-{i:04d}",
+                                                  "Premium"))
+                   for i in range(4)]
+                  for t in range(THREADS)]
+        errors = []
+        threads = [threading.Thread(target=worker, args=(library, group, isbns, seed, errors))
+                   for seed, group in enumerate(groups, seed * THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        loans = {isbn: 0 for isbn in isbns}
+        for member in library.members.values():
+            for isbn in member.borrowed_books:
+                loans[isbn] += 1
+        for isbn in isbns:
+            book = library.books[isbn]
+            self.assertGreaterEqual(book.available_copies, 0)
+            self.assertEqual(book.available_copies + loans[isbn], book.total_copies)
+            self.assertEqual(len(book.borrowed_by), loans[isbn])
+        library.get_library_stats(verify=True)  # Raises RuntimeError if the running totals drifted
+
+
+if __name__ == "__main__":
+    unittest.main()
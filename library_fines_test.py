@@ -0,0 +1,43 @@
+# Tests for library_fines: the repository's numbers.py never gets imported in NumPy's place, and both passes agree
+import os
+import subprocess
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+from library_fines import FineEngine
+from library_system import Book, BookGenre, Library, Member, SimulatedClock
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class ShadowedNumbersTest(unittest.TestCase):
+    def test_repository_numbers_module_is_not_run(self):
+        script = ("import sys; from library_fines import FineEngine, load_numpy; "
+                  "print(load_numpy(), 'numbers' in sys.modules, any(name.startswith('numpy') for name in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout
+        self.assertEqual(output, "None False False\n")
+
+
+class AccrueTest(unittest.TestCase):
+    def test_numpy_and_python_passes_agree(self):
+        clock = SimulatedClock(datetime(2024, 1, 1))
+        library = Library("Test", "n/a", clock=clock)
+        library.add_books(Book(f"978-{i}", f"Title {i}", "Author", BookGenre.FICTION, 2000, 3) for i in range(10))
+        for i in range(30):
+            member_id = library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:04d}",
+                                                       ("Regular", "Premium", "Student")[i % 3]))
+            for day in range(i % 3):
+                library.borrow_book(member_id, f"978-{(i + day) % 10}", clock.now() - timedelta(days=10 * i + day))
+        as_of = clock.now() + timedelta(days=20)
+        python = FineEngine(library, use_numpy=False).accrue(as_of, details=True)
+        self.assertGreater(python.total, 0)
+        engine = FineEngine(library)
+        if not engine.use_numpy:
+            self.skipTest("NumPy is not importable here")
+        self.assertEqual(engine.accrue(as_of, details=True), python)
+
+
+if __name__ == "__main__":
+    unittest.main()
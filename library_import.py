@@ -0,0 +1,110 @@
+"""
+Bulk catalog import for the Library Management System
+Streams CSV or JSONL rows in chunks into Library.add_books, merging duplicate ISBNs
+
+Usage: python library_import.py catalog.csv [--format csv|jsonl] [--chunk-size 50000]
+
+Expected columns / keys: isbn, title, author, genre, publication_year, copies
+(genre may be the display value such as "Non-Fiction" or the enum name NON_FICTION)
+"""
+
+import argparse
+import csv
+import json
+import time
+from itertools import islice
+
+from library_system import Book, BookGenre, Library
+
+COLUMNS = ("isbn", "title", "author", "genre", "publication_year", "copies")
+
+# Accept both BookGenre values and names without a try/except per row
+GENRES = {genre.value.lower(): genre for genre in BookGenre}
+GENRES.update({genre.name.lower(): genre for genre in BookGenre})
+
+
+def parse_genre(text):
+    genre = GENRES.get(text.strip().lower())
+    if genre is None:
+        raise ValueError(f"Unknown genre: {text!r}")
+    return genre
+
+
+def read_csv_books(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        missing = [name for name in COLUMNS if name not in header]
+        if missing:
+            raise ValueError(f"{path}: missing columns {missing}")
+        isbn, title, author, genre, year, copies = (header.index(name) for name in COLUMNS)
+        for row in reader:
+            if row:
+                yield Book(row[isbn], row[title], row[author], parse_genre(row[genre]),
+                           int(row[year]), int(row[copies]))
+
+
+def read_jsonl_books(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                yield Book(row["isbn"], row["title"], row["author"], parse_genre(row["genre"]),
+                           int(row["publication_year"]), int(row["copies"]))
+
+
+def read_books(path, fmt=None):
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    if fmt == "csv":
+        return read_csv_books(path)
+    if fmt == "jsonl":
+        return read_jsonl_books(path)
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def import_catalog(library, path, fmt=None, chunk_size=50000, progress=None):
+    """Stream a catalog file into library; returns a summary dict
+
+    progress, if given, is called with the running summary after every chunk.
+    """
+    books = read_books(path, fmt)
+    summary = {"rows": 0, "new_titles": 0, "merged": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    start = time.perf_counter()
+    while True:
+        chunk = list(islice(books, chunk_size))
+        if not chunk:
+            break
+        new_titles, merged = library.add_books(chunk)
+        summary["rows"] += len(chunk)
+        summary["new_titles"] += new_titles
+        summary["merged"] += merged
+        summary["seconds"] = time.perf_counter() - start
+        summary["rows_per_sec"] = summary["rows"] / summary["seconds"] if summary["seconds"] else 0.0
+        if progress is not None:
+            progress(summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a book catalog into a Library")
+    parser.add_argument("path", help="CSV or JSONL catalog file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--quiet", action="store_true", help="only print the final summary")
+    args = parser.parse_args()
+
+    library = Library("Imported Library", "n/a")
+
+    def report(summary):
+        print(f"  {summary['rows']:,} rows ({summary['rows_per_sec']:,.0f} rows/sec)")
+
+    summary = import_catalog(library, args.path, args.format, args.chunk_size,
+                             progress=None if args.quiet else report)
+    print(f"Imported {summary['rows']:,} rows in {summary['seconds']:.2f}s "
+          f"({summary['rows_per_sec']:,.0f} rows/sec): "
+          f"{summary['new_titles']:,} new titles, {summary['merged']:,} merged into existing ISBNs")
+    library.display_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# Tests for TransactionLog: records survive a restart (even after a torn write), keep full ISBNs and the caller's
+# time, and replaying them rebuilds the library
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from library_system import (Book, BookGenre, Library, Member, SimulatedClock, TransactionLog, TransactionOp,
+                            to_epoch_us)
+
+
+class TornRecordTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_torn_last_record_is_cut_before_appending(self):
+        log = TransactionLog(self.path)
+        log.append(TransactionOp.BORROW, 1, "978-1", timestamp_us=1000)
+        log.append(TransactionOp.RETURN, 1, "978-1", timestamp_us=2000)
+        log.close()
+        segment = os.path.join(self.path, "00000001.log")
+        with open(segment, "ab") as f:
+            f.write(b"\x01\x02\x03")  # A crash partway through the next record
+
+        log = TransactionLog(self.path)
+        self.assertEqual(os.path.getsize(segment), 2 * TransactionLog.RECORD.size)
+        log.append(TransactionOp.BORROW, 2, "978-2", timestamp_us=3000)
+        log.close()
+
+        records = list(TransactionLog(self.path))
+        self.assertEqual([(record.op, record.member_id, record.isbn) for record in records],
+                         [(TransactionOp.BORROW, 1, "978-1"), (TransactionOp.RETURN, 1, "978-1"),
+                          (TransactionOp.BORROW, 2, "978-2")])
+
+    def test_segment_holding_only_a_torn_record_is_emptied(self):
+        log = TransactionLog(self.path)
+        log.append(TransactionOp.BORROW, 1, "978-1", timestamp_us=1000)
+        log.close()
+        with open(os.path.join(self.path, "00000002.log"), "wb") as f:
+            f.write(b"\x01\x02\x03")
+
+        log = TransactionLog(self.path, segment_bytes=TransactionLog.RECORD.size)
+        log.append(TransactionOp.RETURN, 1, "978-1", timestamp_us=2000)
+        log.close()
+        self.assertEqual([record.op for record in TransactionLog(self.path)],
+                         [TransactionOp.BORROW, TransactionOp.RETURN])
+
+
+class LongIsbnTest(unittest.TestCase):
+    def test_isbn_longer_than_the_field_is_refused(self):
+        library = Library("Test", "n/a")
+        with self.assertRaises(ValueError):
+            library.add_book(Book("urn:isbn:978-0-7432-7356-5", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 1))
+        with self.assertRaises(ValueError):
+            library.add_book(Book("978-0-7432-73ü-ü-ü-ü", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 1))
+        self.assertEqual(library.books, {})
+        self.assertEqual(len(library.transaction_log), 0)
+
+    def test_isbn_filling_the_field_round_trips(self):
+        log = TransactionLog()
+        isbn = "978-0-7432-7356-5-XY"
+        self.assertEqual(len(isbn), TransactionLog.ISBN_BYTES)
+        log.append(TransactionOp.BORROW, 1, isbn, timestamp_us=1000)
+        self.assertEqual([record.isbn for record in log], [isbn])
+
+
+class OutOfOrderTest(unittest.TestCase):
+    def test_earlier_now_is_logged_and_replayed_as_given(self):
+        with tempfile.TemporaryDirectory() as path:
+            clock = SimulatedClock(datetime(2024, 3, 1))
+            library = Library("Test", "n/a", path, clock=clock)
+            library.add_book(Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 2))
+            member_id = library.register_member(Member("Ann", "ann@email.com", "555-0101"))
+            library.borrow_book(member_id, "978-1", clock.now() - timedelta(days=40))  # Entered late at the desk
+            library.return_book(member_id, "978-1")
+            library.transaction_log.close()
+
+            replayed = Library("Test", "n/a", path)
+            for record in replayed.transaction_log:
+                replayed.apply_transaction(record)
+            self.assertGreater(library.members[member_id].fines, 0)
+            self.assertEqual(replayed.members[member_id].fines, library.members[member_id].fines)
+            self.assertEqual(replayed.members[member_id].borrowing_history[0]["borrow_date"],
+                             library.members[member_id].borrowing_history[0]["borrow_date"])
+            replayed.transaction_log.close()
+
+    def test_between_finds_records_out_of_time_order(self):
+        with tempfile.TemporaryDirectory() as path:
+            log = TransactionLog(path, index_every=4)
+            day = to_epoch_us(datetime(2024, 3, 1))
+            for member_id in range(20):
+                log.append(TransactionOp.BORROW, member_id, "978-1", timestamp_us=day + member_id * 1000)
+            log.append(TransactionOp.RETURN, 99, "978-1", timestamp_us=day + 5500)  # Logged last, happened early
+            expected = [6, 7, 99]
+            self.assertEqual([record.member_id for record in log.between(day + 5500, day + 8000)], expected)
+            log.close()
+            reloaded = TransactionLog(path, index_every=4)
+            self.assertEqual([record.member_id for record in reloaded.between(day + 5500, day + 8000)], expected)
+
+
+def state(library):
+    """What a replay must bring back: copies and borrowers, every member's loans, fines, history and holds"""
+    books = {isbn: (book.available_copies, dict(book.borrowed_by.counts)) for isbn, book in library.books.items()}
+    members = {member_id: (member.fines, dict(member.borrowed_books), list(member.borrowing_history),
+                           {isbn: library.hold_position(member_id, isbn) for isbn in library.books})
+               for member_id, member in library.members.items()}
+    return books, members, library.get_library_stats()
+
+
+class ReplayTest(unittest.TestCase):
+    def test_replay_rebuilds_loans_fines_history_and_holds(self):
+        with tempfile.TemporaryDirectory() as path:
+            clock = SimulatedClock(datetime(2024, 3, 1))
+            library = Library("Test", "n/a", path, clock=clock)
+            library.add_books([Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 1),
+                               Book("978-2", "Emma", "Jane Austen", BookGenre.ROMANCE, 1815, 2),
+                               Book("978-3", "Ubik", "Philip K. Dick", BookGenre.FICTION, 1969, 1)])
+            ann = library.register_member(Member("Ann Lee", "ann@email.com", "555-0101"))
+            bob = library.register_member(Member("Bob Stone", "bob@email.com", "555-0102", "Premium"))
+            cat = library.register_member(Member("Cat Park", "cat@email.com", "555-0103", "Student"))
+            library.borrow_book(ann, "978-1")
+            library.borrow_many(bob, ["978-2", "978-3"])
+            library.place_hold(cat, "978-1")
+            library.place_hold(ann, "978-3")
+            library.cancel_hold(ann, "978-3")
+            library.place_hold(cat, "978-3")
+            clock.advance(timedelta(days=30))
+            library.return_book(ann, "978-1")  # Late, and handed to Cat's hold
+            library.pay_fine(ann, 1.0)
+            clock.advance(timedelta(days=3))
+            library.return_many(bob, ["978-2"])
+            library.return_book(bob, "978-3", clock.now() - timedelta(days=2))  # Entered late at the desk
+            library.borrow_book(ann, "978-2")
+            library.place_hold(ann, "978-1")
+            library.transaction_log.close()
+
+            replayed = Library("Test", "n/a", path, clock=clock)
+            for record in replayed.transaction_log:
+                replayed.apply_transaction(record)
+            replayed.transaction_log.close()
+            self.assertEqual(state(replayed), state(library))
+            self.assertGreater(library.members[ann].fines, 0)
+            self.assertIn("978-1", library.members[cat].borrowed_books)
+            self.assertIn("978-3", library.members[cat].borrowed_books)
+            self.assertEqual(library.hold_position(ann, "978-1"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,247 @@
+"""
+Opt-in latency histograms and outcome counters for a Library
+instrument() wraps the public methods of one Library instance (any subclass),
+timing every call into a LatencyHistogram and counting its outcome: "ok", the
+failure message ("Member not found", "Book not available", ...) or the name of
+the exception raised. A library that is never instrumented runs its methods
+unwrapped, so disabled metrics cost nothing.
+
+    metrics = instrument(library)
+    library.borrow_book(member_id, isbn)
+    metrics.write_prometheus("/var/lib/node_exporter/library.prom")
+    metrics.serve(9108)  # or scrape http://host:9108/metrics
+
+uninstrument(library) puts the plain methods back.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Methods timed when present on the instrumented library
+INSTRUMENTED = ("add_book", "add_books", "register_member", "borrow_book", "return_book", "borrow_many",
+                "return_many", "borrow_batch", "return_batch", "pay_fine", "place_hold", "cancel_hold",
+                "hold_position", "find_book_by_title",
+                "find_books_by_author", "find_books_by_genre", "find_books_by_year", "find_available_books",
+                "find_books", "search_fuzzy", "find_member_by_email", "find_member_by_phone",
+                "find_members_by_name", "top_borrowed", "recommend", "recommend_for_member", "overdue_loans",
+                "newly_overdue_loans", "get_library_stats")
+
+# Prometheus bucket bounds in seconds, 1 us to 10 s
+EXPORT_BOUNDS = tuple(mantissa * 10.0 ** exponent for exponent in range(-6, 1) for mantissa in (1, 2.5, 5)) + (10.0,)
+
+
+class LatencyHistogram:
+    """HDR-style histogram of nanosecond latencies with about 3% precision
+
+    Values below 2**SUB_BITS ns get a bucket each. Above that, every power
+    of two is split into 2**(SUB_BITS - 1) equal buckets, so a bucket's
+    width is never more than 1/32 of its values. Recording is a bit_length,
+    a shift and a list increment.
+    """
+
+    SUB_BITS = 6
+    MAX_BITS = 44  # ~4.9 hours; longer calls land in the last bucket
+
+    def __init__(self):
+        half = 1 << (self.SUB_BITS - 1)
+        self.counts = [0] * ((self.MAX_BITS - self.SUB_BITS + 2) * half)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def index_of(cls, value):
+        shift = value.bit_length() - cls.SUB_BITS
+        if shift <= 0:
+            return value
+        return (shift << (cls.SUB_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def highest_value(cls, index):
+        """Largest value that lands in bucket index"""
+        half = 1 << (cls.SUB_BITS - 1)
+        if index < 2 * half:
+            return index
+        shift = (index >> (cls.SUB_BITS - 1)) - 1
+        return ((index - (shift << (cls.SUB_BITS - 1)) + 1) << shift) - 1
+
+    def record(self, nanoseconds):
+        # index_of inlined: this runs on every instrumented call
+        shift = nanoseconds.bit_length() - self.SUB_BITS
+        index = nanoseconds if shift <= 0 else (shift << (self.SUB_BITS - 1)) + (nanoseconds >> shift)
+        if index >= len(self.counts):
+            index = len(self.counts) - 1
+        lock = self.lock
+        lock.acquire()  # Nothing below can raise, and this is cheaper than a with block
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ns += nanoseconds
+        if nanoseconds > self.max_ns:
+            self.max_ns = nanoseconds
+        lock.release()
+
+    def percentile(self, fraction):
+        """Latency in seconds at or below which `fraction` of the calls finished"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(fraction * self.count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.highest_value(index), self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+    def cumulative(self, bounds):
+        """Calls that finished within each bound (seconds), for Prometheus buckets"""
+        totals = []
+        seen = 0
+        position = 0
+        for bound in bounds:
+            last = min(self.index_of(int(bound * 1e9)), len(self.counts) - 1)
+            seen += sum(self.counts[position:last + 1])
+            position = last + 1
+            totals.append(seen)
+        return totals
+
+
+def escape(label):
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LibraryMetrics:
+    """Latency histograms per method and call counts per (method, outcome)
+
+    Only failures are counted separately; "ok" is each histogram's count
+    minus its failures, which keeps successful calls down to one lock.
+    """
+
+    def __init__(self):
+        self.histograms = {}  # {method: LatencyHistogram}
+        self.failures = {}  # {(method, outcome): calls}
+        self.lock = threading.Lock()
+
+    def fail(self, method, outcome):
+        with self.lock:
+            self.failures[method, outcome] = self.failures.get((method, outcome), 0) + 1
+
+    def outcomes(self):
+        """{(method, outcome): calls}, "ok" included"""
+        with self.lock:
+            outcomes = dict(self.failures)
+        for method, histogram in self.histograms.items():
+            failed = sum(calls for (name, _), calls in outcomes.items() if name == method)
+            if histogram.count > failed:
+                outcomes[method, "ok"] = histogram.count - failed
+        return outcomes
+
+    def wrap(self, method, function):
+        histogram = self.histograms.setdefault(method, LatencyHistogram())
+        clock = time.perf_counter_ns
+        record = histogram.record
+        fail = self.fail
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as exc:
+                record(clock() - start)
+                fail(method, type(exc).__name__)
+                raise
+            record(clock() - start)
+            # (False, message, ...) is how Library methods report a failure
+            if type(result) is tuple and result and result[0] is False:
+                fail(method, result[1] if isinstance(result[1], str) else "failed")
+            return result
+
+        timed.__wrapped__ = function
+        timed.__name__ = function.__name__
+        timed.__doc__ = function.__doc__
+        return timed
+
+    def report(self):
+        """{method: {"count", "p50", "p99", "max", "outcomes"}} with latencies in seconds"""
+        outcomes = self.outcomes()
+        report = {}
+        for method, histogram in self.histograms.items():
+            if histogram.count:
+                report[method] = {"count": histogram.count, "p50": histogram.percentile(0.5),
+                                  "p99": histogram.percentile(0.99), "max": histogram.max_ns / 1e9,
+                                  "outcomes": {outcome: calls for (name, outcome), calls in outcomes.items()
+                                               if name == method}}
+        return report
+
+    def prometheus(self):
+        """Everything recorded so far in the Prometheus text exposition format"""
+        lines = ["# HELP library_operation_duration_seconds Latency of Library method calls",
+                 "# TYPE library_operation_duration_seconds histogram"]
+        for method, histogram in sorted(self.histograms.items()):
+            if not histogram.count:
+                continue
+            label = f'method="{escape(method)}"'
+            for bound, total in zip(EXPORT_BOUNDS, histogram.cumulative(EXPORT_BOUNDS)):
+                lines.append(f'library_operation_duration_seconds_bucket{{{label},le="{bound:g}"}} {total}')
+            lines.append(f'library_operation_duration_seconds_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f"library_operation_duration_seconds_sum{{{label}}} {histogram.total_ns / 1e9:.9f}")
+            lines.append(f"library_operation_duration_seconds_count{{{label}}} {histogram.count}")
+        lines += ["# HELP library_operations_total Library method calls by outcome",
+                  "# TYPE library_operations_total counter"]
+        for (method, outcome), calls in sorted(self.outcomes().items()):
+            lines.append(f'library_operations_total{{method="{escape(method)}",outcome="{escape(outcome)}"}} {calls}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the metrics to path atomically (for node_exporter's textfile collector)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as file:
+            file.write(self.prometheus())
+        os.replace(temporary, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve GET /metrics from a daemon thread; returns the HTTP server (call shutdown() to stop)"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood stderr
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def instrument(library, metrics=None):
+    """Time and count the public methods of this library instance; returns its LibraryMetrics"""
+    if getattr(library, "metrics", None) is not None:
+        return library.metrics
+    metrics = metrics or LibraryMetrics()
+    for method in INSTRUMENTED:
+        function = getattr(library, method, None)
+        if function is not None:
+            setattr(library, method, metrics.wrap(method, function))
+    library.metrics = metrics
+    return metrics
+
+
+def uninstrument(library):
+    """Drop the timing wrappers so calls go straight to the class methods again"""
+    for method in INSTRUMENTED:
+        library.__dict__.pop(method, None)
+    library.metrics = None
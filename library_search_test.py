@@ -0,0 +1,67 @@
+# Tests for the catalog and roster indexes: TextIndex, PrefixIndex and the email/phone lookups of Library
+import unittest
+
+from library_system import Book, BookGenre, Library, Member, PrefixIndex, TextIndex
+
+
+class TextIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = TextIndex()
+        self.index.add("978-1", "Nineteen Eighty-Four")
+        self.index.add("978-2", "Animal Farm")
+        self.index.add("978-3", "Animal Farm")  # Another edition: indexed once, found twice
+        self.index.add_many(["978-4", "978-5"], ["The Farm Next Door", "Brave New World"])
+
+    def test_substring_search_in_insertion_order(self):
+        self.assertEqual(self.index.search("farm"), ["978-2", "978-3", "978-4"])
+        self.assertEqual(self.index.search("ANIMAL f"), ["978-2", "978-3"])
+        self.assertEqual(self.index.search("eighty-f"), ["978-1"])
+        self.assertEqual(self.index.search("zzz"), [])
+
+    def test_fuzzy_search_tolerates_typos(self):
+        self.assertEqual(self.index.fuzzy("wrld brave", 1)[0][1], "978-5")
+        self.assertEqual({key for _, key in self.index.fuzzy("Anmal", 2)}, {"978-2", "978-3"})
+
+    def test_texts_added_after_a_search_are_found(self):
+        self.index.search("farm")
+        self.index.add("978-6", "Cold Comfort Farm")
+        self.assertEqual(self.index.search("farm")[-1], "978-6")
+
+
+class PrefixIndexTest(unittest.TestCase):
+    def test_every_query_word_must_start_a_word(self):
+        index = PrefixIndex()
+        index.add(1, "Bob Smith")
+        index.add(2, "Bob Jones")
+        index.add(3, "Smitty Bobson")
+        index.add_later([4, 5], ["Alice Smith", "bob smithers"])
+        self.assertEqual(set(index.search("bob sm", 10)), {1, 3, 5})
+        self.assertEqual(set(index.search("SMITH", 10)), {1, 4, 5})
+        self.assertEqual(len(index.search("sm", 2)), 2)
+        self.assertEqual(index.search("ith", 10), [])
+        self.assertEqual(index.search("  ", 10), [])
+
+
+class ContactLookupTest(unittest.TestCase):
+    def setUp(self):
+        self.library = Library("Test", "n/a")
+        self.library.add_book(Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 1))
+        self.ann = self.library.register_member(Member("Ann Lee", "Ann@Email.com", "555-0101"))
+
+    def test_lookups_ignore_case_spacing_and_punctuation(self):
+        self.assertEqual(self.library.find_member_by_email("  ann@email.COM ").member_id, self.ann)
+        self.assertEqual(self.library.find_member_by_phone("(555) 0101").member_id, self.ann)
+        self.assertIsNone(self.library.find_member_by_email("bob@email.com"))
+        self.assertIsNone(self.library.find_member_by_phone("01"))  # Too few digits to be a number
+
+    def test_a_contact_belongs_to_one_member(self):
+        with self.assertRaisesRegex(ValueError, "Email"):
+            self.library.register_member(Member("Ann Twin", "ANN@email.com", "555-0199"))
+        with self.assertRaisesRegex(ValueError, "Phone"):
+            self.library.register_member(Member("Ann Twin", "twin@email.com", "555 0101"))
+        self.assertEqual(len(self.library.members), 1)
+        self.assertEqual([member.name for member in self.library.find_members_by_name("twin")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
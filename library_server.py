@@ -0,0 +1,368 @@
+"""
+asyncio network front-end for the Library Management System
+Serves register/borrow/return/search/stats over line-delimited JSON on a TCP socket.
+Each request is one JSON object per line; each response is one line carrying
+the same "id":
+
+    {"id": 1, "op": "borrow", "member_id": 1000, "isbn": "978-0-7432-7356-5"}
+    {"id": 1, "ok": true, "message": "Successfully borrowed '1984'"}
+
+search takes one of "fuzzy", "title" or "author" (a query string), or any of
+"genre", "start_year", "end_year" and "available_only", plus an optional "limit".
+members looks members up by "email", "phone" or a "name" prefix.
+page lists "books" or "members" (the "of" key) in a "sort" order, "limit" at a
+time; pass the returned "cursor" back as "after" for the next page.
+hold queues a member for a title with no copy on the shelf; the next returned
+copy is lent to them when their turn comes. hold_position answers with their
+place in the queue ("position" is null without a hold).
+
+Clients may pipeline: send many requests without waiting, and responses come
+back in request order on each connection. Requests from all connections are
+applied in micro-batches on the event loop. Each batch that changed anything
+ends with one Library.flush(), so a burst of borrows shares one log/database
+flush. Bounded queues provide backpressure: a client that sends faster than
+the library can apply stops being read, and TCP pushes back on it.
+
+    python library_server.py --port 8765 --catalog books.csv
+
+With --metrics-port, library calls are timed and counted by library_metrics
+and served for Prometheus at http://host:port/metrics.
+"""
+
+import argparse
+import asyncio
+import json
+
+from library_system import BookGenre, Library, Member
+
+OPS = ("register", "borrow", "return", "borrow_many", "return_many", "pay_fine", "hold", "cancel_hold",
+       "hold_position", "search", "members", "page", "stats")
+MUTATIONS = {"register", "borrow", "return", "borrow_many", "return_many", "pay_fine", "hold", "cancel_hold"}
+TOO_LONG = b"<too long>"  # read_line's stand-in for a request line over the stream limit
+
+
+# Expected JSON type of each request field; handle_request rejects anything else before touching the library
+FIELD_TYPES = {"member_id": int, "isbn": str, "isbns": list, "amount": (int, float), "atomic": bool,
+               "name": str, "email": str, "phone": str, "type": str, "fuzzy": str, "title": str, "author": str,
+               "genre": str, "start_year": int, "end_year": int, "available_only": bool, "limit": int,
+               "of": str, "sort": str, "after": list}
+
+
+def check_fields(request):
+    """Raise ValueError naming the first field whose value has the wrong JSON type"""
+    for field, expected in FIELD_TYPES.items():
+        value = request.get(field)
+        if value is None:
+            continue
+        # bool is an int subclass, but true is not a member ID or a year
+        if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+            raise ValueError(f"{field} has the wrong type: {value!r}")
+    if "isbns" in request and not all(isinstance(isbn, str) for isbn in request["isbns"]):
+        raise ValueError("isbns must be a list of strings")
+    if request.get("limit") is not None and request["limit"] < 1:
+        raise ValueError(f"limit must be at least 1: {request['limit']!r}")
+
+
+def book_summary(book):
+    return {"isbn": book.isbn, "title": book.title, "author": book.author, "genre": book.genre.name,
+            "year": book.publication_year, "available": book.available_copies, "total": book.total_copies}
+
+
+def member_summary(member):
+    return {"member_id": member.member_id, "name": member.name, "email": member.email, "phone": member.phone,
+            "type": member.membership_type, "loans": len(member.borrowed_books), "fines": member.fines}
+
+
+def handle_request(library, request):
+    """Apply one decoded request to library and return the response dict (without the id)"""
+    op = request.get("op")
+    check_fields(request)
+    if op == "register":
+        member = Member(request["name"], request["email"], request["phone"], request.get("type", "Regular"))
+        try:
+            return {"ok": True, "member_id": library.register_member(member)}
+        except ValueError as exc:  # Email or phone already registered
+            return {"ok": False, "message": str(exc)}
+    if op == "borrow":
+        success, message = library.borrow_book(request["member_id"], request["isbn"])
+        return {"ok": success, "message": message}
+    if op == "return":
+        success, message, fine = library.return_book(request["member_id"], request["isbn"])
+        return {"ok": success, "message": message, "fine": fine}
+    if op == "borrow_many":
+        success, results = library.borrow_many(request["member_id"], request["isbns"],
+                                               request.get("atomic", False))
+        return {"ok": success, "results": results}
+    if op == "return_many":
+        fine, results = library.return_many(request["member_id"], request["isbns"])
+        return {"ok": all(result[1] for result in results), "fine": fine, "results": results}
+    if op == "pay_fine":
+        success, message = library.pay_fine(request["member_id"], request["amount"])
+        return {"ok": success, "message": message}
+    if op == "hold":
+        success, message = library.place_hold(request["member_id"], request["isbn"])
+        return {"ok": success, "message": message}
+    if op == "cancel_hold":
+        success, message = library.cancel_hold(request["member_id"], request["isbn"])
+        return {"ok": success, "message": message}
+    if op == "hold_position":
+        return {"ok": True, "position": library.hold_position(request["member_id"], request["isbn"])}
+    if op == "search":
+        if "fuzzy" in request:
+            books = library.search_fuzzy(request["fuzzy"], request.get("limit", 10))
+        elif "title" in request:
+            books = library.find_book_by_title(request["title"])
+        elif "author" in request:
+            books = library.find_books_by_author(request["author"])
+        else:
+            genre = BookGenre[request["genre"]] if "genre" in request else None
+            books = library.find_books(genre, request.get("start_year"), request.get("end_year"),
+                                       request.get("available_only", False))
+        limit = request.get("limit", 50)
+        return {"ok": True, "count": len(books), "books": [book_summary(book) for book in books[:limit]]}
+    if op == "members":
+        if "email" in request:
+            members = [library.find_member_by_email(request["email"])]
+        elif "phone" in request:
+            members = [library.find_member_by_phone(request["phone"])]
+        else:
+            members = library.find_members_by_name(request["name"], request.get("limit", 20))
+        return {"ok": True, "members": [member_summary(member) for member in members if member is not None]}
+    if op == "page":
+        try:
+            if request.get("of", "books") == "books":
+                books, cursor = library.page_books(request.get("sort", "isbn"), request.get("after"),
+                                                   request.get("limit", 50))
+                return {"ok": True, "books": [book_summary(book) for book in books], "cursor": cursor}
+            members, cursor = library.page_members(request.get("sort", "member_id"), request.get("after"),
+                                                   request.get("limit", 50))
+            return {"ok": True, "members": [member_summary(member) for member in members], "cursor": cursor}
+        except ValueError as exc:  # Unknown sort
+            return {"ok": False, "message": str(exc)}
+    if op == "stats":
+        return {"ok": True, "stats": library.get_library_stats()}
+    return {"ok": False, "error": f"Unknown op {op!r}; expected one of {', '.join(OPS)}"}
+
+
+class LibraryServer:
+    """Line-delimited JSON server in front of one Library
+
+    max_batch caps how many requests are applied per event-loop turn.
+    max_pending bounds the requests queued server-wide. max_in_flight bounds
+    the unanswered requests per connection. A request line longer than
+    max_line bytes is skipped and answered with an error.
+    """
+
+    def __init__(self, library, max_batch=256, max_pending=4096, max_in_flight=128, max_line=64 * 1024):
+        self.library = library
+        self.max_batch = max_batch
+        self.max_line = max_line
+        self.max_in_flight = max_in_flight
+        self.pending = asyncio.Queue(max_pending)  # (request, future) across all connections
+        self.server = None
+        self.batcher = None
+        self.connections = {}  # {handler task: writer}
+        self.batches = 0
+        self.requests = 0
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.batcher = asyncio.create_task(self.run_batches())
+        self.server = await asyncio.start_server(self.serve_connection, host, port, limit=self.max_line)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self, grace=5.0):
+        """Stop accepting, give connections grace seconds to drain, then drop the rest"""
+        self.server.close()
+        # Closing each transport ends its reader, so handlers finish their in-flight responses and exit
+        for writer in self.connections.values():
+            writer.close()
+        if self.connections:
+            await asyncio.wait(list(self.connections), timeout=grace)
+        # A client that stopped reading never lets a closing transport finish
+        for writer in self.connections.values():
+            writer.transport.abort()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        self.library.flush()
+
+    async def run_batches(self):
+        """Apply queued requests in arrival order, one batch per event-loop turn"""
+        while True:
+            batch = [await self.pending.get()]
+            while len(batch) < self.max_batch and not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+            mutated = False
+            for request, future in batch:
+                try:
+                    response = handle_request(self.library, request)
+                except (KeyError, TypeError, ValueError) as exc:
+                    response = {"ok": False, "error": f"Bad request: {exc!r}"}
+                except Exception as exc:  # A backend or shard failure must not stop the batcher for everyone
+                    response = {"ok": False, "error": f"Request failed: {exc!r}"}
+                mutated = mutated or request.get("op") in MUTATIONS
+                if not future.cancelled():
+                    future.set_result(response)
+            if mutated:
+                self.library.flush()
+            self.batches += 1
+            self.requests += len(batch)
+
+    async def serve_connection(self, reader, writer):
+        # Futures in request order; bounded so a client that never reads its responses stalls itself
+        in_flight = asyncio.Queue(self.max_in_flight)
+        responder = asyncio.create_task(self.write_responses(in_flight, writer))
+        loop = asyncio.get_running_loop()
+        handler = asyncio.current_task()
+        self.connections[handler] = writer
+        try:
+            while line := await self.read_line(reader):
+                if not line.strip():
+                    continue
+                future = loop.create_future()
+                request_id = None
+                request = None
+                if line is TOO_LONG:
+                    future.set_result({"ok": False, "error": f"Request line longer than {self.max_line} bytes"})
+                else:
+                    try:
+                        request = json.loads(line)
+                    except ValueError as exc:
+                        future.set_result({"ok": False, "error": f"Invalid JSON: {exc}"})
+                if isinstance(request, dict):
+                    request_id = request.get("id")
+                    await self.pending.put((request, future))
+                elif not future.done():
+                    future.set_result({"ok": False, "error": "Request must be a JSON object"})
+                await in_flight.put((request_id, future))
+        except ConnectionError:
+            pass
+        finally:
+            await in_flight.put(None)
+            await responder
+            del self.connections[handler]
+
+    @staticmethod
+    async def read_line(reader):
+        """The next line (the last may lack its newline; b"" at the end), or TOO_LONG for one over the limit
+
+        The rest of a line that is too long is read and dropped, so the next
+        request starts on a line of its own.
+        """
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as exc:
+            return exc.partial
+        except asyncio.LimitOverrunError as exc:
+            consumed = exc.consumed
+        while True:
+            await reader.readexactly(consumed)  # Already buffered
+            try:
+                await reader.readuntil(b"\n")
+                return TOO_LONG
+            except asyncio.IncompleteReadError:
+                return TOO_LONG
+            except asyncio.LimitOverrunError as exc:
+                consumed = exc.consumed
+
+    async def write_responses(self, in_flight, writer):
+        connected = True
+        while True:
+            item = await in_flight.get()
+            if item is None:
+                break
+            request_id, future = item
+            response = await future
+            if not connected:
+                continue  # Keep consuming so the reader never blocks on a dead connection
+            try:
+                writer.write(json.dumps({"id": request_id, **response}).encode() + b"\n")
+                await writer.drain()  # Returns at once unless the client has stopped reading
+            except ConnectionError:
+                connected = False
+        writer.close()
+
+
+class LibraryClient:
+    """Pipelining asyncio client: many request() calls may be awaited concurrently"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.waiting = {}  # {id: future}
+        self.receiver = asyncio.create_task(self.receive())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765, limit=16 * 1024 * 1024):
+        # Search responses can be far longer than asyncio's default 64 KiB line limit
+        reader, writer = await asyncio.open_connection(host, port, limit=limit)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = future
+        self.writer.write(json.dumps({"id": self.next_id, "op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def receive(self):
+        error = ConnectionError("Server closed the connection")
+        try:
+            async for line in self.reader:
+                response = json.loads(line)
+                self.waiting.pop(response["id"]).set_result(response)
+        except (ConnectionError, ValueError) as exc:
+            error = exc
+        # Nobody else would ever wake the callers still waiting
+        for future in self.waiting.values():
+            future.set_exception(error)
+        self.waiting.clear()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
+
+
+async def serve(library, host, port):
+    server = LibraryServer(library)
+    host, port = await server.start(host, port)
+    print(f"Serving {library.name} on {host}:{port}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a Library over line-delimited JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--catalog", help="CSV or JSONL catalog to import at startup")
+    parser.add_argument("--db", help="persist to this SQLite database instead of memory")
+    parser.add_argument("--log-directory", help="keep the transaction log in this directory")
+    parser.add_argument("--metrics-port", type=int, help="time every call and serve Prometheus /metrics here")
+    args = parser.parse_args()
+
+    if args.db:
+        from library_sqlite import SQLiteLibrary
+        library = SQLiteLibrary("Library Server", "n/a", args.db, log_directory=args.log_directory)
+    else:
+        library = Library("Library Server", "n/a", args.log_directory)
+    if args.catalog:
+        from library_import import import_catalog
+        summary = import_catalog(library, args.catalog)
+        print(f"Imported {summary['rows']:,} rows")
+    if args.metrics_port:
+        from library_metrics import instrument
+        instrument(library).serve(args.metrics_port, args.host)
+    try:
+        asyncio.run(serve(library, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
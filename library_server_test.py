@@ -0,0 +1,94 @@
+# Tests for library_server: a bad, oversized or failing request gets an error response and never stops the batcher
+import asyncio
+import json
+import unittest
+
+from library_server import LibraryServer
+from library_system import Book, BookGenre, Library
+
+
+class BrokenLibrary(Library):
+    """Library whose stats call fails the way a dead shard or database would"""
+
+    def get_library_stats(self, verify=False):
+        raise RuntimeError("backend went away")
+
+
+class BadRequestTest(unittest.TestCase):
+    def exchange(self, library, requests, **options):
+        """Responses to requests (dicts, or raw lines as bytes) sent on one connection, and whether the batcher lives"""
+        async def run():
+            server = LibraryServer(library, **options)
+            host, port = await server.start(port=0)
+            reader, writer = await asyncio.open_connection(host, port)
+            for request in requests:
+                writer.write(request if isinstance(request, bytes) else (json.dumps(request) + "\n").encode())
+            await writer.drain()
+            responses = [json.loads(await asyncio.wait_for(reader.readline(), 5)) for _ in requests]
+            batcher_alive = not server.batcher.done()
+            writer.close()
+            await server.stop()
+            return responses, batcher_alive
+
+        return asyncio.run(run())
+
+    def test_bad_field_types_then_good_request(self):
+        library = Library("Test", "n/a")
+        library.add_book(Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 2))
+        bad = [{"id": 1, "op": "search", "title": 5},
+               {"id": 2, "op": "search", "fuzzy": 5},
+               {"id": 3, "op": "members", "email": 5},
+               {"id": 4, "op": "borrow", "member_id": True, "isbn": "978-1"}]
+        responses, batcher_alive = self.exchange(library, bad + [{"id": 5, "op": "search", "title": "dune"}])
+        for response in responses[:-1]:
+            self.assertFalse(response["ok"])
+            self.assertIn("wrong type", response["error"])
+        self.assertEqual([response["id"] for response in responses], [1, 2, 3, 4, 5])
+        self.assertTrue(responses[-1]["ok"])
+        self.assertEqual(responses[-1]["count"], 1)
+        self.assertTrue(batcher_alive)
+
+    def test_backend_failure_then_good_request(self):
+        library = BrokenLibrary("Test", "n/a")
+        responses, batcher_alive = self.exchange(library, [{"id": 1, "op": "stats"},
+                                                           {"id": 2, "op": "search", "title": "dune"}])
+        self.assertFalse(responses[0]["ok"])
+        self.assertIn("backend went away", responses[0]["error"])
+        self.assertTrue(responses[1]["ok"])
+        self.assertTrue(batcher_alive)
+
+    def test_line_over_the_limit_then_good_requests(self):
+        library = Library("Test", "n/a")
+        library.add_book(Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 2))
+        search = {"id": 2, "op": "search", "title": "dune"}
+        # One line just over the limit, then one that arrives over many reads
+        responses, batcher_alive = self.exchange(library, [
+            {"id": 1, "op": "stats"},
+            b'{"id": 9, "op": "search", "title": "' + b"x" * 1100 + b'"}\n',
+            search,
+            b'{"id": 9, "op": "search", "title": "' + b"x" * 1000000 + b'"}\n',
+            {**search, "id": 3}], max_line=1024)
+        self.assertEqual([response["id"] for response in responses], [1, None, 2, None, 3])
+        self.assertEqual([response["ok"] for response in responses], [True, False, True, False, True])
+        self.assertIn("longer than 1024 bytes", responses[1]["error"])
+        self.assertEqual(responses[4]["count"], 1)
+        self.assertTrue(batcher_alive)
+
+    def test_limit_below_one_is_refused(self):
+        library = Library("Test", "n/a")
+        library.add_book(Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 2))
+        responses, batcher_alive = self.exchange(library, [{"id": 1, "op": "page", "of": "books", "limit": -1},
+                                                           {"id": 2, "op": "page", "of": "members", "limit": 0},
+                                                           {"id": 3, "op": "search", "title": "dune", "limit": -2},
+                                                           {"id": 4, "op": "page", "of": "books", "limit": 1}])
+        for response in responses[:-1]:
+            self.assertFalse(response["ok"])
+            self.assertIn("limit must be at least 1", response["error"])
+        self.assertEqual([book["isbn"] for book in responses[-1]["books"]], ["978-1"])
+        with self.assertRaises(ValueError):
+            library.page_books(limit=0)
+        self.assertTrue(batcher_alive)
+
+
+if __name__ == "__main__":
+    unittest.main()
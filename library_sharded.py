@@ -0,0 +1,439 @@
+"""
+Sharded multi-process deployment of the Library Management System
+ShardedLibrary partitions the catalog by ISBN hash across N worker processes.
+Each shard is a plain Library holding its books, their copies and its own
+transaction log. The coordinating process keeps the member roster, loans and
+fines, so cross-shard member limits (max_books, unpaid fines) are checked in
+one place before a request is routed to the shard that owns the book.
+
+    with ShardedLibrary("City Central Library", "123 Main Street", shards=4) as library:
+        library.add_books(books)
+        library.borrow_book(member_id, isbn)
+        library.find_books_by_author("Orwell")  # scattered to every shard and merged
+
+Book objects returned by searches are detached snapshots: their
+available_copies reflect the moment of the search.
+The coordinator is meant to be driven from one thread, e.g. by LibraryServer.
+"""
+
+import heapq
+import multiprocessing
+import os
+import zlib
+from itertools import islice
+from traceback import format_exc
+
+from library_system import BOOK_SORTS, LOG_SEGMENT_BYTES, Book, Library, TransactionOp
+
+
+def book_row(book):
+    return (book.isbn, book.title, book.author, book.genre, book.publication_year,
+            book.total_copies, book.available_copies)
+
+
+def book_from_row(row):
+    isbn, title, author, genre, publication_year, total_copies, available_copies = row
+    book = Book(isbn, title, author, genre, publication_year, total_copies)
+    book.available_copies = available_copies
+    return book
+
+
+class Shard:
+    """The books of one shard; lives in a worker process and only sees picklable rows"""
+
+    def __init__(self, number, log_directory=None, log_segment_bytes=LOG_SEGMENT_BYTES, max_log_segments=None):
+        if log_directory is not None:
+            log_directory = os.path.join(log_directory, f"shard-{number:02d}")
+        self.library = Library(f"Shard {number}", "n/a", log_directory, log_segment_bytes=log_segment_bytes,
+                               max_log_segments=max_log_segments)
+
+    def add_books(self, rows):
+        return self.library.add_books(Book(*row[:6]) for row in rows)
+
+    def borrow_copies(self, requests, now):
+        """Take one copy per (member_id, isbn) the coordinator has already checked"""
+        library = self.library
+        results = []
+        for member_id, isbn in requests:
+            book = library.books.get(isbn)
+            if book is None:
+                results.append((False, "Book not found"))
+            elif book.borrow(member_id):
+                library.log_transaction(TransactionOp.BORROW, member_id, isbn, now=now)
+                results.append((True, f"Successfully borrowed '{book.title}'"))
+            else:
+                results.append((False, "Book not available"))
+        return results
+
+    def return_copies(self, requests, now):
+        """Put back one copy per (member_id, isbn, fine); returns the titles, None for unknown ISBNs
+
+        A fine of None marks a request the coordinator already rejected; only
+        the title lookup is done for it.
+        """
+        library = self.library
+        titles = []
+        for member_id, isbn, fine in requests:
+            book = library.books.get(isbn)
+            if book is not None and fine is not None:
+                book.return_book(member_id)
+                library.log_transaction(TransactionOp.RETURN, member_id, isbn, fine, now=now)
+            titles.append(book.title if book is not None else None)
+        return titles
+
+    def copies_on_shelf(self, isbns):
+        return self.library.copies_on_shelf(isbns)
+
+    def find(self, method, args):
+        return [book_row(book) for book in getattr(self.library, method)(*args)]
+
+    def rows(self, isbns):
+        return [book_row(self.library.books[isbn]) for isbn in isbns]
+
+    def page(self, sort, after, limit):
+        """This shard's next (view entry, row) pairs in sort order"""
+        return [(entry, book_row(self.library.books[entry[1]]))
+                for entry in self.library.view("books", sort).page(after, limit)]
+
+    def fuzzy(self, query, limit):
+        return [(score, book_row(self.library.books[isbn])) for score, isbn in self.library.fuzzy_matches(query, limit)]
+
+    def stats(self, verify):
+        return self.library.get_library_stats(verify)
+
+    def recompute_stats(self):
+        return self.library.recompute_stats()
+
+    def flush(self):
+        self.library.flush()
+
+    def close(self):
+        self.library.transaction_log.close()
+
+
+def run_shard(connection, number, log_directory, log_segment_bytes, max_log_segments):
+    """Worker process loop: (method, args) in, (ok, result or traceback) out"""
+    shard = Shard(number, log_directory, log_segment_bytes, max_log_segments)
+    while True:
+        method, args = connection.recv()
+        try:
+            connection.send((True, getattr(shard, method)(*args)))
+        except Exception:
+            connection.send((False, format_exc()))
+        if method == "close":
+            break
+
+
+class ShardedLibrary(Library):
+    """Library whose catalog is spread over worker processes
+
+    Members, loans, fines and due dates stay in this process; self.books is
+    empty and every book operation is routed to the owning shard.
+    """
+
+    def __init__(self, name, address, shards=4, log_directory=None, chunk_size=50000, clock=None,
+                 log_segment_bytes=LOG_SEGMENT_BYTES, max_log_segments=None):
+        # The log limits apply to the members log and to each shard's log separately
+        members_log = os.path.join(log_directory, "members") if log_directory is not None else None
+        super().__init__(name, address, members_log, clock, log_segment_bytes, max_log_segments)
+        self.shards = shards
+        self.chunk_size = chunk_size
+        self.connections = []
+        self.processes = []
+        for number in range(shards):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_shard, args=(child, number, log_directory, log_segment_bytes, max_log_segments), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def shard_of(self, isbn):
+        # crc32 rather than hash(): str hashes differ between processes
+        return zlib.crc32(isbn.encode()) % self.shards
+
+    def call(self, calls):
+        """Send {shard: (method, args)} to all shards at once, then gather {shard: result}"""
+        for shard, message in calls.items():
+            self.connections[shard].send(message)
+        results = {}
+        failures = []
+        for shard in calls:
+            ok, result = self.connections[shard].recv()
+            if ok:
+                results[shard] = result
+            else:
+                failures.append(f"shard {shard}: {result}")
+        if failures:
+            raise RuntimeError("Shard call failed\n" + "\n".join(failures))
+        return results
+
+    def broadcast(self, method, *args):
+        results = self.call({shard: (method, args) for shard in range(self.shards)})
+        return [results[shard] for shard in range(self.shards)]
+
+    def gather(self, method, *args):
+        """Scatter a Library search to every shard and merge the books it finds"""
+        return [book_from_row(row) for rows in self.broadcast("find", method, args) for row in rows]
+
+    # Catalog
+
+    def add_book(self, book):
+        if self.store_book(book):
+            return f"New book added: '{book.title}'"
+        self.fill_holds(book.isbn)
+        return f"Added {book.total_copies} more copies of '{book.title}'"
+
+    def store_book(self, book):
+        shard = self.shard_of(book.isbn)
+        new_titles, _ = self.call({shard: ("add_books", ([book_row(book)],))})[shard]
+        return new_titles == 1
+
+    def add_books(self, books):
+        """Stream books to their shards chunk by chunk; returns (new_titles, merged)"""
+        new_titles = merged = 0
+        books = iter(books)
+        while True:
+            chunk = list(islice(books, self.chunk_size))
+            if not chunk:
+                break
+            rows = {}
+            for book in chunk:
+                rows.setdefault(self.shard_of(book.isbn), []).append(book_row(book))
+            for added, combined in self.call({shard: ("add_books", (batch,))
+                                              for shard, batch in rows.items()}).values():
+                new_titles += added
+                merged += combined
+            for book in chunk:
+                self.fill_holds(book.isbn)  # Returns at once unless the title has holds
+        return new_titles, merged
+
+    def copies_on_shelf(self, isbns):
+        wanted = {}
+        for isbn in isbns:
+            wanted.setdefault(self.shard_of(isbn), []).append(isbn)
+        on_shelf = {}
+        for copies in self.call({shard: ("copies_on_shelf", (batch,)) for shard, batch in wanted.items()}).values():
+            on_shelf.update(copies)
+        return on_shelf
+
+    # Scatter-gather searches
+
+    def find_book_by_title(self, title):
+        return self.gather("find_book_by_title", title)
+
+    def find_books_by_author(self, author):
+        return self.gather("find_books_by_author", author)
+
+    def find_books_by_genre(self, genre):
+        return self.gather("find_books_by_genre", genre)
+
+    def find_books_by_year(self, start_year, end_year):
+        books = self.gather("find_books_by_year", start_year, end_year)
+        books.sort(key=lambda book: book.publication_year)  # Each shard is oldest first; keep it so overall
+        return books
+
+    def find_available_books(self):
+        return self.gather("find_available_books")
+
+    def fuzzy_rows(self, query, limit):
+        """Each shard's best (score, row) matches, merged into the overall top limit"""
+        matches = [match for shard_matches in self.broadcast("fuzzy", query, limit) for match in shard_matches]
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
+
+    def fuzzy_matches(self, query, limit=10):
+        return [(score, row[0]) for score, row in self.fuzzy_rows(query, limit)]
+
+    def search_fuzzy(self, query, limit=10):
+        return [book_from_row(row) for _, row in self.fuzzy_rows(query, limit)]
+
+    def find_books(self, genre=None, start_year=None, end_year=None, available_only=False):
+        return self.gather("find_books", genre, start_year, end_year, available_only)
+
+    def page_books(self, sort="isbn", after=None, limit=50):
+        """Each shard's first limit books after the cursor, merged; the overall page is their first limit"""
+        if sort not in BOOK_SORTS:
+            raise ValueError(f"Unknown sort {sort!r}; expected one of {', '.join(BOOK_SORTS)}")
+        if limit < 1:
+            raise ValueError(f"Page limit must be at least 1, not {limit}")
+        page = list(islice(heapq.merge(*self.broadcast("page", sort, after, limit)), limit))
+        cursor = list(page[-1][0]) if len(page) == limit else None
+        return [book_from_row(row) for _, row in page], cursor
+
+    def lookup_books(self, isbns):
+        """Current copies of books by ISBN, fetched from the owning shards"""
+        isbns = list(isbns)
+        wanted = {}
+        for isbn in isbns:
+            wanted.setdefault(self.shard_of(isbn), []).append(isbn)
+        books = {}
+        for rows in self.call({shard: ("rows", (batch,)) for shard, batch in wanted.items()}).values():
+            books.update((row[0], book_from_row(row)) for row in rows)
+        return [books[isbn] for isbn in isbns]
+
+    # Circulation
+
+    def borrow_batch(self, requests, now=None):
+        """Borrow many (member_id, isbn) pairs at once; returns one (success, message) per pair
+
+        The shards first report the copies on their shelves. Every request is
+        then checked here in order, exactly as Library.borrow_book would check
+        it one at a time, so a copy or a loan slot a failed request did not
+        use stays free for the requests after it. Every shard then lends its
+        part of the batch in parallel.
+        """
+        now = now or self.clock.now()
+        results = [None] * len(requests)
+        on_shelf = self.copies_on_shelf(list(dict.fromkeys(isbn for _, isbn in requests)))
+        routed = {}  # {shard: [(position, member_id, isbn)]}
+        loans = {}  # {member_id: loans counting the ones granted earlier in this batch}
+        taking = set()  # (member_id, isbn) pairs granted earlier in this batch
+        for position, (member_id, isbn) in enumerate(requests):
+            member = self.members.get(member_id)
+            if member is None:
+                results[position] = (False, "Member not found")
+            elif isbn not in on_shelf:
+                results[position] = (False, "Book not found")
+            elif loans.get(member_id, len(member.borrowed_books)) >= member.max_books or member.fines != 0:
+                results[position] = (False, "Cannot borrow: Limit reached or fines pending")
+            elif isbn in member.borrowed_books or (member_id, isbn) in taking:
+                results[position] = (False, "You already have this book")
+            elif on_shelf[isbn] <= 0:
+                results[position] = (False, "Book not available")
+            else:
+                on_shelf[isbn] -= 1
+                loans[member_id] = loans.get(member_id, len(member.borrowed_books)) + 1
+                taking.add((member_id, isbn))
+                routed.setdefault(self.shard_of(isbn), []).append((position, member_id, isbn))
+
+        replies = self.call({shard: ("borrow_copies", ([item[1:] for item in items], now))
+                             for shard, items in routed.items()})
+        for shard, items in routed.items():
+            for (position, member_id, isbn), (success, message) in zip(items, replies[shard]):
+                if success:
+                    member = self.members[member_id]
+                    member.borrowed_books[isbn] = now
+                    self.on_loan_started(member, isbn, now)
+                    self.on_borrowed(isbn, now)
+                results[position] = (success, message)
+        return results
+
+    def return_batch(self, requests, now=None):
+        """Return many (member_id, isbn) pairs at once; returns one (success, message, fine) per pair"""
+        now = now or self.clock.now()
+        results = [None] * len(requests)
+        routed = {}  # {shard: [(position, member_id, isbn, fine or None if not on loan)]}
+        returning = set()
+        for position, (member_id, isbn) in enumerate(requests):
+            member = self.members.get(member_id)
+            if member is None:
+                results[position] = (False, "Member not found", 0)
+                continue
+            fine = None
+            if isbn in member.borrowed_books and (member_id, isbn) not in returning:
+                returning.add((member_id, isbn))
+                fine = member.fine_for((now - member.borrowed_books[isbn]).days)
+            routed.setdefault(self.shard_of(isbn), []).append((position, member_id, isbn, fine))
+
+        replies = self.call({shard: ("return_copies", ([item[1:] for item in items], now))
+                             for shard, items in routed.items()})
+        for shard, items in routed.items():
+            for (position, member_id, isbn, fine), title in zip(items, replies[shard]):
+                if title is None:
+                    results[position] = (False, "Book not found", 0)
+                    continue
+                if fine is None:
+                    results[position] = (False, "You haven't borrowed this book", 0)
+                    continue
+                member = self.members[member_id]
+                borrow_date = member.borrowed_books.pop(isbn)
+                days_borrowed = (now - borrow_date).days
+                if fine:
+                    member.fines += fine
+                    self.on_fines_changed(member, fine)
+                self.on_loan_ended(member, isbn)
+                member.borrowing_history.append({
+                    "isbn": isbn,
+                    "book": title,
+                    "borrow_date": borrow_date,
+                    "return_date": now,
+                    "days": days_borrowed,
+                    "fine": fine
+                })
+                results[position] = (True, f"Returned '{title}' after {days_borrowed} days", fine)
+        for _, isbn in returning:
+            self.fill_holds(isbn, now)
+        return results
+
+    def borrow_book(self, member_id, isbn, now=None):
+        return self.borrow_batch([(member_id, isbn)], now)[0]
+
+    def return_book(self, member_id, isbn, now=None):
+        return self.return_batch([(member_id, isbn)], now)[0]
+
+    def borrow_many(self, member_id, isbns, atomic=False, now=None):
+        member = self.members.get(member_id)
+        if member is None:
+            return False, [(isbn, False, "Member not found") for isbn in isbns]
+        if atomic:
+            problems = self.basket_problems(member, isbns)
+            if problems:
+                return False, [(isbn, False, problems.get(position, "Not borrowed: basket rejected"))
+                               for position, isbn in enumerate(isbns)]
+        results = self.borrow_batch([(member_id, isbn) for isbn in isbns], now)
+        return all(success for success, _ in results), [
+            (isbn, success, message) for isbn, (success, message) in zip(isbns, results)]
+
+    def return_many(self, member_id, isbns, now=None):
+        results = self.return_batch([(member_id, isbn) for isbn in isbns], now)
+        return sum(fine for _, _, fine in results), [
+            (isbn, success, message, fine) for isbn, (success, message, fine) in zip(isbns, results)]
+
+    # Stats and lifecycle
+
+    def get_library_stats(self, verify=False):
+        """Shard totals summed with the coordinator's member totals
+
+        With verify=True every shard checks its own counters and the
+        coordinator checks its fine total.
+        """
+        stats = {"total_books": 0, "unique_titles": 0, "available_books": 0, "borrowed_books": 0}
+        for shard_stats in self.broadcast("stats", verify):
+            for key in stats:
+                stats[key] += shard_stats[key]
+        stats["total_members"] = len(self.members)
+        stats["total_fines_pending"] = self.pending_fines
+        if verify:
+            expected = self.recompute_stats()
+            drift = {key: (stats[key], value) for key, value in expected.items()
+                     if abs(stats[key] - value) > 1e-6}
+            if drift:
+                raise RuntimeError(f"Library stats out of sync (counter, recomputed): {drift}")
+        return stats
+
+    def recompute_stats(self):
+        stats = {"total_books": 0, "unique_titles": 0, "available_books": 0, "borrowed_books": 0}
+        for shard_stats in self.broadcast("recompute_stats"):
+            for key in stats:
+                stats[key] += shard_stats[key]
+        stats["total_members"] = len(self.members)
+        stats["total_fines_pending"] = sum(member.fines for member in self.members.values())
+        return stats
+
+    def flush(self):
+        super().flush()
+        self.broadcast("flush")
+
+    def close(self):
+        self.broadcast("close")
+        for process in self.processes:
+            process.join()
+        self.transaction_log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
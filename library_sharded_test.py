@@ -0,0 +1,63 @@
+# Tests for library_sharded: a batch of borrows gets the same answers as plain Library.borrow_book calls
+import random
+import unittest
+from datetime import datetime
+
+from library_sharded import ShardedLibrary
+from library_system import Book, BookGenre, Library, Member, SimulatedClock
+
+TITLES = 12
+MEMBERS = 6
+
+
+def stock(library):
+    """Titles with one or two copies, and members of every type; returns the member IDs"""
+    library.add_books(Book(f"978-{i}", f"Title {i}", "Author", BookGenre.FICTION, 2000, 1 + i % 2)
+                      for i in range(TITLES))
+    return [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:04d}",
+                                           ("Regular", "Premium", "Student")[i % 3]))
+            for i in range(MEMBERS)]
+
+
+class BorrowBatchTest(unittest.TestCase):
+    def setUp(self):
+        clock = SimulatedClock(datetime(2024, 1, 1))
+        self.plain = Library("Plain", "n/a", clock=clock)
+        self.sharded = ShardedLibrary("Sharded", "n/a", shards=3, clock=clock)
+        self.plain_ids = stock(self.plain)
+        self.sharded_ids = stock(self.sharded)
+
+    def tearDown(self):
+        self.sharded.close()
+
+    def both(self, action):
+        """action(library, member IDs) on the plain and the sharded library; both results"""
+        return action(self.plain, self.plain_ids), action(self.sharded, self.sharded_ids)
+
+    def test_refused_item_does_not_use_up_the_limit(self):
+        def borrow(library, ids):
+            library.borrow_book(ids[1], "978-2")  # The only copy
+            library.borrow_book(ids[0], "978-0")  # One of a Regular member's 3 loans
+            return library.borrow_many(ids[0], ["978-2", "978-4", "978-6"])
+
+        plain, sharded = self.both(borrow)
+        self.assertEqual(sharded, plain)
+        self.assertEqual([success for _, success, _ in plain[1]], [False, True, True])
+
+    def test_random_batches_match_one_at_a_time_borrows(self):
+        rng = random.Random(14)
+        isbns = [f"978-{i}" for i in range(TITLES + 1)]  # The last one is not in the catalog
+        for _ in range(200):
+            picks = [(rng.randrange(MEMBERS + 1), rng.choice(isbns)) for _ in range(rng.randint(1, 8))]
+            expected = [self.plain.borrow_book((self.plain_ids + [0])[member], isbn) for member, isbn in picks]
+            results = self.sharded.borrow_batch([((self.sharded_ids + [0])[member], isbn) for member, isbn in picks])
+            self.assertEqual(results, expected, picks)
+            for member in range(MEMBERS):
+                for isbn in list(self.plain.members[self.plain_ids[member]].borrowed_books):
+                    if rng.random() < 0.3:
+                        self.plain.return_book(self.plain_ids[member], isbn)
+                        self.sharded.return_book(self.sharded_ids[member], isbn)
+
+
+if __name__ == "__main__":
+    unittest.main()
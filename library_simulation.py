@@ -0,0 +1,189 @@
+"""
+Discrete-event simulation of library circulation
+Runs a Library on a SimulatedClock and replays synthetic traffic as fast as the
+CPU allows: members sign up and visit, borrow Zipf-popular titles, return them
+(some late), pay their fines and get overdue notices. The same seed always
+produces the same run, so it serves both capacity planning and repeatable
+performance tests.
+
+    library = Library("Simulated", "n/a", clock=SimulatedClock(datetime(2024, 1, 1)))
+    simulation = CirculationSimulation(library, seed=7)
+    simulation.populate(members=5000, books=20000)
+    summary = simulation.run(days=365)
+
+Usage: python library_simulation.py [--days 365] [--members 5000] [--books 20000] [--seed 0]
+"""
+
+import argparse
+import heapq
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate, count
+
+from library_system import Book, BookGenre, Library, Member, SimulatedClock
+
+DAY = timedelta(days=1)
+MEMBERSHIP_MIX = (("Regular", 60), ("Student", 25), ("Premium", 15))
+
+
+class CirculationSimulation:
+    """Event queue of member activity driving a Library through simulated time
+
+    Events are (time, sequence, handler, arguments) on a heap. Each handler
+    runs with the library's clock set to the event time and may schedule
+    more events. Nothing here sleeps, so a year takes as long as the
+    library operations it triggers.
+    """
+
+    def __init__(self, library, seed=0, visit_days=14, late_rate=0.1, pay_rate=0.8, signups_per_day=5, skew=0.8):
+        if not isinstance(library.clock, SimulatedClock):
+            raise ValueError("CirculationSimulation needs a Library with a SimulatedClock")
+        self.library = library
+        self.clock = library.clock
+        self.rng = random.Random(seed)
+        self.visit_days = visit_days  # Mean days between a member's visits
+        self.late_rate = late_rate  # Share of loans kept past the due date
+        self.pay_rate = pay_rate  # Chance a member with fines pays them at a visit
+        self.signups_per_day = signups_per_day
+        self.skew = skew  # Zipf exponent of title popularity
+        self.events = []
+        self.sequence = count()  # Tie-break, so equal times run in scheduling order
+        self.isbns = []
+        self.popularity = []  # Cumulative weights over isbns
+        self.counts = Counter()
+        self.signups = 0
+
+    def schedule(self, moment, handler, *arguments):
+        heapq.heappush(self.events, (moment, next(self.sequence), handler, arguments))
+
+    def populate(self, members, books, copies=(1, 5)):
+        """Stock the catalog with books titles (Zipf popularity) and register members
+
+        Each title gets a random number of copies in the copies range, plus
+        extra copies in proportion to its share of demand, as a real library
+        would buy for its most popular titles.
+        """
+        genres = list(BookGenre)
+        start = len(self.isbns)
+        self.isbns += [f"978-{number:010d}" for number in range(start, start + books)]
+        weights = [1 / rank ** self.skew for rank in range(1, len(self.isbns) + 1)]
+        # About one copy on loan per member at a time, spread by popularity
+        stock = (self.signups + members) / sum(weights)
+        self.library.add_books(Book(isbn, f"Title {rank}", f"Author {rank % 2000}", genres[rank % len(genres)],
+                                    1900 + rank % 125, self.rng.randint(*copies) + int(stock * weights[rank]))
+                               for rank, isbn in enumerate(self.isbns[start:], start))
+        self.popularity = list(accumulate(weights))
+        for _ in range(members):
+            self.sign_up()
+
+    def sign_up(self):
+        number = self.signups
+        self.signups += 1
+        membership = self.rng.choices([name for name, _ in MEMBERSHIP_MIX],
+                                      [weight for _, weight in MEMBERSHIP_MIX])[0]
+        member = Member(f"Simulated Member {number}", f"member{number}@sim.example", f"555-{number:07d}",
+                        membership)
+        member_id = self.library.register_member(member)
+        self.counts["signups"] += 1
+        self.schedule_visit(member_id)
+
+    def schedule_visit(self, member_id):
+        self.schedule(self.clock.now() + DAY * self.rng.expovariate(1 / self.visit_days), self.visit, member_id)
+
+    def schedule_signup(self):
+        self.schedule(self.clock.now() + DAY * self.rng.expovariate(self.signups_per_day), self.signup_event)
+
+    def signup_event(self):
+        self.sign_up()
+        self.schedule_signup()
+
+    def visit(self, member_id):
+        library = self.library
+        member = library.members[member_id]
+        now = self.clock.now()
+        self.counts["visits"] += 1
+        if member.fines:
+            if self.rng.random() < self.pay_rate:
+                self.counts["fines_paid"] += member.fines
+                library.pay_fine(member_id, member.fines)
+            else:
+                self.counts["refused_for_fines"] += 1
+        wanted = min(self.rng.randint(1, 3), member.max_books - len(member.borrowed_books))
+        for isbn in self.rng.choices(self.isbns, cum_weights=self.popularity, k=max(wanted, 0)):
+            if isbn in member.borrowed_books:
+                continue
+            success, _ = library.borrow_book(member_id, isbn, now)
+            if not success:
+                self.counts["borrow_failures"] += 1
+                continue
+            self.counts["borrows"] += 1
+            if self.rng.random() < self.late_rate:
+                days = member.borrow_duration + 1 + self.rng.expovariate(1 / 7)
+            else:
+                days = self.rng.uniform(1, member.borrow_duration)
+            self.schedule(now + DAY * days, self.give_back, member_id, isbn)
+        self.schedule_visit(member_id)
+
+    def give_back(self, member_id, isbn):
+        _, _, fine = self.library.return_book(member_id, isbn, self.clock.now())
+        self.counts["returns"] += 1
+        if fine:
+            self.counts["late_returns"] += 1
+            self.counts["fines_charged"] += fine
+
+    def daily(self):
+        # The desk's morning run of overdue notices
+        self.counts["overdue_notices"] += len(self.library.newly_overdue_loans(self.clock.now()))
+        self.schedule(self.clock.now() + DAY, self.daily)
+
+    def run(self, days=365):
+        """Process every event in the next `days` simulated days; returns a summary dict"""
+        end = self.clock.now() + DAY * days
+        if self.signups_per_day:
+            self.schedule_signup()
+        self.schedule(self.clock.now() + DAY, self.daily)
+        events = 0
+        started = time.perf_counter()
+        while self.events and self.events[0][0] <= end:
+            moment, _, handler, arguments = heapq.heappop(self.events)
+            self.clock.set(moment)
+            handler(*arguments)
+            events += 1
+        self.clock.set(end)
+        seconds = time.perf_counter() - started
+        summary = dict(self.counts)
+        summary.update({"days": days, "events": events, "seconds": seconds,
+                        "events_per_sec": events / seconds if seconds else 0.0,
+                        "simulated_days_per_sec": days / seconds if seconds else 0.0})
+        summary.update(self.library.get_library_stats())
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate library circulation against a simulated clock")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--members", type=int, default=5000, help="members registered before day one")
+    parser.add_argument("--books", type=int, default=20000, help="titles in the catalog")
+    parser.add_argument("--signups-per-day", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    library = Library("Simulated Library", "n/a", clock=SimulatedClock())
+    simulation = CirculationSimulation(library, args.seed, signups_per_day=args.signups_per_day)
+    simulation.populate(args.members, args.books)
+    summary = simulation.run(args.days)
+    print(f"Simulated {summary['days']} days in {summary['seconds']:.2f}s "
+          f"({summary['events']:,} events, {summary['events_per_sec']:,.0f} events/sec, "
+          f"{summary['simulated_days_per_sec']:,.1f} days/sec)")
+    print(f"  {summary.get('signups', 0):,} members, {summary.get('visits', 0):,} visits, "
+          f"{summary.get('borrows', 0):,} borrows ({summary.get('borrow_failures', 0):,} turned away), "
+          f"{summary.get('returns', 0):,} returns ({summary.get('late_returns', 0):,} late)")
+    print(f"  fines charged ${summary.get('fines_charged', 0):,.2f}, paid ${summary.get('fines_paid', 0):,.2f}, "
+          f"{summary.get('overdue_notices', 0):,} overdue notices, "
+          f"{summary['borrowed_books']:,} copies out at the end")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+Snapshots and fast startup for the Library Management System
+A snapshot is a compact pickle of the whole Library state (books, members,
+active loans, fines, history, hold queues and Member.member_id_counter) tagged with the
+TransactionLog position it covers. Startup loads the newest snapshot and
+replays only the log records appended after it. Restored members stay as
+snapshot columns until first used (see SnapshotRoster), so startup skips
+most of the per-member work; the first email, name or overdue query pays
+for building its index instead:
+
+    library = open_library("City Central Library", "123 Main Street",
+                           snapshot_directory="snapshots", log_directory="txlog")
+    snapshotter = Snapshotter(library, "snapshots", every=100000)
+    ...
+    snapshotter.maybe_snapshot()  # e.g. from a periodic timer
+
+A log capped with max_log_segments drops its oldest segments, and startup
+fails with "Log segment N is no longer available" if the newest snapshot
+predates them. Snapshotter refuses an `every` the cap cannot cover: the log
+must keep at least every records plus one segment. Only the newest snapshot
+is sure to be covered; the older ones Snapshotter keeps may not be.
+"""
+
+import bisect
+import gc
+import os
+import pickle
+import threading
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate, chain
+
+from library_system import (DAY_US, LOG_SEGMENT_BYTES, Book, BookGenre, BorrowerMultiset, BorrowingHistory, Library,
+                            LoanTable, Member, from_epoch_us, to_epoch_us, wall_us)
+
+# 2 added the isbn to history entries, 3 stores history as packed records, 4 adds holds,
+# 5 packs member numbers and loans into arrays and stores borrower counts
+SNAPSHOT_VERSION = 5
+MEMBERSHIP_TYPES = list(Member.MEMBERSHIP_CODES)  # Type names by code
+SEPARATOR = "\x00"  # Joins a text column into one string, which pickles and loads far faster than a list
+
+
+def pack_texts(texts):
+    """(one joined string, offsets of each text in it), or (the list itself, None) if a text contains SEPARATOR
+
+    Text i is joined[starts[i]:starts[i + 1] - 1].
+    """
+    joined = SEPARATOR.join(texts)
+    if joined.count(SEPARATOR) != max(len(texts) - 1, 0):
+        return texts, None
+    return joined, array("q", accumulate((len(text) + 1 for text in texts), initial=0))
+
+
+def unpack_texts(packed, starts):
+    return packed if starts is None else TextColumn(packed, starts)
+
+
+class TextColumn:
+    """Read-only list of texts sliced out of one joined string as they are asked for
+
+    Restoring keeps a few big strings instead of millions of small ones;
+    iterating splits the whole column at once.
+    """
+
+    __slots__ = ("joined", "starts")
+
+    def __init__(self, joined, starts):
+        self.joined = joined
+        self.starts = starts
+
+    def __getitem__(self, row):
+        return self.joined[self.starts[row]:self.starts[row + 1] - 1]
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __iter__(self):
+        return iter(self.joined.split(SEPARATOR) if len(self) else ())
+
+
+@contextmanager
+def paused_gc():
+    """Millions of new long-lived objects would otherwise trigger repeated full GC passes"""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def snapshot_state(library):
+    """Plain tuples describing the whole library; cheap to pickle and unpickle"""
+    books = [(book.isbn, book.title, book.author, book.genre.name, book.publication_year,
+              book.total_copies, book.available_copies, dict(book.borrowed_by.counts))
+             for book in library.books.values()]
+    # Members are stored column by column, history only for members that have some. Loans are
+    # columns too: member i's loans are rows loan_start[i] to loan_start[i + 1], and loan_due and
+    # loan_type are the LoanTable's own columns.
+    roster = list(library.members.values())
+    codes = Member.MEMBERSHIP_CODES
+    loans = [(member, isbn, date) for member in roster for isbn, date in member.borrowed_books.items()]
+    loan_start = array("q", [0])
+    for member in roster:
+        loan_start.append(loan_start[-1] + len(member.borrowed_books))
+    member_ids = array("q", [member.member_id for member in roster])
+    members = {
+        "member_id": member_ids,
+        "ascending": all(earlier < later for earlier, later in zip(member_ids, member_ids[1:])),
+        # Texts as (joined, starts) pairs from pack_texts
+        "name": pack_texts([member.name for member in roster]),
+        "email": pack_texts([member.email for member in roster]),
+        "phone": pack_texts([member.phone for member in roster]),
+        "membership_type": array("b", [codes[member.membership_type] for member in roster]),
+        "registered": array("q", [to_epoch_us(member.registration_date) for member in roster]),
+        "fines": array("d", [member.fines for member in roster]),
+        "loan_start": loan_start,
+        "loan_member": array("q", [member.member_id for member, _, _ in loans]),
+        "loan_isbn": [isbn for _, isbn, _ in loans],
+        "loan_borrowed": array("q", [to_epoch_us(date) for _, _, date in loans]),
+        "loan_due": array("q", [wall_us(date) + member.borrow_duration * DAY_US for member, _, date in loans]),
+        "loan_type": array("b", [codes[member.membership_type] for member, _, _ in loans]),
+        # Packed BorrowingHistory records (book numbers index history_books) and archive chunks
+        "history": {member.member_id: (bytes(member.borrowing_history.records), member.borrowing_history.archived)
+                    for member in roster if member.borrowing_history},
+        "history_books": list(BorrowingHistory.books),
+    }
+    return {
+        "version": SNAPSHOT_VERSION,
+        "name": library.name,
+        "address": library.address,
+        "member_id_counter": Member.member_id_counter,
+        "log_position": library.transaction_log.tail_position(),
+        "books": books,
+        "members": members,
+        # Each title's holds in serving order, as (member_id, expires)
+        "holds": [(isbn, [(member_id, to_epoch_us(expires)) for member_id, expires in queue.members()])
+                  for isbn, queue in library.holds.items()],
+    }
+
+
+def save_snapshot(library, directory):
+    """Write a snapshot atomically and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    library.transaction_log.flush()
+    number, count = library.transaction_log.tail_position()
+    path = os.path.join(directory, f"snapshot-{number:08d}-{count:010d}.pickle")
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        pickle.dump(snapshot_state(library), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+    return path
+
+
+def list_snapshots(directory):
+    """Snapshot paths, oldest first (names sort by log position)"""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith("snapshot-") and name.endswith(".pickle")]
+
+
+class SnapshotRoster(dict):
+    """Library.members for a restored library: each restored Member is built on first access
+
+    Until then a member is a row of the snapshot's member columns. Lookups,
+    `in` and len() never build more than the member asked for; iterating
+    values() or items() (e.g. get_library_stats(verify=True) or the next
+    snapshot) builds every member still missing. Keys iterate in snapshot
+    order, then members added since.
+    """
+
+    def __init__(self, library, columns, renumber):
+        super().__init__()
+        self.library = library
+        self.columns = columns
+        self.renumber = renumber
+        self.ids = columns["member_id"]
+        self.rows = None  # {member_id: row}, only needed if the IDs are out of order
+        if not columns["ascending"]:
+            self.rows = dict(zip(self.ids, range(len(self.ids))))
+        self.built = 0  # Restored members built so far
+        self.lock = threading.Lock()  # Two threads asking for one member must get the same object
+
+    def row(self, member_id):
+        """The member's row in the snapshot columns, or None if they were not restored"""
+        if self.rows is not None:
+            return self.rows.get(member_id)
+        # IDs are handed out in increasing order, so a roster normally stays sorted by them
+        row = bisect.bisect_left(self.ids, member_id)
+        return row if row < len(self.ids) and self.ids[row] == member_id else None
+
+    def build(self, member_id, row):
+        with self.lock:
+            member = dict.get(self, member_id)
+            if member is not None:
+                return member
+            columns = self.columns
+            member = Member(columns["name"][row], columns["email"][row], columns["phone"][row],
+                            MEMBERSHIP_TYPES[columns["membership_type"][row]], member_id=member_id,
+                            registration_date=from_epoch_us(columns["registered"][row]))
+            member.fines = columns["fines"][row]
+            for loan in range(columns["loan_start"][row], columns["loan_start"][row + 1]):
+                member.borrowed_books[columns["loan_isbn"][loan]] = from_epoch_us(columns["loan_borrowed"][loan])
+            if member_id in columns["history"]:
+                records, archived = columns["history"][member_id]
+                member.borrowing_history = BorrowingHistory.from_records(records, archived, self.renumber)
+            member.library = self.library
+            dict.__setitem__(self, member_id, member)
+            self.built += 1
+            return member
+
+    def __missing__(self, member_id):
+        row = self.row(member_id)
+        if row is None:
+            raise KeyError(member_id)
+        return self.build(member_id, row)
+
+    def get(self, member_id, default=None):
+        member = dict.get(self, member_id)
+        if member is None:
+            row = self.row(member_id)
+            if row is None:
+                return default
+            member = self.build(member_id, row)
+        return member
+
+    def __contains__(self, member_id):
+        return dict.__contains__(self, member_id) or self.row(member_id) is not None
+
+    def __len__(self):
+        return len(self.ids) + dict.__len__(self) - self.built
+
+    def __iter__(self):
+        added = [member_id for member_id in dict.keys(self) if self.row(member_id) is None]
+        return chain(self.ids, added)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[member_id] for member_id in self]
+
+    def items(self):
+        return [(member_id, self[member_id]) for member_id in self]
+
+
+def restore_roster(library, members, renumber):
+    """Install the member columns of a version 5 snapshot without building any Member"""
+    library.members = SnapshotRoster(library, members, renumber)
+    library.pending_fines += sum(members["fines"])
+    library.member_names.add_later(members["member_id"], members["name"])
+    library.unindexed_contacts.append((members["member_id"], members["email"], members["phone"]))
+    library.loan_table = LoanTable.from_columns(members["loan_member"], members["loan_due"],
+                                                members["loan_type"], members["loan_isbn"])
+    library.due_dates.defer_to(library.loan_table)
+
+
+def restore_members(library, members, version, renumber):
+    """Build and store every Member of a version 1 to 4 snapshot"""
+    loans = members["loans"]
+    history = members["history"]
+    for member_id, name, email, phone, membership_type, registered, fines in zip(
+            members["member_id"], members["name"], members["email"], members["phone"],
+            members["membership_type"], members["registered"], members["fines"]):
+        member = Member(name, email, phone, membership_type, member_id=member_id,
+                        registration_date=from_epoch_us(registered))
+        member.fines = fines
+        if member_id in loans:
+            for isbn, borrowed in loans[member_id]:
+                member.borrowed_books[isbn] = from_epoch_us(borrowed)
+        if member_id in history and version >= 3:
+            records, archived = history[member_id]
+            member.borrowing_history = BorrowingHistory.from_records(records, archived, renumber)
+        elif member_id in history:
+            entries = history[member_id]
+            if version == 1:
+                entries = [(None,) + entry for entry in entries]
+            member.borrowing_history = BorrowingHistory(
+                {"isbn": isbn, "book": title, "borrow_date": from_epoch_us(borrow_date),
+                 "return_date": from_epoch_us(return_date), "days": days, "fine": fine}
+                for isbn, title, borrow_date, return_date, days, fine in entries)
+        library.store_member(member)
+
+
+def restore_state(library, state):
+    """Load snapshot state into an empty library"""
+    if state["version"] not in (1, 2, 3, 4, SNAPSHOT_VERSION):
+        raise ValueError(f"Unsupported snapshot version: {state['version']}")
+    library.restoring = True
+    try:
+        genres = {genre.name: genre for genre in BookGenre}
+        # Borrowers are a {member_id: count} dict from version 5 on, a list of member IDs before
+        borrowed_by = BorrowerMultiset.from_counts if state["version"] >= 5 else BorrowerMultiset
+        books = []
+        for isbn, title, author, genre, year, total, available, borrowers in state["books"]:
+            book = Book(isbn, title, author, genres[genre], year, total)
+            book.available_copies = available
+            book.borrowed_by = borrowed_by(borrowers)
+            books.append(book)
+        library.restore_books(books)
+
+        members = state["members"]
+        renumber = None
+        if state["version"] >= 3:
+            renumber = [BorrowingHistory.book_number(isbn, title) for isbn, title in members["history_books"]]
+            if renumber == list(range(len(renumber))):
+                renumber = None  # Same numbering as this process, e.g. a fresh one: records load as they are
+        if state["version"] >= 5:
+            for column in ("name", "email", "phone"):
+                members[column] = unpack_texts(*members[column])
+            restore_roster(library, members, renumber)
+        else:
+            restore_members(library, members, state["version"], renumber)
+
+        for isbn, holders in state.get("holds", ()):
+            for member_id, expires in holders:
+                library.add_hold(library.members[member_id], isbn, from_epoch_us(expires))
+    finally:
+        library.restoring = False
+    with Member.id_lock:
+        Member.member_id_counter = max(Member.member_id_counter, state["member_id_counter"])
+
+
+def open_library(name, address, snapshot_directory, log_directory, log_segment_bytes=LOG_SEGMENT_BYTES,
+                 max_log_segments=None, clock=None, library_class=Library):
+    """Library from the newest snapshot plus a replay of the log tail after it
+
+    Without a snapshot the whole log is replayed. The number of replayed
+    records is left in library.replayed_records. Raises ValueError if the
+    log has dropped records the snapshot does not cover. library_class may
+    be a Library subclass with the same constructor keywords, such as
+    ConcurrentLibrary.
+    """
+    library = library_class(name, address, log_directory=log_directory, clock=clock,
+                            log_segment_bytes=log_segment_bytes, max_log_segments=max_log_segments)
+    position = (0, 0)
+    snapshots = list_snapshots(snapshot_directory)
+    if snapshots:
+        with paused_gc():
+            with open(snapshots[-1], "rb") as f:
+                state = pickle.load(f)
+            restore_state(library, state)
+        position = tuple(state["log_position"])
+
+    replayed = 0
+    for record in library.transaction_log.records_since(position):
+        library.apply_transaction(record)
+        replayed += 1
+    library.replayed_records = replayed
+    return library
+
+
+class Snapshotter:
+    """Takes a snapshot once the log has grown by `every` records and keeps the newest `keep`"""
+
+    def __init__(self, library, directory, every=100000, keep=3):
+        log = library.transaction_log
+        # The segment holding the last snapshot's position must outlive the next snapshot
+        if log.max_segments is not None and every > (log.max_segments - 1) * log.segment_records:
+            raise ValueError(f"A log capped at {log.max_segments} segments of {log.segment_records} records "
+                             f"would drop records before a snapshot every {every} records covers them")
+        self.library = library
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.last_size = self.log_size()
+
+    def log_size(self):
+        """Records appended so far, counting those a capped log has dropped"""
+        return len(self.library.transaction_log) + self.library.transaction_log.dropped
+
+    def maybe_snapshot(self):
+        """Snapshot if enough has happened since the last one; returns the new path or None"""
+        if self.log_size() - self.last_size < self.every:
+            return None
+        return self.snapshot()
+
+    def snapshot(self):
+        path = save_snapshot(self.library, self.directory)
+        self.last_size = self.log_size()
+        for old in list_snapshots(self.directory)[:-self.keep]:
+            os.remove(old)
+        return path
@@ -0,0 +1,123 @@
+# Tests for library_snapshot: open_library brings back the same library, builds members only as they are asked
+# for, refuses a snapshot its capped log no longer reaches and leaves nothing behind in the collector
+import gc
+import os
+import tempfile
+import unittest
+import weakref
+from datetime import datetime, timedelta
+
+from library_concurrent import ConcurrentLibrary
+from library_snapshot import SnapshotRoster, Snapshotter, open_library
+from library_system import Book, BookGenre, Library, Member, SimulatedClock, TransactionLog
+
+
+def state(library):
+    """Copies and borrowers of every book; loans, fines, history and holds of every member"""
+    books = {isbn: (book.available_copies, dict(book.borrowed_by.counts)) for isbn, book in library.books.items()}
+    members = {member_id: (member.name, member.email, member.phone, member.membership_type, member.fines,
+                           dict(member.borrowed_books), list(member.borrowing_history),
+                           {isbn: library.hold_position(member_id, isbn) for isbn in library.books})
+               for member_id, member in library.members.items()}
+    return books, members, library.get_library_stats()
+
+
+class OpenLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_directory = os.path.join(self.directory.name, "log")
+        self.snapshot_directory = os.path.join(self.directory.name, "snapshots")
+        self.clock = SimulatedClock(datetime(2024, 3, 1))
+        self.library = library = Library("Test", "n/a", self.log_directory, clock=self.clock)
+        library.add_books(Book(f"978-{i}", f"Title {i}", f"Author {i % 3}", BookGenre.FICTION, 2000 + i, 2)
+                          for i in range(10))
+        self.member_ids = [library.register_member(Member(f"Member {i}", f"m{i}@email.com", f"555-{i:04d}",
+                                                          ("Regular", "Premium", "Student")[i % 3]))
+                           for i in range(20)]
+        for i, member_id in enumerate(self.member_ids[:8]):
+            library.borrow_book(member_id, f"978-{i % 5}")
+        library.place_hold(self.member_ids[9], "978-0")
+        self.clock.advance(timedelta(days=40))
+        library.return_book(self.member_ids[1], "978-1")  # Late: history and a fine
+        Snapshotter(library, self.snapshot_directory).snapshot()
+        library.return_book(self.member_ids[0], "978-0")  # The tail after the snapshot, handed to the hold
+        self.stats = library.get_library_stats()
+        library.transaction_log.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open(self, **options):
+        library = open_library("Test", "n/a", self.snapshot_directory, self.log_directory, **options)
+        self.addCleanup(library.transaction_log.close)
+        return library
+
+    def test_restore_matches_the_library_it_came_from(self):
+        library = self.open(clock=self.clock)
+        self.assertEqual(library.replayed_records, 2)  # The return and the hand-off borrow
+        self.assertEqual(state(library), state(self.library))
+        self.assertIn("978-0", library.members[self.member_ids[9]].borrowed_books)
+        self.assertGreater(library.members[self.member_ids[1]].fines, 0)
+
+    def test_lookups_build_only_the_members_they_return(self):
+        library = self.open(clock=self.clock)
+        self.assertIsInstance(library.members, SnapshotRoster)
+        self.assertEqual(library.find_member_by_email(" M3@Email.com").member_id, self.member_ids[3])
+        self.assertEqual(library.find_member_by_phone("(555) 0004").member_id, self.member_ids[4])
+        self.assertEqual([member.member_id for member in library.find_members_by_name("member 1", 3)],
+                         [member.member_id for member in self.library.find_members_by_name("member 1", 3)])
+        # Replaying the tail built members 0 and 9
+        self.assertEqual(library.members.built, 7)
+        self.assertEqual(len(library.members), 20)
+        self.assertEqual(library.overdue_loans(), self.library.overdue_loans())
+        self.assertEqual([book.isbn for book in library.find_books_by_author("author 1")],
+                         [book.isbn for book in self.library.find_books_by_author("author 1")])
+        self.assertEqual([book.isbn for book in library.search_fuzzy("Titel 7", 1)], ["978-7"])
+
+    def test_registering_after_a_restore_checks_restored_contacts(self):
+        library = self.open(clock=self.clock)
+        with self.assertRaises(ValueError):
+            library.register_member(Member("Copy", "m5@email.com", "555-9999"))
+        member_id = library.register_member(Member("New Member", "new@email.com", "555-9999"))
+        self.assertNotIn(member_id, self.member_ids)
+        self.assertEqual(library.find_member_by_phone("5559999").member_id, member_id)
+
+    def test_opened_library_is_collected_once_dropped(self):
+        library = self.open()
+        library.find_member_by_email("m1@email.com")
+        opened = weakref.ref(library)
+        library.transaction_log.close()
+        del library
+        gc.collect()
+        self.assertIsNone(opened())
+        self.assertEqual(gc.get_freeze_count(), 0)
+
+    def test_clock_and_library_class(self):
+        library = self.open(clock=self.clock, library_class=ConcurrentLibrary)
+        self.assertIsInstance(library, ConcurrentLibrary)
+        self.assertIs(library.clock, self.clock)
+        self.assertEqual(library.get_library_stats(verify=True), self.stats)
+
+
+class CappedLogTest(unittest.TestCase):
+    def test_snapshot_older_than_the_kept_log_is_refused(self):
+        with tempfile.TemporaryDirectory() as path:
+            log_directory = os.path.join(path, "log")
+            snapshot_directory = os.path.join(path, "snapshots")
+            caps = {"log_segment_bytes": 4 * TransactionLog.RECORD.size, "max_log_segments": 2}
+            library = Library("Test", "n/a", log_directory, **caps)
+            library.add_book(Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 1))
+            member_id = library.register_member(Member("Ann", "ann@email.com", "555-0101"))
+            with self.assertRaises(ValueError):
+                Snapshotter(library, snapshot_directory, every=5)
+            Snapshotter(library, snapshot_directory, every=4).snapshot()
+            for _ in range(6):
+                library.borrow_book(member_id, "978-1")
+                library.return_book(member_id, "978-1")
+            library.transaction_log.close()
+            with self.assertRaisesRegex(ValueError, "no longer available"):
+                open_library("Test", "n/a", snapshot_directory, log_directory, **caps)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,245 @@
+"""
+SQLite storage backend for the Library Management System
+SQLiteLibrary has the same API as Library but writes every change through to a
+SQLite database, so books, members, loans, fines and holds survive a restart.
+
+The in-memory Library stays the default; use SQLiteLibrary when state must persist:
+
+    with SQLiteLibrary("City Central Library", "123 Main Street", "library.db") as library:
+        library.borrow_book(member_id, isbn)
+"""
+
+import sqlite3
+from datetime import datetime
+
+from library_system import LOG_SEGMENT_BYTES, Book, BookGenre, Library, Member
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    isbn TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    publication_year INTEGER NOT NULL,
+    total_copies INTEGER NOT NULL,
+    available_copies INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS books_genre ON books (genre);
+
+CREATE TABLE IF NOT EXISTS members (
+    member_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    membership_type TEXT NOT NULL,
+    registration_date REAL NOT NULL,
+    fines REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS loans (
+    member_id INTEGER NOT NULL,
+    isbn TEXT NOT NULL,
+    borrow_date REAL NOT NULL,
+    PRIMARY KEY (member_id, isbn)
+);
+CREATE INDEX IF NOT EXISTS loans_isbn ON loans (isbn);
+
+CREATE TABLE IF NOT EXISTS history (
+    member_id INTEGER NOT NULL,
+    isbn TEXT NOT NULL,
+    title TEXT NOT NULL,
+    borrow_date REAL NOT NULL,
+    return_date REAL NOT NULL,
+    days INTEGER NOT NULL,
+    fine REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_member ON history (member_id);
+
+CREATE TABLE IF NOT EXISTS holds (
+    member_id INTEGER NOT NULL,
+    isbn TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (member_id, isbn)
+);
+"""
+
+# Fixed SQL text lets sqlite3 reuse its compiled (prepared) statements
+UPSERT_BOOK = """
+INSERT INTO books (isbn, title, author, genre, publication_year, total_copies, available_copies)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (isbn) DO UPDATE SET total_copies = excluded.total_copies,
+                                 available_copies = excluded.available_copies
+"""
+UPSERT_MEMBER = """
+INSERT OR REPLACE INTO members (member_id, name, email, phone, membership_type, registration_date, fines)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+UPDATE_COPIES = "UPDATE books SET available_copies = ? WHERE isbn = ?"
+UPDATE_FINES = "UPDATE members SET fines = ? WHERE member_id = ?"
+INSERT_LOAN = "INSERT OR REPLACE INTO loans (member_id, isbn, borrow_date) VALUES (?, ?, ?)"
+DELETE_LOAN = "DELETE FROM loans WHERE member_id = ? AND isbn = ?"
+INSERT_HOLD = "INSERT OR REPLACE INTO holds (member_id, isbn, expires) VALUES (?, ?, ?)"
+DELETE_HOLD = "DELETE FROM holds WHERE member_id = ? AND isbn = ?"
+INSERT_HISTORY = """
+INSERT INTO history (member_id, isbn, title, borrow_date, return_date, days, fine)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class SQLiteLibrary(Library):
+    """Library whose state is written through to a SQLite database
+
+    Reads are served from the in-memory indexes inherited from Library.
+    Writes are grouped into one transaction per batch_size operations; call
+    flush() (or close()) to commit early. A crash can lose at most the
+    uncommitted batch.
+    """
+
+    def __init__(self, name, address, path, batch_size=500, log_directory=None, clock=None,
+                 log_segment_bytes=LOG_SEGMENT_BYTES, max_log_segments=None):
+        super().__init__(name, address, log_directory, clock, log_segment_bytes, max_log_segments)
+        self.path = path
+        self.batch_size = batch_size
+        self.pending_writes = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.load()
+
+    def load(self):
+        """Rebuild the in-memory catalog, roster and loans from the database"""
+        db = self.connection
+        for isbn, title, author, genre, year, total, available in db.execute(
+                "SELECT isbn, title, author, genre, publication_year, total_copies, available_copies FROM books"):
+            book = Book(isbn, title, author, BookGenre[genre], year, total)
+            book.available_copies = available
+            Library.store_book(self, book)
+
+        for member_id, name, email, phone, membership_type, registered, fines in db.execute(
+                "SELECT member_id, name, email, phone, membership_type, registration_date, fines FROM members"):
+            member = Member(name, email, phone, membership_type, member_id=member_id,
+                            registration_date=datetime.fromtimestamp(registered))
+            member.fines = fines
+            Library.store_member(self, member)
+
+        for member_id, isbn, borrow_date in db.execute("SELECT member_id, isbn, borrow_date FROM loans"):
+            member = self.members[member_id]
+            member.borrowed_books[isbn] = datetime.fromtimestamp(borrow_date)
+            self.books[isbn].borrowed_by.append(member_id)
+            self.on_loan_started(member, isbn, member.borrowed_books[isbn])
+
+        for member_id, isbn, title, borrow_date, return_date, days, fine in db.execute(
+                "SELECT member_id, isbn, title, borrow_date, return_date, days, fine FROM history ORDER BY rowid"):
+            self.members[member_id].borrowing_history.append({
+                "isbn": isbn,
+                "book": title,
+                "borrow_date": datetime.fromtimestamp(borrow_date),
+                "return_date": datetime.fromtimestamp(return_date),
+                "days": days,
+                "fine": fine
+            })
+
+        # rowid order is the order the holds were placed in
+        for member_id, isbn, expires in db.execute("SELECT member_id, isbn, expires FROM holds ORDER BY rowid"):
+            Library.add_hold(self, self.members[member_id], isbn, datetime.fromtimestamp(expires))
+
+    def written(self, count=1):
+        self.pending_writes += count
+        if self.pending_writes >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        super().flush()
+        self.connection.commit()
+        self.pending_writes = 0
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+        self.transaction_log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def store_book(self, book):
+        is_new = super().store_book(book)
+        stored = self.books[book.isbn]
+        self.connection.execute(UPSERT_BOOK, (
+            stored.isbn, stored.title, stored.author, stored.genre.name,
+            stored.publication_year, stored.total_copies, stored.available_copies))
+        self.written()
+        return is_new
+
+    def store_member(self, member):
+        super().store_member(member)
+        self.connection.execute(UPSERT_MEMBER, (
+            member.member_id, member.name, member.email, member.phone,
+            member.membership_type, member.registration_date.timestamp(), member.fines))
+        self.written()
+
+    def borrow_book(self, member_id, isbn, now=None):
+        success, message = super().borrow_book(member_id, isbn, now)
+        if success:
+            self.save_loan(member_id, isbn)
+            self.written()
+        return success, message
+
+    def borrow_many(self, member_id, isbns, atomic=False, now=None):
+        all_borrowed, results = super().borrow_many(member_id, isbns, atomic, now)
+        borrowed = [isbn for isbn, success, _ in results if success]
+        for isbn in borrowed:
+            self.save_loan(member_id, isbn)
+        self.written(len(borrowed))
+        return all_borrowed, results
+
+    def return_book(self, member_id, isbn, now=None):
+        success, message, fine = super().return_book(member_id, isbn, now)
+        if success:
+            self.save_return(member_id, isbn, self.members[member_id].borrowing_history[-1])
+            self.written()
+        return success, message, fine
+
+    def return_many(self, member_id, isbns, now=None):
+        total_fine, results = super().return_many(member_id, isbns, now)
+        returned = [isbn for isbn, success, _, _ in results if success]
+        if returned:
+            history = self.members[member_id].borrowing_history[-len(returned):]
+            for isbn, record in zip(returned, history):
+                self.save_return(member_id, isbn, record)
+        self.written(len(returned))
+        return total_fine, results
+
+    def save_loan(self, member_id, isbn):
+        book = self.books[isbn]
+        borrow_date = self.members[member_id].borrowed_books[isbn]
+        self.connection.execute(UPDATE_COPIES, (book.available_copies, isbn))
+        self.connection.execute(INSERT_LOAN, (member_id, isbn, borrow_date.timestamp()))
+
+    def save_return(self, member_id, isbn, record):
+        self.connection.execute(UPDATE_COPIES, (self.books[isbn].available_copies, isbn))
+        self.connection.execute(DELETE_LOAN, (member_id, isbn))
+        self.connection.execute(INSERT_HISTORY, (
+            member_id, isbn, record["book"], record["borrow_date"].timestamp(),
+            record["return_date"].timestamp(), record["days"], record["fine"]))
+
+    def add_hold(self, member, isbn, expires):
+        position = super().add_hold(member, isbn, expires)
+        self.connection.execute(INSERT_HOLD, (member.member_id, isbn, expires.timestamp()))
+        self.written()
+        return position
+
+    def remove_hold(self, member_id, isbn):
+        removed = super().remove_hold(member_id, isbn)
+        if removed:
+            self.connection.execute(DELETE_HOLD, (member_id, isbn))
+            self.written()
+        return removed
+
+    def on_fines_changed(self, member, delta):
+        super().on_fines_changed(member, delta)
+        self.connection.execute(UPDATE_FINES, (member.fines, member.member_id))
+        self.written()
@@ -0,0 +1,69 @@
+# Tests for library_sqlite: books, members, loans, fines, history and holds come back from the database after a restart
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from library_sqlite import SQLiteLibrary
+from library_system import Book, BookGenre, Member, SimulatedClock
+
+
+def state(library):
+    """Copies and borrowers of every book; loans, fines, history and holds of every member"""
+    books = {isbn: (book.title, book.available_copies, dict(book.borrowed_by.counts))
+             for isbn, book in library.books.items()}
+    members = {member_id: (member.name, member.email, member.membership_type, member.fines,
+                           dict(member.borrowed_books), list(member.borrowing_history),
+                           {isbn: library.hold_position(member_id, isbn) for isbn in library.books})
+               for member_id, member in library.members.items()}
+    return books, members, library.get_library_stats()
+
+
+class ReopenTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "library.db")
+        self.clock = SimulatedClock(datetime(2024, 3, 1))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_state_survives_a_restart(self):
+        with SQLiteLibrary("Test", "n/a", self.path, clock=self.clock) as library:
+            library.add_books([Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 1),
+                               Book("978-2", "Emma", "Jane Austen", BookGenre.ROMANCE, 1815, 2)])
+            ann = library.register_member(Member("Ann Lee", "ann@email.com", "555-0101"))
+            bob = library.register_member(Member("Bob Stone", "bob@email.com", "555-0102", "Premium"))
+            library.borrow_many(ann, ["978-1", "978-2"])
+            library.place_hold(bob, "978-1")
+            self.clock.advance(timedelta(days=30))
+            library.return_book(ann, "978-1")  # Late, and handed to Bob's hold
+            library.pay_fine(ann, 0.5)
+            library.place_hold(ann, "978-1")
+            expected = state(library)
+
+        with SQLiteLibrary("Test", "n/a", self.path, clock=self.clock) as reopened:
+            self.assertEqual(state(reopened), expected)
+            self.assertGreater(reopened.members[ann].fines, 0)
+            self.assertIn("978-1", reopened.members[bob].borrowed_books)
+            self.assertEqual(reopened.hold_position(ann, "978-1"), 1)
+            self.assertEqual(reopened.find_member_by_email("ANN@email.com").member_id, ann)
+            self.assertEqual([member.member_id for member in reopened.find_members_by_name("bob")], [bob])
+            self.assertEqual([book.isbn for book in reopened.find_book_by_title("emm")], ["978-2"])
+
+    def test_writes_below_the_batch_size_are_committed_on_close(self):
+        library = SQLiteLibrary("Test", "n/a", self.path, batch_size=1000, clock=self.clock)
+        library.add_book(Book("978-1", "Dune", "Frank Herbert", BookGenre.FANTASY, 1965, 2))
+        member_id = library.register_member(Member("Ann Lee", "ann@email.com", "555-0101"))
+        library.borrow_book(member_id, "978-1")
+        library.close()
+
+        with SQLiteLibrary("Test", "n/a", self.path, clock=self.clock) as reopened:
+            self.assertEqual(reopened.books["978-1"].available_copies, 1)
+            self.assertEqual(list(reopened.members[member_id].borrowed_books), ["978-1"])
+            with self.assertRaises(ValueError):
+                reopened.register_member(Member("Ann Again", "ann@email.com", "555-0199"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,22 @@ Complex Library Management System
 Demonstrates: Classes, Objects, Composition, Aggregation, Collections, Date handling
 """
 
+import bisect
+import csv
+import heapq
+import io
+import json
+import math
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter, deque, namedtuple
 from datetime import datetime, timedelta
-from enum import Enum
+from enum import Enum, IntEnum
+from functools import partial
+from itertools import chain, groupby, islice, repeat
 
 
 class BookGenre(Enum):
@@ -19,844 +33,252 @@ class BookGenre(Enum):
     ROMANCE = "Romance"
 
 
-class Book:
-    """Represents a book in the library"""
-
-    def __init__(self, isbn, title, author, genre, publication_year, total_copies):
-        self.isbn = isbn
-        self.title = title
-        self.author = author
-        self.genre = genre
-        self.publication_year = publication_year
-        self.total_copies = total_copies
-        self.available_copies = total_copies
-        self.borrowed_by = []  # List of member IDs who borrowed this book
-
-    def is_available(self):
-        return self.available_copies > 0
-
-    def borrow(self, member_id):
-        if self.is_available():
-            self.available_copies -= 1
-            self.borrowed_by.append(member_id)
-            return True
-        return False
-
-    def return_book(self, member_id):
-        if member_id in self.borrowed_by:
-            self.available_copies += 1
-            self.borrowed_by.remove(member_id)
-            return True
-        return False
-
-    def __str__(self):
-        return f"'{self.title}' by {self.author} ({self.publication_year}) - Available: {self.available_copies}/{self.total_copies}"
-
-
-class Member:
-    """Represents a library member"""
-
-    member_id_counter = 1000
-
-    def __init__(self, name, email, phone, membership_type="Regular"):
-        self.member_id = Member.member_id_counter
-        Member.member_id_counter += 1
-        self.name = name
-        self.email = email
-        self.phone = phone
-        self.membership_type = membership_type  # Regular, Premium, Student
-        self.registration_date = datetime.now()
-        self.borrowed_books = {}  # {isbn: borrow_date}
-        self.borrowing_history = []
-        self.fines = 0.0
-
-        # Different membership types have different limits
-        self.max_books = {"Regular": 3, "Premium": 10, "Student": 5}[membership_type]
-        self.borrow_duration = {"Regular": 14, "Premium": 30, "Student": 21}[membership_type]
-
-    def can_borrow(self):
-        return len(self.borrowed_books) < self.max_books and self.fines == 0
-
-    def borrow_book(self, book):
-        if not self.can_borrow():
-            return False, "Cannot borrow: Limit reached or fines pending"
-
-        if book.borrow(self.member_id):
-            self.borrowed_books[book.isbn] = datetime.now()
-            return True, f"Successfully borrowed '{book.title}'"
-        return False, "Book not available"
-
-    def return_book(self, book):
-        if book.isbn not in self.borrowed_books:
-            return False, "You haven't borrowed this book", 0
-
-        borrow_date = self.borrowed_books[book.isbn]
-        days_borrowed = (datetime.now() - borrow_date).days
-
-        # Calculate fine if overdue
-        fine = 0
-        if days_borrowed > self.borrow_duration:
-            overdue_days = days_borrowed - self.borrow_duration
-            fine = overdue_days * 0.50  # $0.50 per day
-            self.fines += fine
-
-        book.return_book(self.member_id)
-        del self.borrowed_books[book.isbn]
-
-        # Add to history
-        self.borrowing_history.append({
-            "book": book.title,
-            "borrow_date": borrow_date,
-            "return_date": datetime.now(),
-            "days": days_borrowed,
-            "fine": fine
-        })
-
-        return True, f"Returned '{book.title}' after {days_borrowed} days", fine
-
-    def pay_fine(self, amount):
-        if amount >= self.fines:
-            paid = self.fines
-            self.fines = 0
-            return True, f"Paid ${paid:.2f}. No pending fines."
-        else:
-            self.fines -= amount
-            return True, f"Paid ${amount:.2f}. Remaining fine: ${self.fines:.2f}"
-
-    def get_membership_duration(self):
-        duration = datetime.now() - self.registration_date
-        return duration.days
-
-    def __str__(self):
-        return (f"Member #{self.member_id}: {self.name} ({self.membership_type})\n"
-                f"  Email: {self.email} | Phone: {self.phone}\n"
-                f"  Books Borrowed: {len(self.borrowed_books)}/{self.max_books}\n"
-                f"  Pending Fines: ${self.fines:.2f}\n"
-                f"  Member for: {self.get_membership_duration()} days")
-
-
-class Library:
-    """Main library system that manages books and members"""
-
-    def __init__(self, name, address):
-        self.name = name
-        self.address = address
-        self.books = {}  # {isbn: Book}
-        self.members = {}  # {member_id: Member}
-        self.transaction_log = []
-
-    def add_book(self, book):
-        if book.isbn in self.books:
-            # If book exists, increase copies
-            self.books[book.isbn].total_copies += book.total_copies
-            self.books[book.isbn].available_copies += book.total_copies
-            return f"Added {book.total_copies} more copies of '{book.title}'"
-        else:
-            self.books[book.isbn] = book
-            return f"New book added: '{book.title}'"
-
-    def register_member(self, member):
-        self.members[member.member_id] = member
-        self.log_transaction(f"New member registered: {member.name} (ID: {member.member_id})")
-        return member.member_id
-
-    def find_book_by_title(self, title):
-        results = []
-        for book in self.books.values():
-            if title.lower() in book.title.lower():
-                results.append(book)
-        return results
-
-    def find_books_by_author(self, author):
-        results = []
-        for book in self.books.values():
-            if author.lower() in book.author.lower():
-                results.append(book)
-        return results
-
-    def find_books_by_genre(self, genre):
-        results = []
-        for book in self.books.values():
-            if book.genre == genre:
-                results.append(book)
-        return results
-
-    def borrow_book(self, member_id, isbn):
-        if member_id not in self.members:
-            return False, "Member not found"
-        if isbn not in self.books:
-            return False, "Book not found"
-
-        member = self.members[member_id]
-        book = self.books[isbn]
-
-        success, message = member.borrow_book(book)
-        if success:
-            self.log_transaction(f"Member {member.name} borrowed '{book.title}'")
-        return success, message
-
-    def return_book(self, member_id, isbn):
-        if member_id not in self.members:
-            return False, "Member not found", 0
-        if isbn not in self.books:
-            return False, "Book not found", 0
-
-        member = self.members[member_id]
-        book = self.books[isbn]
-
-        success, message, fine = member.return_book(book)
-        if success:
-            self.log_transaction(f"Member {member.name} returned '{book.title}'. Fine: ${fine:.2f}")
-        return success, message, fine
-
-    def log_transaction(self, message):
-        self.transaction_log.append({
-            "timestamp": datetime.now(),
-            "message": message
-        })
-
-    def get_library_stats(self):
-        total_books = sum(book.total_copies for book in self.books.values())
-        available_books = sum(book.available_copies for book in self.books.values())
-        borrowed_books = total_books - available_books
-        total_fines = sum(member.fines for member in self.members.values())
-
-        return {
-            "total_books": total_books,
-            "unique_titles": len(self.books),
-            "available_books": available_books,
-            "borrowed_books": borrowed_books,
-            "total_members": len(self.members),
-            "total_fines_pending": total_fines
-        }
-
-    def display_stats(self):
-        stats = self.get_library_stats()
-        print(f"\n{'='*60}")
-        print(f"LIBRARY STATISTICS - {self.name}")
-        print(f"{'='*60}")
-        print(f"Total Books: {stats['total_books']} ({stats['unique_titles']} unique titles)")
-        print(f"Available: {stats['available_books']} | Borrowed: {stats['borrowed_books']}")
-        print(f"Total Members: {stats['total_members']}")
-        print(f"Total Fines Pending: ${stats['total_fines_pending']:.2f}")
-        print(f"{'='*60}\n")
-
-    def display_all_books(self):
-        print(f"\n--- All Books in {self.name} ---")
-        for book in self.books.values():
-            print(f"  [{book.isbn}] {book}")
-
-    def display_all_members(self):
-        print(f"\n--- All Members of {self.name} ---")
-        for member in self.members.values():
-            print(f"\n{member}")
-
-    def __str__(self):
-        return f"{self.name} Library\nLocation: {self.address}"
-
-
-# ============================================
-# DEMONSTRATION WITH COMPLEX OBJECTS
-# ============================================
-
-if __name__ == "__main__":
-    print("="*70)
-    print("COMPLEX LIBRARY MANAGEMENT SYSTEM")
-    print("="*70)
-
-    # Create Library
-    library = Library("City Central Library", "123 Main Street, Downtown")
-    print(f"\n{library}\n")
-
-    # Create complex book objects
-    book1 = Book("978-0-7432-7356-5", "1984", "George Orwell",
-                 BookGenre.FICTION, 1949, 5)
-    book2 = Book("978-0-06-112008-4", "To Kill a Mockingbird", "Harper Lee",
-                 BookGenre.FICTION, 1960, 3)
-    book3 = Book("978-0-553-29698-2", "A Brief History of Time", "Stephen Hawking",
-                 BookGenre.SCIENCE, 1988, 4)
-    book4 = Book("978-0-345-39180-3", "Dune", "Frank Herbert",
-                 BookGenre.FANTASY, 1965, 2)
-    book5 = Book("978-0-14-017739-8", "1984", "George Orwell",
-                 BookGenre.FICTION, 1949, 3)  # Duplicate for testing
-
-    # Add books to library
-    print("\n--- Adding Books to Library ---")
-    print(library.add_book(book1))
-    print(library.add_book(book2))
-    print(library.add_book(book3))
-    print(library.add_book(book4))
-    print(library.add_book(book5))  # Will increase copies of existing book
-
-    # Create complex member objects with different membership types
-    member1 = Member("Alice Johnson", "alice@email.com", "555-0101", "Premium")
-    member2 = Member("Bob Smith", "bob@email.com", "555-0102", "Regular")
-    member3 = Member("Charlie Davis", "charlie@email.com", "555-0103", "Student")
-    member4 = Member("Diana Prince", "diana@email.com", "555-0104", "Regular")
-
-    # Register members
-    print("\n--- Registering Members ---")
-    library.register_member(member1)
-    library.register_member(member2)
-    library.register_member(member3)
-    library.register_member(member4)
-    print(f"Registered {len(library.members)} members")
-
-    # Display initial state
-    library.display_all_books()
-    library.display_stats()
-
-    # Simulate borrowing operations
-    print("\n" + "="*70)
-    print("BORROWING OPERATIONS")
-    print("="*70)
-
-    # Alice borrows multiple books (Premium member can borrow up to 10)
-    print(f"\n--- {member1.name} (Premium Member) Borrowing ---")
-    success, msg = library.borrow_book(member1.member_id, book1.isbn)
-    print(msg)
-    success, msg = library.borrow_book(member1.member_id, book3.isbn)
-    print(msg)
-    success, msg = library.borrow_book(member1.member_id, book4.isbn)
-    print(msg)
-
-    # Bob borrows books (Regular member can borrow up to 3)
-    print(f"\n--- {member2.name} (Regular Member) Borrowing ---")
-    success, msg = library.borrow_book(member2.member_id, book2.isbn)
-    print(msg)
-    success, msg = library.borrow_book(member2.member_id, book1.isbn)
-    print(msg)
-
-    # Charlie borrows books (Student member can borrow up to 5)
-    print(f"\n--- {member3.name} (Student Member) Borrowing ---")
-    success, msg = library.borrow_book(member3.member_id, book3.isbn)
-    print(msg)
-
-    # Display updated stats
-    library.display_stats()
-
-    # Search functionality
-    print("\n" + "="*70)
-    print("SEARCH OPERATIONS")
-    print("="*70)
-
-    print("\n--- Searching for '1984' ---")
-    results = library.find_book_by_title("1984")
-    for book in results:
-        print(f"  Found: {book}")
-
-    print("\n--- Searching for author 'Orwell' ---")
-    results = library.find_books_by_author("Orwell")
-    for book in results:
-        print(f"  Found: {book}")
-
-    print("\n--- All Fiction books ---")
-    results = library.find_books_by_genre(BookGenre.FICTION)
-    for book in results:
-        print(f"  {book}")
-
-    # Simulate returns with overdue fines
-    print("\n" + "="*70)
-    print("RETURN OPERATIONS")
-    print("="*70)
-
-    # Simulate overdue by manipulating borrow date
-    print(f"\n--- Simulating overdue return for {member2.name} ---")
-    member2.borrowed_books[book2.isbn] = datetime.now() - timedelta(days=20)  # 20 days ago
-    success, msg, fine = library.return_book(member2.member_id, book2.isbn)
-    print(msg)
-    if fine > 0:
-        print(f"  OVERDUE FINE: ${fine:.2f}")
-
-    print(f"\n--- {member1.name} returning books (on time) ---")
-    success, msg, fine = library.return_book(member1.member_id, book1.isbn)
-    print(msg)
-
-    # Display member information
-    print("\n" + "="*70)
-    print("MEMBER INFORMATION")
-    print("="*70)
-    library.display_all_members()
-
-    # Pay fines
-    print("\n" + "="*70)
-    print("FINE PAYMENT")
-    print("="*70)
-    print(f"\n{member2.name} has ${member2.fines:.2f} in fines")
-    success, msg = member2.pay_fine(5.0)
-    print(msg)
-
-    # Show borrowing history
-    print("\n" + "="*70)
-    print("BORROWING HISTORY")
-    print("="*70)
-    print(f"\n--- {member2.name}'s History ---")
-    for record in member2.borrowing_history:
-        print(f"  Book: {record['book']}")
-        print(f"  Borrowed: {record['borrow_date'].strftime('%Y-%m-%d')}")
-        print(f"  Returned: {record['return_date'].strftime('%Y-%m-%d')}")
-        print(f"  Duration: {record['days']} days")
-        print(f"  Fine: ${record['fine']:.2f}\n")
-
-    # Final stats
-    library.display_stats()
-
-    # Transaction log
-    print("\n" + "="*70)
-    print("RECENT TRANSACTIONS")
-    print("="*70)
-    for log in library.transaction_log[-5:]:  # Last 5 transactions
-        print(f"[{log['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}] {log['message']}")
-
-    print("\n" + "="*70)
-    print("DEMONSTRATION COMPLETE")
-    print("="*70)
-"""
-Complex Library Management System
-Demonstrates: Classes, Objects, Composition, Aggregation, Collections, Date handling
-"""
-
-from datetime import datetime, timedelta
-from enum import Enum
-
-
-class BookGenre(Enum):
-    """Enum for book genres"""
-    FICTION = "Fiction"
-    NON_FICTION = "Non-Fiction"
-    SCIENCE = "Science"
-    HISTORY = "History"
-    BIOGRAPHY = "Biography"
-    MYSTERY = "Mystery"
-    FANTASY = "Fantasy"
-    ROMANCE = "Romance"
-
-
-class Book:
-    """Represents a book in the library"""
-
-    def __init__(self, isbn, title, author, genre, publication_year, total_copies):
-        self.isbn = isbn
-        self.title = title
-        self.author = author
-        self.genre = genre
-        self.publication_year = publication_year
-        self.total_copies = total_copies
-        self.available_copies = total_copies
-        self.borrowed_by = []  # List of member IDs who borrowed this book
-
-    def is_available(self):
-        return self.available_copies > 0
-
-    def borrow(self, member_id):
-        if self.is_available():
-            self.available_copies -= 1
-            self.borrowed_by.append(member_id)
-            return True
-        return False
-
-    def return_book(self, member_id):
-        if member_id in self.borrowed_by:
-            self.available_copies += 1
-            self.borrowed_by.remove(member_id)
-            return True
-        return False
-
-    def __str__(self):
-        return f"'{self.title}' by {self.author} ({self.publication_year}) - Available: {self.available_copies}/{self.total_copies}"
-
-
-class Member:
-    """Represents a library member"""
-
-    member_id_counter = 1000
-
-    def __init__(self, name, email, phone, membership_type="Regular"):
-        self.member_id = Member.member_id_counter
-        Member.member_id_counter += 1
-        self.name = name
-        self.email = email
-        self.phone = phone
-        self.membership_type = membership_type  # Regular, Premium, Student
-        self.registration_date = datetime.now()
-        self.borrowed_books = {}  # {isbn: borrow_date}
-        self.borrowing_history = []
-        self.fines = 0.0
-
-        # Different membership types have different limits
-        self.max_books = {"Regular": 3, "Premium": 10, "Student": 5}[membership_type]
-        self.borrow_duration = {"Regular": 14, "Premium": 30, "Student": 21}[membership_type]
-
-    def can_borrow(self):
-        return len(self.borrowed_books) < self.max_books and self.fines == 0
-
-    def borrow_book(self, book):
-        if not self.can_borrow():
-            return False, "Cannot borrow: Limit reached or fines pending"
-
-        if book.borrow(self.member_id):
-            self.borrowed_books[book.isbn] = datetime.now()
-            return True, f"Successfully borrowed '{book.title}'"
-        return False, "Book not available"
-
-    def return_book(self, book):
-        if book.isbn not in self.borrowed_books:
-            return False, "You haven't borrowed this book", 0
-
-        borrow_date = self.borrowed_books[book.isbn]
-        days_borrowed = (datetime.now() - borrow_date).days
-
-        # Calculate fine if overdue
-        fine = 0
-        if days_borrowed > self.borrow_duration:
-            overdue_days = days_borrowed - self.borrow_duration
-            fine = overdue_days * 0.50  # $0.50 per day
-            self.fines += fine
-
-        book.return_book(self.member_id)
-        del self.borrowed_books[book.isbn]
-
-        # Add to history
-        self.borrowing_history.append({
-            "book": book.title,
-            "borrow_date": borrow_date,
-            "return_date": datetime.now(),
-            "days": days_borrowed,
-            "fine": fine
-        })
-
-        return True, f"Returned '{book.title}' after {days_borrowed} days", fine
-
-    def pay_fine(self, amount):
-        if amount >= self.fines:
-            paid = self.fines
-            self.fines = 0
-            return True, f"Paid ${paid:.2f}. No pending fines."
-        else:
-            self.fines -= amount
-            return True, f"Paid ${amount:.2f}. Remaining fine: ${self.fines:.2f}"
-
-    def get_membership_duration(self):
-        duration = datetime.now() - self.registration_date
-        return duration.days
-
-    def __str__(self):
-        return (f"Member #{self.member_id}: {self.name} ({self.membership_type})\n"
-                f"  Email: {self.email} | Phone: {self.phone}\n"
-                f"  Books Borrowed: {len(self.borrowed_books)}/{self.max_books}\n"
-                f"  Pending Fines: ${self.fines:.2f}\n"
-                f"  Member for: {self.get_membership_duration()} days")
-
-
-class Library:
-    """Main library system that manages books and members"""
-
-    def __init__(self, name, address):
-        self.name = name
-        self.address = address
-        self.books = {}  # {isbn: Book}
-        self.members = {}  # {member_id: Member}
-        self.transaction_log = []
-
-    def add_book(self, book):
-        if book.isbn in self.books:
-            # If book exists, increase copies
-            self.books[book.isbn].total_copies += book.total_copies
-            self.books[book.isbn].available_copies += book.total_copies
-            return f"Added {book.total_copies} more copies of '{book.title}'"
-        else:
-            self.books[book.isbn] = book
-            return f"New book added: '{book.title}'"
-
-    def register_member(self, member):
-        self.members[member.member_id] = member
-        self.log_transaction(f"New member registered: {member.name} (ID: {member.member_id})")
-        return member.member_id
-
-    def find_book_by_title(self, title):
-        results = []
-        for book in self.books.values():
-            if title.lower() in book.title.lower():
-                results.append(book)
-        return results
-
-    def find_books_by_author(self, author):
-        results = []
-        for book in self.books.values():
-            if author.lower() in book.author.lower():
-                results.append(book)
-        return results
-
-    def find_books_by_genre(self, genre):
-        results = []
-        for book in self.books.values():
-            if book.genre == genre:
-                results.append(book)
-        return results
-
-    def borrow_book(self, member_id, isbn):
-        if member_id not in self.members:
-            return False, "Member not found"
-        if isbn not in self.books:
-            return False, "Book not found"
-
-        member = self.members[member_id]
-        book = self.books[isbn]
-
-        success, message = member.borrow_book(book)
-        if success:
-            self.log_transaction(f"Member {member.name} borrowed '{book.title}'")
-        return success, message
-
-    def return_book(self, member_id, isbn):
-        if member_id not in self.members:
-            return False, "Member not found", 0
-        if isbn not in self.books:
-            return False, "Book not found", 0
-
-        member = self.members[member_id]
-        book = self.books[isbn]
+class SystemClock:
+    """Wall-clock time; the default clock of every Library"""
 
-        success, message, fine = member.return_book(book)
-        if success:
-            self.log_transaction(f"Member {member.name} returned '{book.title}'. Fine: ${fine:.2f}")
-        return success, message, fine
-
-    def log_transaction(self, message):
-        self.transaction_log.append({
-            "timestamp": datetime.now(),
-            "message": message
-        })
-
-    def get_library_stats(self):
-        total_books = sum(book.total_copies for book in self.books.values())
-        available_books = sum(book.available_copies for book in self.books.values())
-        borrowed_books = total_books - available_books
-        total_fines = sum(member.fines for member in self.members.values())
-
-        return {
-            "total_books": total_books,
-            "unique_titles": len(self.books),
-            "available_books": available_books,
-            "borrowed_books": borrowed_books,
-            "total_members": len(self.members),
-            "total_fines_pending": total_fines
-        }
-
-    def display_stats(self):
-        stats = self.get_library_stats()
-        print(f"\n{'='*60}")
-        print(f"LIBRARY STATISTICS - {self.name}")
-        print(f"{'='*60}")
-        print(f"Total Books: {stats['total_books']} ({stats['unique_titles']} unique titles)")
-        print(f"Available: {stats['available_books']} | Borrowed: {stats['borrowed_books']}")
-        print(f"Total Members: {stats['total_members']}")
-        print(f"Total Fines Pending: ${stats['total_fines_pending']:.2f}")
-        print(f"{'='*60}\n")
-
-    def display_all_books(self):
-        print(f"\n--- All Books in {self.name} ---")
-        for book in self.books.values():
-            print(f"  [{book.isbn}] {book}")
-
-    def display_all_members(self):
-        print(f"\n--- All Members of {self.name} ---")
-        for member in self.members.values():
-            print(f"\n{member}")
-
-    def __str__(self):
-        return f"{self.name} Library\nLocation: {self.address}"
-
-
-# ============================================
-# DEMONSTRATION WITH COMPLEX OBJECTS
-# ============================================
-
-if __name__ == "__main__":
-    print("="*70)
-    print("COMPLEX LIBRARY MANAGEMENT SYSTEM")
-    print("="*70)
-
-    # Create Library
-    library = Library("City Central Library", "123 Main Street, Downtown")
-    print(f"\n{library}\n")
-
-    # Create complex book objects
-    book1 = Book("978-0-7432-7356-5", "1984", "George Orwell",
-                 BookGenre.FICTION, 1949, 5)
-    book2 = Book("978-0-06-112008-4", "To Kill a Mockingbird", "Harper Lee",
-                 BookGenre.FICTION, 1960, 3)
-    book3 = Book("978-0-553-29698-2", "A Brief History of Time", "Stephen Hawking",
-                 BookGenre.SCIENCE, 1988, 4)
-    book4 = Book("978-0-345-39180-3", "Dune", "Frank Herbert",
-                 BookGenre.FANTASY, 1965, 2)
-    book5 = Book("978-0-14-017739-8", "1984", "George Orwell",
-                 BookGenre.FICTION, 1949, 3)  # Duplicate for testing
-
-    # Add books to library
-    print("\n--- Adding Books to Library ---")
-    print(library.add_book(book1))
-    print(library.add_book(book2))
-    print(library.add_book(book3))
-    print(library.add_book(book4))
-    print(library.add_book(book5))  # Will increase copies of existing book
-
-    # Create complex member objects with different membership types
-    member1 = Member("Alice Johnson", "alice@email.com", "555-0101", "Premium")
-    member2 = Member("Bob Smith", "bob@email.com", "555-0102", "Regular")
-    member3 = Member("Charlie Davis", "charlie@email.com", "555-0103", "Student")
-    member4 = Member("Diana Prince", "diana@email.com", "555-0104", "Regular")
-
-    # Register members
-    print("\n--- Registering Members ---")
-    library.register_member(member1)
-    library.register_member(member2)
-    library.register_member(member3)
-    library.register_member(member4)
-    print(f"Registered {len(library.members)} members")
-
-    # Display initial state
-    library.display_all_books()
-    library.display_stats()
-
-    # Simulate borrowing operations
-    print("\n" + "="*70)
-    print("BORROWING OPERATIONS")
-    print("="*70)
-
-    # Alice borrows multiple books (Premium member can borrow up to 10)
-    print(f"\n--- {member1.name} (Premium Member) Borrowing ---")
-    success, msg = library.borrow_book(member1.member_id, book1.isbn)
-    print(msg)
-    success, msg = library.borrow_book(member1.member_id, book3.isbn)
-    print(msg)
-    success, msg = library.borrow_book(member1.member_id, book4.isbn)
-    print(msg)
-
-    # Bob borrows books (Regular member can borrow up to 3)
-    print(f"\n--- {member2.name} (Regular Member) Borrowing ---")
-    success, msg = library.borrow_book(member2.member_id, book2.isbn)
-    print(msg)
-    success, msg = library.borrow_book(member2.member_id, book1.isbn)
-    print(msg)
-
-    # Charlie borrows books (Student member can borrow up to 5)
-    print(f"\n--- {member3.name} (Student Member) Borrowing ---")
-    success, msg = library.borrow_book(member3.member_id, book3.isbn)
-    print(msg)
-
-    # Display updated stats
-    library.display_stats()
-
-    # Search functionality
-    print("\n" + "="*70)
-    print("SEARCH OPERATIONS")
-    print("="*70)
-
-    print("\n--- Searching for '1984' ---")
-    results = library.find_book_by_title("1984")
-    for book in results:
-        print(f"  Found: {book}")
+    def now(self):
+        return datetime.now()
 
-    print("\n--- Searching for author 'Orwell' ---")
-    results = library.find_books_by_author("Orwell")
-    for book in results:
-        print(f"  Found: {book}")
 
-    print("\n--- All Fiction books ---")
-    results = library.find_books_by_genre(BookGenre.FICTION)
-    for book in results:
-        print(f"  {book}")
+class SimulatedClock:
+    """Clock that only moves when told to, for simulations and repeatable runs"""
 
-    # Simulate returns with overdue fines
-    print("\n" + "="*70)
-    print("RETURN OPERATIONS")
-    print("="*70)
+    def __init__(self, start=None):
+        self.current = start or datetime(2024, 1, 1)
 
-    # Simulate overdue by manipulating borrow date
-    print(f"\n--- Simulating overdue return for {member2.name} ---")
-    member2.borrowed_books[book2.isbn] = datetime.now() - timedelta(days=20)  # 20 days ago
-    success, msg, fine = library.return_book(member2.member_id, book2.isbn)
-    print(msg)
-    if fine > 0:
-        print(f"  OVERDUE FINE: ${fine:.2f}")
+    def now(self):
+        return self.current
 
-    print(f"\n--- {member1.name} returning books (on time) ---")
-    success, msg, fine = library.return_book(member1.member_id, book1.isbn)
-    print(msg)
+    def advance(self, delta):
+        self.current += delta
+        return self.current
 
-    # Display member information
-    print("\n" + "="*70)
-    print("MEMBER INFORMATION")
-    print("="*70)
-    library.display_all_members()
+    def set(self, moment):
+        if moment < self.current:
+            raise ValueError("A simulated clock cannot go backwards")
+        self.current = moment
 
-    # Pay fines
-    print("\n" + "="*70)
-    print("FINE PAYMENT")
-    print("="*70)
-    print(f"\n{member2.name} has ${member2.fines:.2f} in fines")
-    success, msg = member2.pay_fine(5.0)
-    print(msg)
 
-    # Show borrowing history
-    print("\n" + "="*70)
-    print("BORROWING HISTORY")
-    print("="*70)
-    print(f"\n--- {member2.name}'s History ---")
-    for record in member2.borrowing_history:
-        print(f"  Book: {record['book']}")
-        print(f"  Borrowed: {record['borrow_date'].strftime('%Y-%m-%d')}")
-        print(f"  Returned: {record['return_date'].strftime('%Y-%m-%d')}")
-        print(f"  Duration: {record['days']} days")
-        print(f"  Fine: ${record['fine']:.2f}\n")
+class BorrowerMultiset:
+    """List-like multiset of member IDs with O(1) append, remove and membership"""
 
-    # Final stats
-    library.display_stats()
+    __slots__ = ("counts", "size")
 
-    # Transaction log
-    print("\n" + "="*70)
-    print("RECENT TRANSACTIONS")
-    print("="*70)
-    for log in library.transaction_log[-5:]:  # Last 5 transactions
-        print(f"[{log['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}] {log['message']}")
+    NO_BORROWERS = {}  # Shared by every idle book; never mutated
 
-    print("\n" + "="*70)
-    print("DEMONSTRATION COMPLETE")
-    print("="*70)
-"""
-Complex Library Management System
-Demonstrates: Classes, Objects, Composition, Aggregation, Collections, Date handling
-"""
+    def __init__(self, member_ids=()):
+        self.counts = BorrowerMultiset.NO_BORROWERS  # {member_id: count}, a plain dict so snapshots load it as is
+        self.size = 0
+        if member_ids:
+            counts = dict(Counter(member_ids))
+            self.size = sum(counts.values())
+            if self.size:
+                self.counts = counts
 
-from datetime import datetime, timedelta
-from enum import Enum
+    @classmethod
+    def from_counts(cls, counts):
+        """Multiset over a {member_id: count} dict, which it takes over"""
+        multiset = cls()
+        if counts:
+            multiset.counts = counts
+            multiset.size = sum(counts.values())
+        return multiset
 
+    def append(self, member_id):
+        if self.size == 0:
+            self.counts = {}
+        self.counts[member_id] = self.counts.get(member_id, 0) + 1
+        self.size += 1
 
-class BookGenre(Enum):
-    """Enum for book genres"""
-    FICTION = "Fiction"
-    NON_FICTION = "Non-Fiction"
-    SCIENCE = "Science"
-    HISTORY = "History"
-    BIOGRAPHY = "Biography"
-    MYSTERY = "Mystery"
-    FANTASY = "Fantasy"
-    ROMANCE = "Romance"
+    def remove(self, member_id):
+        count = self.counts.get(member_id, 0)
+        if count == 0:
+            raise ValueError(f"{member_id!r} is not a borrower")
+        if count == 1:
+            del self.counts[member_id]
+        else:
+            self.counts[member_id] = count - 1
+        self.size -= 1
+        if self.size == 0:
+            self.counts = BorrowerMultiset.NO_BORROWERS
+
+    def count(self, member_id):
+        return self.counts.get(member_id, 0)
+
+    def __contains__(self, member_id):
+        return member_id in self.counts
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return chain.from_iterable(repeat(member_id, count) for member_id, count in self.counts.items())
+
+    def __eq__(self, other):
+        if isinstance(other, BorrowerMultiset):
+            return self.counts == other.counts
+        if isinstance(other, (list, tuple)):
+            return self.counts == Counter(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+class BorrowingHistory:
+    """List-like log of a member's returned loans, stored as packed records, oldest first
+
+    Each entry is 14 bytes: book number, borrow and return day (days since
+    1970-01-01), days borrowed and the fine in cents. Book numbers index one
+    (isbn, title) table shared by every history. Entries read back as the
+    usual dicts, with dates at day precision. Old entries can be paged out to
+    an archive file by archive() and are read back from disk only when the
+    full history is iterated or indexed into.
+    """
+
+    __slots__ = ("records", "archived")
+
+    RECORD = struct.Struct("<IHHhI")
+    NO_RECORDS = b""  # Shared by every history with nothing in memory; never mutated
+    books = []  # [(isbn, title)] by book number
+    book_numbers = {}  # {(isbn, title): book number}
+    books_lock = threading.Lock()
+
+    def __init__(self, entries=()):
+        self.records = BorrowingHistory.NO_RECORDS
+        self.archived = ()  # (path, offset, count) of each chunk paged out to disk, oldest first
+        for entry in entries:
+            self.append(entry)
+
+    @classmethod
+    def book_number(cls, isbn, title):
+        number = cls.book_numbers.get((isbn, title))
+        if number is None:
+            with cls.books_lock:
+                number = cls.book_numbers.get((isbn, title))
+                if number is None:
+                    number = cls.book_numbers[(isbn, title)] = len(cls.books)
+                    cls.books.append((isbn, title))
+        return number
+
+    @classmethod
+    def from_records(cls, records, archived=(), renumber=None):
+        """History from packed records; renumber maps their book numbers to this process's table"""
+        history = cls()
+        history.archived = tuple(archived)
+        if renumber is not None:
+            records = b"".join(cls.RECORD.pack(renumber[number], *fields)
+                               for number, *fields in cls.RECORD.iter_unpack(records))
+        if records:
+            history.records = bytearray(records)
+        return history
+
+    def add(self, isbn, title, borrow_date, return_date, days, fine):
+        if not self.records:
+            self.records = bytearray()
+        self.records += self.RECORD.pack(self.book_number(isbn, title), borrow_date.toordinal() - EPOCH_ORDINAL,
+                                         return_date.toordinal() - EPOCH_ORDINAL, days, round(fine * 100))
+
+    def append(self, entry):
+        """Add an entry given as a history dict"""
+        self.add(entry.get("isbn"), entry["book"], entry["borrow_date"], entry["return_date"], entry["days"],
+                 entry["fine"])
+
+    @staticmethod
+    def entry(isbn, title, borrow_day, return_day, days, cents):
+        return {"isbn": isbn,
+                "book": title,
+                "borrow_date": datetime.fromordinal(borrow_day + EPOCH_ORDINAL),
+                "return_date": datetime.fromordinal(return_day + EPOCH_ORDINAL),
+                "days": days,
+                "fine": cents / 100}
+
+    def recent(self):
+        """Entries still in memory, without touching the archive"""
+        books = self.books
+        return [self.entry(*books[number], *fields) for number, *fields in self.RECORD.iter_unpack(self.records)]
+
+    def recent_isbns(self):
+        books = self.books
+        isbns = (books[number][0] for number, *_ in self.RECORD.iter_unpack(self.records))
+        return [isbn for isbn in isbns if isbn is not None]
+
+    def archived_entries(self):
+        entries = []
+        for path, offset, _ in self.archived:
+            with open(path, "rb") as archive:
+                archive.seek(offset)
+                entries.extend(self.entry(*row) for row in json.loads(archive.readline()))
+        return entries
+
+    def archive(self, archive, path, before_day):
+        """Move the leading entries returned before before_day to the open archive file; returns how many"""
+        count = 0
+        for _, _, return_day, _, _ in self.RECORD.iter_unpack(self.records):
+            if return_day >= before_day:
+                break
+            count += 1
+        if count == 0:
+            return 0
+        end = count * self.RECORD.size
+        books = self.books
+        rows = [[*books[number], *fields] for number, *fields in self.RECORD.iter_unpack(self.records[:end])]
+        offset = archive.tell()
+        archive.write(json.dumps(rows).encode() + b"\n")
+        self.archived += ((path, offset, count),)
+        del self.records[:end]
+        if not self.records:
+            self.records = BorrowingHistory.NO_RECORDS
+        return count
+
+    def __len__(self):
+        return len(self.records) // self.RECORD.size + sum(count for _, _, count in self.archived)
+
+    def __iter__(self):
+        if self.archived:
+            yield from self.archived_entries()
+        yield from self.recent()
+
+    def __getitem__(self, index):
+        in_archive = len(self) - len(self.records) // self.RECORD.size
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(self)))
+            if positions and min(positions) < in_archive:
+                return list(self)[index]
+            return [self[position] for position in positions]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        if index < in_archive:
+            return self.archived_entries()[index]
+        number, *fields = self.RECORD.unpack_from(self.records, (index - in_archive) * self.RECORD.size)
+        return self.entry(*self.books[number], *fields)
+
+    def __repr__(self):
+        return repr(list(self))
 
 
 class Book:
     """Represents a book in the library"""
 
+    # Slots instead of a per-instance __dict__ keep multi-million-title catalogs small
+    __slots__ = ("isbn", "title", "author", "genre", "publication_year",
+                 "total_copies", "available_copies", "borrowed_by", "library")
+
     def __init__(self, isbn, title, author, genre, publication_year, total_copies):
         self.isbn = isbn
-        self.title = title
-        self.author = author
+        self.title = sys.intern(title)  # Shared across editions and the indexes
+        self.author = sys.intern(author)
         self.genre = genre
         self.publication_year = publication_year
         self.total_copies = total_copies
         self.available_copies = total_copies
-        self.borrowed_by = []  # List of member IDs who borrowed this book
+        self.borrowed_by = BorrowerMultiset()  # Member IDs who borrowed this book (repeats allowed)
+        self.library = None  # Set by Library.add_book so it can keep its indexes current
 
     def is_available(self):
         return self.available_copies > 0
@@ -865,6 +287,8 @@ class Book:
         if self.is_available():
             self.available_copies -= 1
             self.borrowed_by.append(member_id)
+            if self.library is not None:
+                self.library.on_copies_changed(self, -1)
             return True
         return False
 
@@ -872,6 +296,8 @@ class Book:
         if member_id in self.borrowed_by:
             self.available_copies += 1
             self.borrowed_by.remove(member_id)
+            if self.library is not None:
+                self.library.on_copies_changed(self, 1)
             return True
         return False
 
@@ -883,131 +309,1605 @@ class Member:
     """Represents a library member"""
 
     member_id_counter = 1000
-
-    def __init__(self, name, email, phone, membership_type="Regular"):
-        self.member_id = Member.member_id_counter
-        Member.member_id_counter += 1
+    id_lock = threading.Lock()  # Makes reading and bumping member_id_counter one atomic step
+
+    # Membership type -> (max books, borrow duration in days)
+    MEMBERSHIP_LIMITS = {"Regular": (3, 14), "Premium": (10, 30), "Student": (5, 21)}
+    # Membership type -> hold queue lane; Premium holds are served before everyone else's
+    HOLD_PRIORITY = {"Premium": 0, "Regular": 1, "Student": 1}
+    # Membership type -> (fine per overdue day, most one loan can be fined or None for no cap)
+    FINE_POLICY = {"Regular": (0.50, None), "Premium": (0.50, None), "Student": (0.50, None)}
+    MEMBERSHIP_CODES = {name: code for code, name in enumerate(MEMBERSHIP_LIMITS)}  # Compact type codes
+
+    __slots__ = ("member_id", "name", "email", "phone", "membership_type",
+                 "registration_date", "borrowed_books", "borrowing_history", "fines",
+                 "library", "max_books", "borrow_duration")
+
+    def __init__(self, name, email, phone, membership_type="Regular", member_id=None, registration_date=None):
+        with Member.id_lock:
+            if member_id is None:
+                member_id = Member.member_id_counter
+            # Restored members (member_id given) must not be handed out again
+            Member.member_id_counter = max(Member.member_id_counter, member_id + 1)
+        self.member_id = member_id
         self.name = name
         self.email = email
         self.phone = phone
-        self.membership_type = membership_type  # Regular, Premium, Student
-        self.registration_date = datetime.now()
+        self.membership_type = sys.intern(membership_type)  # Regular, Premium, Student
+        self.registration_date = registration_date  # None until the library stamps it from its clock
         self.borrowed_books = {}  # {isbn: borrow_date}
-        self.borrowing_history = []
+        self.borrowing_history = BorrowingHistory()
         self.fines = 0.0
+        self.library = None  # Set by Library.register_member to keep fine totals current
 
         # Different membership types have different limits
-        self.max_books = {"Regular": 3, "Premium": 10, "Student": 5}[membership_type]
-        self.borrow_duration = {"Regular": 14, "Premium": 30, "Student": 21}[membership_type]
+        self.max_books, self.borrow_duration = Member.MEMBERSHIP_LIMITS[membership_type]
 
     def can_borrow(self):
         return len(self.borrowed_books) < self.max_books and self.fines == 0
 
-    def borrow_book(self, book):
+    def borrow_book(self, book, now=None):
         if not self.can_borrow():
             return False, "Cannot borrow: Limit reached or fines pending"
+        if book.isbn in self.borrowed_books:
+            return False, "You already have this book"
 
         if book.borrow(self.member_id):
-            self.borrowed_books[book.isbn] = datetime.now()
+            borrow_date = now or self.now()
+            self.borrowed_books[book.isbn] = borrow_date
+            if self.library is not None:
+                self.library.on_loan_started(self, book.isbn, borrow_date)
             return True, f"Successfully borrowed '{book.title}'"
         return False, "Book not available"
 
-    def return_book(self, book):
+    def return_book(self, book, now=None):
         if book.isbn not in self.borrowed_books:
             return False, "You haven't borrowed this book", 0
 
+        now = now or self.now()
         borrow_date = self.borrowed_books[book.isbn]
-        days_borrowed = (datetime.now() - borrow_date).days
+        days_borrowed = (now - borrow_date).days
 
         # Calculate fine if overdue
-        fine = 0
-        if days_borrowed > self.borrow_duration:
-            overdue_days = days_borrowed - self.borrow_duration
-            fine = overdue_days * 0.50  # $0.50 per day
+        fine = self.fine_for(days_borrowed)
+        if fine:
             self.fines += fine
+            if self.library is not None:
+                self.library.on_fines_changed(self, fine)
 
         book.return_book(self.member_id)
         del self.borrowed_books[book.isbn]
+        if self.library is not None:
+            self.library.on_loan_ended(self, book.isbn)
 
         # Add to history
-        self.borrowing_history.append({
-            "book": book.title,
-            "borrow_date": borrow_date,
-            "return_date": datetime.now(),
-            "days": days_borrowed,
-            "fine": fine
-        })
+        self.borrowing_history.add(book.isbn, book.title, borrow_date, now, days_borrowed, fine)
 
         return True, f"Returned '{book.title}' after {days_borrowed} days", fine
 
+    def fine_for(self, days_borrowed):
+        if days_borrowed > self.borrow_duration:
+            overdue_days = days_borrowed - self.borrow_duration
+            rate, cap = Member.FINE_POLICY[self.membership_type]
+            fine = overdue_days * rate
+            return fine if cap is None else min(fine, cap)
+        return 0
+
     def pay_fine(self, amount):
         if amount >= self.fines:
             paid = self.fines
             self.fines = 0
+            if self.library is not None:
+                self.library.on_fines_changed(self, -paid)
             return True, f"Paid ${paid:.2f}. No pending fines."
         else:
             self.fines -= amount
+            if self.library is not None:
+                self.library.on_fines_changed(self, -amount)
             return True, f"Paid ${amount:.2f}. Remaining fine: ${self.fines:.2f}"
 
-    def get_membership_duration(self):
-        duration = datetime.now() - self.registration_date
+    def get_membership_duration(self, as_of=None):
+        if self.registration_date is None:
+            return 0
+        duration = (as_of or self.now()) - self.registration_date
         return duration.days
 
-    def __str__(self):
+    def now(self):
+        """The current time on the library's clock (wall-clock time until registered)"""
+        return self.library.clock.now() if self.library is not None else datetime.now()
+
+    def describe(self, as_of=None):
         return (f"Member #{self.member_id}: {self.name} ({self.membership_type})\n"
                 f"  Email: {self.email} | Phone: {self.phone}\n"
                 f"  Books Borrowed: {len(self.borrowed_books)}/{self.max_books}\n"
                 f"  Pending Fines: ${self.fines:.2f}\n"
-                f"  Member for: {self.get_membership_duration()} days")
+                f"  Member for: {self.get_membership_duration(as_of)} days")
+
+    def __str__(self):
+        return self.describe()
+
+
+def edit_distance(a, b, limit):
+    """Edit distance (with adjacent transpositions) between a and b, capped at limit + 1
+
+    Bit-parallel (Myers/Hyyrö): one column of the DP table per character of b,
+    held as bit masks over the characters of a.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a:
+        return len(b)
+    matches = {}  # {character: bit mask of its positions in a}
+    for i, char in enumerate(a):
+        matches[char] = matches.get(char, 0) | (1 << i)
+    mask = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    positive, negative, diagonal, previous_match = mask, 0, 0, 0
+    distance = len(a)
+    for char in b:
+        match = matches.get(char, 0)
+        transposed = (((~diagonal) & match) << 1) & previous_match
+        diagonal = ((((match & positive) + positive) ^ positive) | match | negative | transposed) & mask
+        horizontal_positive = negative | ~(diagonal | positive)
+        horizontal_negative = diagonal & positive
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        shifted = (horizontal_positive << 1) | 1
+        negative = shifted & diagonal
+        positive = ((horizontal_negative << 1) | ~(shifted | diagonal)) & mask
+        previous_match = match
+    return min(distance, limit + 1)
+
+
+class TextIndex:
+    """Inverted index of words and character trigrams for substring and fuzzy search
+
+    Postings point at distinct lower-cased texts rather than keys, so an author
+    with hundreds of titles is tokenized and indexed only once. Added texts are
+    queued and tokenized on the next search, which keeps bulk loads and
+    startup from paying for indexing up front.
+    """
+
+    FUZZY_CANDIDATES = 2000  # Texts scored per fuzzy query at most; only unselective queries hit it
+
+    def __init__(self):
+        self.keys_by_text = {}  # {lower-cased text: {key: None}} in insertion order
+        self.positions = {}  # {key: insertion order}
+        self.words = {}  # {word: set of texts}
+        self.trigrams = {}  # {trigram: set of texts}
+        # Vocabulary indexes for fuzzy search: single-character deletions of short words,
+        # trigrams of long ones
+        self.word_deletes = {}  # {word or word minus one character: set of words}
+        self.word_trigrams = {}  # {trigram of " word ": set of words}
+        self.pending = []  # (key, text) pairs not yet tokenized
+
+    @staticmethod
+    def trigrams_of(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def deletes_of(word):
+        return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+    def add(self, key, text):
+        self.positions[key] = len(self.positions)
+        self.pending.append((key, text))
+
+    def add_many(self, keys, texts):
+        """add for keys not in the index yet, in bulk"""
+        self.positions.update(zip(keys, range(len(self.positions), len(self.positions) + len(keys))))
+        self.pending.extend(zip(keys, texts))
+
+    def build_pending(self):
+        for key, text in self.pending:
+            text = text.lower()
+            keys = self.keys_by_text.get(text)
+            if keys is None:
+                keys = self.keys_by_text[text] = {}
+                for word in set(text.split()):
+                    if word not in self.words:
+                        self.words[word] = set()
+                        self.index_word(word)
+                    self.words[word].add(text)
+                for trigram in self.trigrams_of(text):
+                    self.trigrams.setdefault(trigram, set()).add(text)
+            keys[key] = None
+        self.pending = []
+
+    def search(self, query):
+        """Return keys whose text contains query (case-insensitive), in insertion order"""
+        if self.pending:
+            self.build_pending()
+        query = query.lower()
+        if not query:
+            return list(self.positions)
+
+        if len(query) >= 3:
+            # Every trigram of the query must occur in a match: intersect smallest lists first
+            postings = sorted((self.trigrams.get(t, ()) for t in self.trigrams_of(query)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        elif query.split() == [query]:
+            # Short queries inside one word: scan the word vocabulary, not the catalog
+            candidates = set()
+            for word, texts in self.words.items():
+                if query in word:
+                    candidates.update(texts)
+        else:
+            candidates = self.keys_by_text
+
+        # Trigrams match out of order, so confirm the real substring on candidates only
+        texts = [text for text in candidates if query in text]
+        matches = [key for text in texts for key in self.keys_by_text[text]]
+        if len(texts) > 1:
+            matches.sort(key=self.positions.__getitem__)
+        return matches
+
+    def index_word(self, word):
+        # Queries of 4-7 characters allow one edit, so their matches are 3-8 characters long
+        if 3 <= len(word) <= 8:
+            for variant in self.deletes_of(word) | {word}:
+                self.word_deletes.setdefault(variant, set()).add(word)
+        # Queries of 8+ characters allow two edits, so their matches are at least 6 long
+        if len(word) >= 6:
+            for trigram in self.trigrams_of(f" {word} "):
+                self.word_trigrams.setdefault(trigram, set()).add(word)
+
+    def similar_words(self, word):
+        """{vocabulary word: similarity} for words within a small edit distance of word
+
+        Words under 4 characters must match exactly, up to 7 may be one edit
+        away and longer words two (a transposition counts as one edit).
+        """
+        if len(word) < 4:
+            return {word: 1.0} if word in self.words else {}
+        if len(word) < 8:
+            # Any single edit leaves the two words sharing a one-deletion variant
+            limit = 1
+            candidates = set().union(*(self.word_deletes.get(variant, ())
+                                       for variant in self.deletes_of(word) | {word}))
+        else:
+            # Each edit destroys at most 3 of the query's trigrams, so a match must appear
+            # in at least one of the 3 * limit + 1 shortest posting lists
+            limit = 2
+            grams = self.trigrams_of(f" {word} ")
+            postings = sorted((self.word_trigrams.get(t, ()) for t in grams), key=len)
+            # The same bound, checked per candidate, is far cheaper than an edit distance
+            needed = len(grams) - 3 * limit
+            candidates = [candidate for candidate in set().union(*postings[:3 * limit + 1])
+                          if abs(len(candidate) - len(word)) <= limit
+                          and sum(candidate in posting for posting in postings) >= needed]
+        similar = {}
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                similar[candidate] = 1 - distance / max(len(word), len(candidate))
+        return similar
+
+    def fuzzy(self, query, limit=10):
+        """Best (score, key) pairs for a typo-tolerant query, best first
+
+        Each query word is matched against the vocabulary rather than the
+        catalog. A text scores the mean over query words of its most similar
+        word (1.0 for exact). Ties go to the shorter text.
+        """
+        if self.pending:
+            self.build_pending()
+        matches = [self.similar_words(word) for word in query.lower().split()]
+        if not matches:
+            return []
+
+        # Candidates come from the most selective query word; the next one is only consulted when
+        # that gives fewer than limit texts, and a very common word is truncated to the budget
+        by_size = sorted(matches, key=lambda similar: sum(len(self.words[word]) for word in similar))
+        candidates = set()
+        for similar in by_size:
+            for word in sorted(similar, key=similar.get, reverse=True):
+                texts = self.words[word]
+                room = self.FUZZY_CANDIDATES - len(candidates)
+                candidates.update(texts if len(texts) <= room else islice(texts, room))
+                if len(candidates) >= self.FUZZY_CANDIDATES:
+                    break
+            if len(candidates) >= limit:
+                break
+
+        scores = dict.fromkeys(candidates, 0.0)
+        for similar in matches:
+            best = {}  # {candidate text: its best similarity to this query word}
+            for word, similarity in similar.items():
+                texts = self.words[word]
+                # Walk whichever side is smaller
+                if len(texts) < len(scores):
+                    hits = [text for text in texts if text in scores]
+                else:
+                    hits = [text for text in scores if text in texts]
+                for text in hits:
+                    if similarity > best.get(text, 0.0):
+                        best[text] = similarity
+            for text, similarity in best.items():
+                scores[text] += similarity
+        scored = ((score / len(matches), -len(text), text) for text, score in scores.items())
+        results = []
+        for score, _, text in heapq.nlargest(limit, scored):
+            results.extend((score, key) for key in self.keys_by_text[text])
+        return results[:limit]
+
+
+class PrefixIndex:
+    """Sorted (word, key) entries for word-prefix lookups such as a name typed at the desk
+
+    Like TextIndex, additions are queued and merged in on the next lookup; the
+    merge is a single sort of an already sorted list plus the sorted new run.
+    """
+
+    def __init__(self):
+        self.entries = []  # Sorted (lower-cased word, key)
+        self.texts = {}  # {key: " " + lower-cased words joined by spaces}
+        self.pending = []
+        self.deferred = []  # (keys, texts) columns from add_later, not split into words yet
+
+    def add(self, key, text):
+        words = text.lower().split()
+        self.texts[key] = " " + " ".join(words)
+        self.pending.extend((word, key) for word in set(words))
+
+    def add_later(self, keys, texts):
+        """Queue whole columns of keys and texts; they are only split into words on the first lookup"""
+        self.deferred.append((keys, texts))
+
+    def span(self, prefix):
+        """(first, last) positions of the entries whose word starts with prefix"""
+        if self.pending:
+            self.pending.sort()
+            self.entries.extend(self.pending)
+            self.entries.sort()
+            self.pending = []
+        return (bisect.bisect_left(self.entries, (prefix,)),
+                bisect.bisect_left(self.entries, (prefix + "\U0010ffff",)))
+
+    def search(self, query, limit):
+        """Up to limit distinct keys whose text has a word starting with each query word
+
+        Only the narrowest query word's range is walked; the other query words
+        are checked against each candidate's text.
+        """
+        prefixes = query.lower().split()
+        if not prefixes:
+            return []
+        while self.deferred:
+            keys, texts = self.deferred.pop()
+            for key, text in zip(keys, texts):
+                self.add(key, text)
+        spans = [(self.span(prefix), prefix) for prefix in prefixes]
+        spans.sort(key=lambda item: item[0][1] - item[0][0])
+        (first, last), _ = spans[0]
+        others = [" " + prefix for _, prefix in spans[1:]]  # " prefix" in text: a word starts with prefix
+        entries, texts = self.entries, self.texts
+        found = {}
+        for position in range(first, last):
+            key = entries[position][1]
+            if key in found:
+                continue
+            text = texts[key]
+            for prefix in others:
+                if prefix not in text:
+                    break
+            else:
+                found[key] = None
+                if len(found) >= limit:
+                    break
+        return list(found)
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def normalize_phone(phone):
+    """Digits only, so "555-0101" and "(555) 0101" match; too few digits to be a number gives ''"""
+    digits = "".join(filter(str.isdigit, phone))
+    return digits if len(digits) >= 4 else ""
+
+
+class SortedView:
+    """(sort key, id) pairs in key order, for cursor pagination
+
+    A cursor is the pair of the last record on a page, so pages stay
+    consistent while records are added. New records queue up in pending and
+    are merged in on the next read; timsort merges the two sorted runs in
+    linear time.
+    """
+
+    def __init__(self, key, records):
+        self.key = key
+        self.entries = sorted((key(record), ident) for ident, record in records)
+        self.pending = []
+
+    def add(self, ident, record):
+        self.pending.append((self.key(record), ident))
+
+    def page(self, after, limit):
+        if limit < 1:
+            raise ValueError(f"Page limit must be at least 1, not {limit}")
+        if self.pending:
+            self.pending.sort()
+            self.entries += self.pending
+            self.entries.sort()
+            self.pending = []
+        start = 0 if after is None else bisect.bisect_right(self.entries, tuple(after))
+        return self.entries[start:start + limit]
+
+
+# Sort orders for paging and rendering; each key is fixed once a record is stored
+BOOK_SORTS = {
+    "isbn": lambda book: book.isbn,
+    "title": lambda book: book.title.lower(),
+    "author": lambda book: book.author.lower(),
+    "year": lambda book: book.publication_year,
+}
+MEMBER_SORTS = {
+    "member_id": lambda member: member.member_id,
+    "name": lambda member: member.name.lower(),
+    "email": lambda member: normalize_email(member.email),
+    "registered": lambda member: to_epoch_us(member.registration_date),
+}
+
+BOOK_COLUMNS = ("isbn", "title", "author", "genre", "year", "available", "total")
+MEMBER_COLUMNS = ("member_id", "name", "email", "phone", "type", "loans", "max_books", "fines", "member_days")
+RENDER_FORMATS = ("text", "csv", "jsonl")
+JSONL_ENCODER = json.JSONEncoder(check_circular=False)  # Rows are flat, so skip the cycle bookkeeping
+
+
+def book_values(book):
+    return (book.isbn, book.title, book.author, book.genre.name, book.publication_year,
+            book.available_copies, book.total_copies)
+
+
+def member_values(member, as_of):
+    return (member.member_id, member.name, member.email, member.phone, member.membership_type,
+            len(member.borrowed_books), member.max_books, member.fines, member.get_membership_duration(as_of))
+
+
+def book_text(book):
+    return f"  [{book.isbn}] {book}\n"
+
+
+def member_text(member, as_of):
+    return f"\n{member.describe(as_of)}\n"
+
+
+def render_rows(sink, format, columns, rows, header):
+    """Write one page of value tuples to sink with a single write() call"""
+    if format == "jsonl":
+        encode = JSONL_ENCODER.encode
+        sink.write("".join(encode(dict(zip(columns, row))) + "\n" for row in rows))
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    sink.write(buffer.getvalue())
+
+
+class DueDateIndex:
+    """Min-heap of open loans keyed by the moment they become overdue
+
+    Returned or replaced loans are not dug out of the heap; their entries are
+    recognised as stale (borrow date no longer matches) and dropped when popped.
+    """
+
+    def __init__(self):
+        self.upcoming = []  # heap of (overdue_at, sequence, member_id, isbn, borrow_date)
+        self.overdue = {}  # {(member_id, isbn): (overdue_at, borrow_date)} already past due
+        self.loans = {}  # {(member_id, isbn): borrow_date} for every open loan
+        self.feed = []  # Loans that became overdue since the last newly_overdue() call
+        self.sequence = 0
+        self.table = None  # LoanTable to index in one go on the first query, see defer_to
+
+    def defer_to(self, table):
+        """Leave the open loans to a LoanTable (kept current by the library) and index them on first use
+
+        Until then add and remove do nothing, so a restored library does not
+        build a heap entry per open loan at startup.
+        """
+        self.table = table
+
+    def load(self):
+        table, self.table = self.table, None
+        durations = [timedelta(days=duration) for _, duration in Member.MEMBERSHIP_LIMITS.values()]
+        for (member_id, isbn), row in table.rows.items():
+            # due_us is the wall clock end of the loan period: borrow date + borrow_duration days
+            due = WALL_EPOCH + table.due_us[row] * MICROSECOND
+            borrow_date = due - durations[table.types[row]]
+            self.loans[(member_id, isbn)] = borrow_date
+            self.sequence += 1
+            self.upcoming.append((due + timedelta(days=1), self.sequence, member_id, isbn, borrow_date))
+        heapq.heapify(self.upcoming)
+
+    def add(self, member_id, isbn, borrow_date, borrow_duration):
+        if self.table is not None:
+            return
+        # Member.return_book charges a fine once more than borrow_duration whole days have passed
+        overdue_at = borrow_date + timedelta(days=borrow_duration + 1)
+        self.loans[(member_id, isbn)] = borrow_date
+        self.overdue.pop((member_id, isbn), None)
+        self.sequence += 1
+        heapq.heappush(self.upcoming, (overdue_at, self.sequence, member_id, isbn, borrow_date))
+
+    def remove(self, member_id, isbn):
+        self.loans.pop((member_id, isbn), None)
+        self.overdue.pop((member_id, isbn), None)
+
+    def advance(self, as_of):
+        """Move loans that are overdue at as_of from the heap to the overdue set"""
+        if self.table is not None:
+            self.load()
+        upcoming = self.upcoming
+        while upcoming and upcoming[0][0] <= as_of:
+            overdue_at, _, member_id, isbn, borrow_date = heapq.heappop(upcoming)
+            if self.loans.get((member_id, isbn)) == borrow_date:
+                self.overdue[(member_id, isbn)] = (overdue_at, borrow_date)
+                self.feed.append((member_id, isbn, overdue_at))
+
+    def overdue_at(self, as_of):
+        """(overdue_at, member_id, isbn) for loans overdue at as_of, earliest first"""
+        self.advance(as_of)
+        due = [(overdue_at, member_id, isbn) for (member_id, isbn), (overdue_at, _) in self.overdue.items()
+               if overdue_at <= as_of]
+        due.sort()
+        return due
+
+    def newly_overdue(self, as_of):
+        """Loans that crossed their due date since the previous call, each reported once"""
+        self.advance(as_of)
+        feed = [(overdue_at, member_id, isbn) for member_id, isbn, overdue_at in self.feed
+                if (member_id, isbn) in self.overdue]
+        self.feed = []
+        return feed
+
+
+class LoanTable:
+    """Every open loan as a row of parallel arrays, for passes over the whole library
+
+    A row holds the borrower, the wall-clock microsecond their loan period
+    ends (see wall_us) and their MEMBERSHIP_CODES type. Rows freed by
+    returns are reused, and a free row has member -1.
+    """
+
+    def __init__(self):
+        self.members = array("q")  # member_id, or -1 for a free row
+        self.due_us = array("q")
+        self.types = array("b")
+        self.isbns = []
+        self.rows = {}  # {(member_id, isbn): row}
+        self.free = []
+
+    @classmethod
+    def from_columns(cls, members, due_us, types, isbns):
+        """Table holding one loan per row of the given columns, e.g. a snapshot's"""
+        table = cls()
+        table.members, table.due_us, table.types, table.isbns = members, due_us, types, list(isbns)
+        table.rows = dict(zip(zip(members, isbns), range(len(members))))
+        return table
+
+    def add(self, member_id, isbn, due_us, type_code):
+        row = self.rows.get((member_id, isbn))
+        if row is None and self.free:
+            row = self.free.pop()
+        if row is None:
+            self.rows[(member_id, isbn)] = len(self.members)
+            self.members.append(member_id)
+            self.due_us.append(due_us)
+            self.types.append(type_code)
+            self.isbns.append(isbn)
+            return
+        self.rows[(member_id, isbn)] = row
+        self.members[row] = member_id
+        self.due_us[row] = due_us
+        self.types[row] = type_code
+        self.isbns[row] = isbn
+
+    def remove(self, member_id, isbn):
+        row = self.rows.pop((member_id, isbn), None)
+        if row is not None:
+            self.members[row] = -1
+            self.isbns[row] = None
+            self.free.append(row)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+HOLD_DAYS = 60  # How long a hold waits for a copy before it lapses
+
+
+class HoldQueue:
+    """Holds on one title, first come first served within each membership priority
+
+    Every priority has its own FIFO lane of member IDs, and every hold keeps
+    a ticket: its lane's head ticket plus the holds ahead of it in the lane.
+    Serving the head is a popleft, and a holder's position is a subtraction
+    plus the lengths of the higher lanes. Taking a hold out of the middle of
+    a lane (cancelled, lapsed, or the holder borrowed a copy) renumbers only
+    the holds behind it.
+    """
+
+    def __init__(self):
+        lanes = max(Member.HOLD_PRIORITY.values()) + 1
+        self.lanes = [deque() for _ in range(lanes)]  # Member IDs, highest priority lane first
+        self.heads = [0] * lanes  # Ticket of the first hold in each lane
+        self.holds = {}  # {member_id: (lane, ticket, expires)}
+
+    def add(self, member_id, priority, expires):
+        lane = self.lanes[priority]
+        self.holds[member_id] = (priority, self.heads[priority] + len(lane), expires)
+        lane.append(member_id)
+
+    def remove(self, member_id):
+        priority, ticket, _ = self.holds.pop(member_id)
+        lane = self.lanes[priority]
+        offset = ticket - self.heads[priority]
+        if offset == 0:
+            lane.popleft()
+            self.heads[priority] += 1
+            return
+        del lane[offset]
+        for behind in islice(lane, offset, None):
+            _, ticket, expires = self.holds[behind]
+            self.holds[behind] = (priority, ticket - 1, expires)
+
+    def position(self, member_id):
+        """1-based place in the queue, or None without a hold"""
+        if member_id not in self.holds:
+            return None
+        priority, ticket, _ = self.holds[member_id]
+        ahead = sum(len(self.lanes[higher]) for higher in range(priority))
+        return ahead + ticket - self.heads[priority] + 1
+
+    def expires(self, member_id):
+        hold = self.holds.get(member_id)
+        return hold[2] if hold is not None else None
+
+    def first(self, eligible):
+        """The first holder, in serving order, for whom eligible(member_id) is true"""
+        for lane in self.lanes:
+            for member_id in lane:
+                if eligible(member_id):
+                    return member_id
+        return None
+
+    def members(self):
+        """(member_id, expires) in serving order"""
+        return [(member_id, self.holds[member_id][2]) for lane in self.lanes for member_id in lane]
+
+    def __contains__(self, member_id):
+        return member_id in self.holds
+
+    def __len__(self):
+        return len(self.holds)
+
+
+class RankedCounter:
+    """Counts kept in count order: +1/-1 in O(1) and the top k in O(k)
+
+    Items with equal counts share a bucket, and the nonempty buckets form a
+    doubly linked list ordered by count. Changing a count only walks to the
+    neighbouring buckets it crosses, so a step of one touches at most one.
+    """
+
+    def __init__(self):
+        self.counts = {}  # {item: count}
+        self.buckets = {0: {}}  # {count: {item: None}}; 0 is the empty floor of the list
+        self.higher = {0: None}  # {count: next nonempty count above it, None past the top}
+        self.lower = {None: 0}  # {count: next nonempty count below it}
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Build from an {item: count} dict in one pass over the sorted counts"""
+        ranked = cls()
+        previous = 0
+        for item, count in sorted(counts.items(), key=lambda pair: pair[1]):
+            if count != previous:
+                ranked.buckets[count] = {}
+                ranked.higher[previous] = count
+                ranked.lower[count] = previous
+                previous = count
+            ranked.buckets[count][item] = None
+            ranked.counts[item] = count
+        ranked.higher[previous] = None
+        ranked.lower[None] = previous
+        return ranked
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def get(self, item):
+        return self.counts.get(item, 0)
+
+    def add(self, item, delta=1):
+        """Change item's count by delta; an item whose count drops to 0 is forgotten"""
+        old = self.counts.get(item, 0)
+        new = max(old + delta, 0)
+        if new == old:
+            return
+        higher, lower = self.higher, self.lower
+        # Find the nonempty buckets either side of the new count, starting from the old one
+        if new > old:
+            below, above = old, higher[old]
+            while above is not None and above <= new:
+                below, above = above, higher[above]
+        else:
+            below, above = lower[old], old
+            while below > new:
+                below, above = lower[below], below
+        if new and below != new:
+            self.buckets[new] = {}
+            higher[below] = lower[above] = new
+            higher[new], lower[new] = above, below
+
+        if old:
+            bucket = self.buckets[old]
+            del bucket[item]
+            if not bucket:
+                del self.buckets[old]
+                higher[lower[old]] = higher[old]
+                lower[higher[old]] = lower[old]
+                del higher[old], lower[old]
+        if new:
+            self.buckets[new][item] = None
+            self.counts[item] = new
+        else:
+            del self.counts[item]
+
+    def increment(self, item):
+        """add(item, 1) without the walk: count + 1 is either the next bucket up or a new one"""
+        counts, buckets, higher, lower = self.counts, self.buckets, self.higher, self.lower
+        old = counts.get(item, 0)
+        new = old + 1
+        counts[item] = new
+        if new in buckets:
+            buckets[new][item] = None
+        elif old and len(buckets[old]) == 1:
+            # Alone at old with nothing at new (typical of the few busiest titles): relabel the bucket
+            buckets[new] = buckets.pop(old)
+            below, above = lower.pop(old), higher.pop(old)
+            higher[below] = lower[above] = new
+            higher[new], lower[new] = above, below
+            return
+        else:
+            above = higher[old]
+            buckets[new] = {item: None}
+            higher[old] = lower[above] = new
+            higher[new], lower[new] = above, old
+        if old:
+            bucket = buckets[old]
+            del bucket[item]
+            if not bucket:
+                del buckets[old]
+                higher[lower[old]] = higher[old]
+                lower[higher[old]] = lower[old]
+                del higher[old], lower[old]
+
+    def update(self, counts):
+        """Add {item: delta} counts, like Counter.update"""
+        for item, delta in counts.items():
+            if delta == 1:
+                self.increment(item)
+            else:
+                self.add(item, delta)
+
+    def lowest(self):
+        """(item, count) for an item with the smallest count, or None when empty"""
+        count = self.higher[0]
+        if count is None:
+            return None
+        return next(iter(self.buckets[count])), count
+
+    def top(self, k):
+        """The k highest (item, count) pairs, highest first"""
+        results = []
+        count = self.lower[None]
+        while count and len(results) < k:
+            results.extend(islice(((item, count) for item in self.buckets[count]), k - len(results)))
+            count = self.lower[count]
+        return results
+
+
+class SlidingTopK:
+    """Approximate per-item counts over a sliding time window, in bounded memory
+
+    The window is cut into `slices` equal time slices, each with its own
+    Space-Saving summary of at most `capacity` items: once a slice is full, a
+    newcomer takes the place of its least counted item and inherits that count.
+    The window total is the sum of the live slices, kept in a RankedCounter and
+    reduced again as each slice falls out of the window. Every count is within
+    (borrows in the window) / capacity of the true one.
+    """
+
+    def __init__(self, span, slices, capacity):
+        self.slice_seconds = span.total_seconds() / slices
+        self.slices = slices
+        self.capacity = capacity
+        self.counts = RankedCounter()  # Window totals
+        self.history = deque()  # [slice number, {item: count}, RankedCounter once the slice is full]
+
+    def record(self, counts, seconds):
+        """Count {item: borrows} that all fell in the slice holding `seconds`"""
+        number = int(seconds // self.slice_seconds)
+        history = self.history
+        if not history or history[-1][0] < number:
+            self.expire(seconds)
+            history.append([number, {}, None])
+        current = history[-1]  # An out-of-order moment is charged to the newest slice
+
+        for item, count in counts.items():
+            ranked = current[2]
+            if ranked is not None:
+                if item not in ranked:
+                    evicted, floor = ranked.lowest()
+                    ranked.add(evicted, -floor)
+                    ranked.add(item, floor)
+                    self.counts.add(evicted, -floor)
+                    self.counts.add(item, floor)
+                ranked.add(item, count)
+            else:
+                slice_counts = current[1]
+                slice_counts[item] = slice_counts.get(item, 0) + count
+                if len(slice_counts) >= self.capacity:
+                    current[2] = RankedCounter.from_counts(slice_counts)
+                    current[1] = current[2].counts
+        self.counts.update(counts)
+
+    def expire(self, seconds):
+        """Take back the counts of slices that are no longer in the window at `seconds`"""
+        oldest = int(seconds // self.slice_seconds) - self.slices + 1
+        history = self.history
+        while history and history[0][0] < oldest:
+            for item, count in history.popleft()[1].items():
+                self.counts.add(item, -count)
+
+    def top(self, k, seconds):
+        self.expire(seconds)
+        return self.counts.top(k)
+
+
+class PopularityTracker:
+    """Borrow counts per title: exact all-time totals plus sliding hour/day/week windows
+
+    A borrow is only queued by record. The queue is counted in one go by the
+    next top(), or once it holds FOLD_EVERY borrows, so that repeat borrows of
+    a busy title in the same slice cost one count update instead of several.
+    """
+
+    WINDOWS = {"hour": (timedelta(hours=1), 60), "day": (timedelta(days=1), 24), "week": (timedelta(weeks=1), 168)}
+    FOLD_EVERY = 1024
+
+    def __init__(self, capacity=1000):
+        self.all_time = RankedCounter()
+        self.windows = {name: SlidingTopK(span, slices, capacity) for name, (span, slices) in self.WINDOWS.items()}
+        self.pending = []  # [(isbn, when)] not yet counted
+
+    def record(self, isbn, when):
+        pending = self.pending
+        pending.append((isbn, when))
+        if len(pending) >= self.FOLD_EVERY:
+            self.fold()
+
+    def fold(self):
+        """Count the queued borrows into the all-time totals and every window"""
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        isbns = [isbn for isbn, _ in pending]
+        moments = [when.timestamp() for _, when in pending]
+        self.all_time.update(Counter(isbns))
+        for window in self.windows.values():
+            width = window.slice_seconds
+            start = 0
+            for _, run in groupby([seconds // width for seconds in moments]):
+                end = start + sum(1 for _ in run)
+                window.record(Counter(isbns[start:end]), moments[end - 1])
+                start = end
+
+    def top(self, k, window=None, as_of=None):
+        """The k most borrowed (isbn, borrows) over the window ending at as_of (default now)"""
+        self.fold()
+        if window is None:
+            return self.all_time.top(k)
+        if window not in self.windows:
+            raise ValueError(f"Unknown window {window!r}; expected one of {', '.join(self.windows)}")
+        return self.windows[window].top(k, (as_of or datetime.now()).timestamp())
+
+
+class CoBorrowIndex:
+    """The "also borrowed" index: how many members returned both of two titles
+
+    Scores are cosine similarities, shared readers / sqrt(readers of a * readers of b),
+    and each title keeps its NEIGHBORS best scoring titles precomputed. The index is
+    built from every member's history on first use and then updated on each return;
+    a title whose counts changed has its neighbour list recomputed the next time it
+    is asked for.
+    """
+
+    NEIGHBORS = 20  # Neighbour list length kept per title
+    BASKET = 200  # Only a member's most recent distinct titles pair up, bounding the pairs per member
+    PROFILE = 10  # Recent titles whose neighbours are pooled for a member's recommendations
+
+    def __init__(self):
+        self.built = False
+        self.readers = Counter()  # {isbn: members with it in their basket}
+        self.pairs = {}  # {isbn: {other isbn: members with both in their basket}}
+        self.baskets = {}  # {member_id: {isbn: None}} distinct returned titles, oldest first
+        self.neighbors = {}  # {isbn: [(score, other isbn)]} best first
+        self.stale = set()  # Titles whose neighbour list is out of date
+
+    def build(self, histories):
+        """Count pairs from (member_id, isbns in return order) for every member"""
+        for member_id, isbns in histories:
+            basket = dict.fromkeys(reversed(isbns))  # Most recent return of each title first
+            basket = dict.fromkeys(reversed(list(islice(basket, self.BASKET))))
+            if basket:
+                self.baskets[member_id] = basket
+
+        # Sparse co-occurrence counts, one row per title (B^T B of the member x title matrix)
+        readers, pairs = self.readers, self.pairs
+        for basket in self.baskets.values():
+            for isbn in basket:
+                readers[isbn] += 1
+                row = pairs.setdefault(isbn, {})
+                for other in basket:
+                    if other != isbn:
+                        row[other] = row.get(other, 0) + 1
+        for isbn in pairs:
+            self.refresh(isbn)
+        self.built = True
+
+    def add(self, member_id, isbn):
+        """Count a returned title against the member's earlier ones"""
+        if not self.built:
+            return  # The first build reads it from the history
+        basket = self.baskets.setdefault(member_id, {})
+        if isbn in basket:
+            del basket[isbn]  # Only moves to the recent end
+            basket[isbn] = None
+            return
+        if len(basket) >= self.BASKET:
+            oldest = next(iter(basket))
+            del basket[oldest]
+            self.pair_up(oldest, basket, -1)
+        self.pair_up(isbn, basket, 1)
+        basket[isbn] = None
+
+    def pair_up(self, isbn, basket, delta):
+        pairs = self.pairs
+        row = pairs.setdefault(isbn, {})
+        for other in basket:
+            row[other] = row.get(other, 0) + delta
+            pairs[other][isbn] = pairs[other].get(isbn, 0) + delta
+            self.stale.add(other)
+        self.readers[isbn] += delta
+        self.stale.add(isbn)
+
+    def refresh(self, isbn):
+        readers = self.readers
+        norm = readers[isbn]
+        self.neighbors[isbn] = heapq.nlargest(
+            self.NEIGHBORS, ((count / math.sqrt(norm * readers[other]), other)
+                             for other, count in self.pairs.get(isbn, {}).items() if count > 0))
+        self.stale.discard(isbn)
+
+    def similar(self, isbn, k):
+        """Up to k (score, isbn) most often borrowed alongside isbn, best first"""
+        if isbn in self.stale:
+            self.refresh(isbn)
+        return self.neighbors.get(isbn, [])[:k]
+
+    def for_member(self, member_id, k, exclude=()):
+        """Up to k (score, isbn) pooled from the neighbours of the member's recent titles"""
+        basket = self.baskets.get(member_id, {})
+        scores = {}
+        for isbn in list(islice(reversed(basket), self.PROFILE)):
+            if isbn in self.stale:
+                self.refresh(isbn)
+            for score, other in self.neighbors.get(isbn, ()):
+                if other not in basket and other not in exclude:
+                    scores[other] = scores.get(other, 0.0) + score
+        return heapq.nlargest(k, ((score, isbn) for isbn, score in scores.items()))
+
+
+def to_epoch_us(moment):
+    """Integer microseconds since the epoch for a (naive, local) datetime"""
+    return round(moment.timestamp() * 1000000)
+
+
+WALL_EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+DAY_US = 86400 * 1000000
+
+
+def wall_us(moment):
+    """Microseconds since 1970-01-01 on moment's own wall clock
+
+    Unlike to_epoch_us this ignores DST shifts, so differences agree with
+    naive datetime subtraction (what Member.return_book fines by).
+    """
+    return (moment - WALL_EPOCH) // MICROSECOND
+
+
+def from_epoch_us(timestamp_us):
+    # A double holds epoch seconds to well under half a microsecond until 2106,
+    # so this round-trips to_epoch_us exactly
+    return datetime.fromtimestamp(timestamp_us / 1000000)
+
+
+class TransactionOp(IntEnum):
+    """Operation codes stored in TransactionLog records"""
+    REGISTER = 1
+    BORROW = 2
+    RETURN = 3
+    ADD_BOOK = 4
+    PAY_FINE = 5
+    BORROW_BATCH = 6  # details: JSON list of ISBNs
+    RETURN_BATCH = 7  # details: JSON list of ISBNs, fine: total fine
+    HOLD = 8  # details: JSON {"days": days until the hold lapses}
+    CANCEL_HOLD = 9
+    DETAIL = 15  # Continuation record carrying part of the previous record's details text
+
+
+LOG_SEGMENT_BYTES = 4 * 1024 * 1024  # Default TransactionLog segment size
+TransactionRecord = namedtuple("TransactionRecord", "timestamp_us op member_id isbn fine details",
+                               defaults=(None,))
+
+
+class LogSegment:
+    """One fixed-width record file (or in-memory buffer) plus the timestamp range of each block of records"""
+
+    def __init__(self, number, path=None):
+        self.number = number
+        self.path = path
+        self.data = bytearray() if path is None else None
+        self.count = 0
+        # Earliest and latest timestamp of each index_every records; None for a segment loaded
+        # from disk until a time-range query first reads it
+        self.lowest = array("q")
+        self.highest = array("q")
+
+    def size(self):
+        return self.count * TransactionLog.RECORD.size
+
+    def read(self, first, last):
+        """Raw bytes of records first..last-1"""
+        size = TransactionLog.RECORD.size
+        if self.data is not None:
+            return bytes(self.data[first * size:last * size])
+        with open(self.path, "rb") as f:
+            f.seek(first * size)
+            return f.read((last - first) * size)
+
+
+class TransactionLog:
+    """Append-only log of fixed-width binary records in size-rotated segments
+
+    Each record is (epoch microseconds, op code, member_id, fine, isbn) packed into
+    RECORD.size bytes. Records that need free text (a new member's name, a new
+    title) carry it as JSON in DETAIL continuation records that directly follow
+    them and never cross a segment boundary. With a directory the segments are
+    files named 00000001.log, 00000002.log, ... and only the per-block timestamp
+    ranges stay in memory; without one the segments are in-memory buffers.
+
+    Records keep the timestamp the caller gave, so one made with an earlier
+    `now` replays at that time; the log order is the order things happened.
+    Time-range queries therefore read every block whose range overlaps.
+
+    Without max_segments the log keeps every segment, so an in-memory log
+    grows for as long as the library runs. With it, segments beyond
+    max_segments are dropped oldest first, and the log holds the last
+    max_segments * segment_bytes bytes or so. records_since refuses a
+    position inside a dropped segment, so a restart must start from a
+    snapshot taken after it (see library_snapshot).
+    """
+
+    ISBN_BYTES = 20  # Longer ISBNs are refused rather than cut off
+    RECORD = struct.Struct(f"<qBqd{ISBN_BYTES}s")
+    DETAIL = struct.Struct("<qB36s")  # Same width as RECORD
+
+    def __init__(self, directory=None, segment_bytes=LOG_SEGMENT_BYTES, index_every=256, max_segments=None):
+        if max_segments is not None and max_segments < 1:
+            raise ValueError("max_segments must be at least 1")
+        self.directory = directory
+        self.segment_records = max(1, segment_bytes // self.RECORD.size)
+        self.index_every = index_every
+        self.max_segments = max_segments
+        self.segments = []
+        self.dropped = 0  # Records in the segments max_segments has dropped so far
+        self.file = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.load_segments()
+
+    def load_segments(self):
+        """Pick up the segment files left by a previous run; their blocks are read on the first between()"""
+        size = self.RECORD.size
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".log"):
+                continue
+            segment = LogSegment(int(filename[:-4]), os.path.join(self.directory, filename))
+            segment.count = os.path.getsize(segment.path) // size
+            if os.path.getsize(segment.path) != segment.count * size:
+                # Cut off a torn last record, or appends would land at the wrong offsets
+                os.truncate(segment.path, segment.count * size)
+            if segment.count == 0:
+                continue
+            segment.lowest = segment.highest = None
+            self.segments.append(segment)
+
+    def bound_blocks(self, segment):
+        """Fill in the per-block timestamp ranges of a segment loaded from disk"""
+        segment.lowest, segment.highest = array("q"), array("q")
+        for first in range(0, segment.count, self.index_every):
+            raw = segment.read(first, min(first + self.index_every, segment.count))
+            stamps = [record[0] for record in self.RECORD.iter_unpack(raw)]
+            segment.lowest.append(min(stamps))
+            segment.highest.append(max(stamps))
+
+    def new_segment(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        number = self.segments[-1].number + 1 if self.segments else 1
+        path = None
+        if self.directory is not None:
+            path = os.path.join(self.directory, f"{number:08d}.log")
+        segment = LogSegment(number, path)
+        self.segments.append(segment)
+        if self.max_segments is not None:
+            while len(self.segments) > self.max_segments:
+                oldest = self.segments.pop(0)
+                self.dropped += oldest.count
+                if oldest.path is not None and os.path.exists(oldest.path):
+                    os.remove(oldest.path)
+        return segment
+
+    def append(self, op, member_id, isbn="", fine=0.0, timestamp_us=None, details=None):
+        encoded_isbn = isbn.encode()
+        if len(encoded_isbn) > self.ISBN_BYTES:
+            raise ValueError(f"ISBN {isbn!r} is longer than {self.ISBN_BYTES} bytes")
+        if timestamp_us is None:
+            timestamp_us = to_epoch_us(datetime.now())
+
+        records = [self.RECORD.pack(timestamp_us, op, member_id, fine, encoded_isbn)]
+        if details:
+            payload = details.encode()
+            width = self.DETAIL.size - 9
+            records.extend(self.DETAIL.pack(timestamp_us, TransactionOp.DETAIL, payload[i:i + width])
+                           for i in range(0, len(payload), width))
+
+        segment = self.segments[-1] if self.segments else None
+        if segment is None or (segment.count and segment.count + len(records) > self.segment_records):
+            segment = self.new_segment()
+        for record in records:
+            if segment.lowest is None:
+                pass  # Loaded from disk; bound_blocks will read this record too
+            elif segment.count % self.index_every == 0:
+                segment.lowest.append(timestamp_us)
+                segment.highest.append(timestamp_us)
+            else:
+                segment.lowest[-1] = min(segment.lowest[-1], timestamp_us)
+                segment.highest[-1] = max(segment.highest[-1], timestamp_us)
+            segment.count += 1
+        if segment.data is not None:
+            segment.data += b"".join(records)
+        else:
+            if self.file is None:
+                self.file = open(segment.path, "ab")
+            self.file.write(b"".join(records))
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def records(self, segment_index=0, position=0):
+        """Yield records from a (segment index, record position) to the end of the log
+
+        DETAIL continuations are folded into the record they belong to; ones
+        whose parent record lies before the starting position are skipped.
+        """
+        self.flush()
+        for segment in self.segments[segment_index:]:
+            yield from self.read_records(segment, position, segment.count)
+            position = 0
+
+    def read_records(self, segment, position, stop):
+        """Records of one segment that start at position to stop - 1, continuations folded in"""
+        size = self.RECORD.size
+        pending = None
+        while position < segment.count:
+            end = min(position + self.index_every, segment.count)
+            raw = segment.read(position, end)
+            for offset, (ts, op, member_id, fine, isbn) in enumerate(self.RECORD.iter_unpack(raw)):
+                if op == TransactionOp.DETAIL:
+                    if pending is not None:
+                        pending[1].append(self.DETAIL.unpack_from(raw, offset * size)[2].rstrip(b"\0"))
+                    continue
+                if pending is not None:
+                    yield self.finish(*pending)
+                    pending = None
+                if position + offset >= stop:
+                    return
+                pending = (TransactionRecord(ts, TransactionOp(op), member_id, isbn.rstrip(b"\0").decode(), fine), [])
+            position = end
+        if pending is not None:
+            yield self.finish(*pending)
+
+    @staticmethod
+    def finish(record, chunks):
+        return record._replace(details=b"".join(chunks).decode()) if chunks else record
+
+    def between(self, start_us, end_us):
+        """Records with start_us <= timestamp < end_us in log order
+
+        Only the blocks whose timestamp range overlaps are read, so a record
+        logged out of time order is found wherever it sits.
+        """
+        self.flush()
+        results = []
+        for segment in self.segments:
+            if segment.lowest is None:
+                self.bound_blocks(segment)
+            if not segment.lowest or min(segment.lowest) >= end_us or max(segment.highest) < start_us:
+                continue
+            blocks = [block for block, (lowest, highest) in enumerate(zip(segment.lowest, segment.highest))
+                      if lowest < end_us and highest >= start_us]
+            if not blocks:
+                continue
+            # A record and its continuations share a timestamp, so the blocks they span all overlap
+            for record in self.read_records(segment, blocks[0] * self.index_every,
+                                            (blocks[-1] + 1) * self.index_every):
+                if start_us <= record.timestamp_us < end_us:
+                    results.append(record)
+        return results
+
+    def recent(self, count):
+        """The last count records, oldest first"""
+        if count <= 0:
+            return []
+        self.flush()
+        # Walk back block by block until enough non-continuation records lie ahead
+        found = 0
+        for segment_index in range(len(self.segments) - 1, -1, -1):
+            segment = self.segments[segment_index]
+            stop = segment.count
+            while stop > 0:
+                start = max(0, stop - self.index_every)
+                found += sum(1 for record in self.RECORD.iter_unpack(segment.read(start, stop))
+                             if record[1] != TransactionOp.DETAIL)
+                if found >= count:
+                    return list(self.records(segment_index, start))[-count:]
+                stop = start
+        return list(self.records())[-count:]
+
+    def tail_position(self):
+        """(segment number, record position) just past the last record"""
+        if not self.segments:
+            return (0, 0)
+        return (self.segments[-1].number, self.segments[-1].count)
+
+    def records_since(self, position):
+        """Records appended after a position returned by tail_position
+
+        Raises ValueError if some of them were in a segment max_segments dropped.
+        """
+        number, count = position
+        for segment_index, segment in enumerate(self.segments):
+            if segment.number == number:
+                return self.records(segment_index, count)
+            if segment.number > number:
+                # Segments are numbered from 1, so (0, 0), the start of the log, needs segment 1
+                if segment_index == 0 and max(number, 1) < segment.number:
+                    raise ValueError(f"Log segment {max(number, 1)} is no longer available")
+                return self.records(segment_index, 0)
+        if self.segments and number > self.segments[-1].number:
+            raise ValueError(f"Log position {position} is ahead of the log")
+        return iter(())
+
+    def __len__(self):
+        """Number of stored fixed-width records, continuations included"""
+        return sum(segment.count for segment in self.segments)
+
+    def __iter__(self):
+        return self.records()
 
 
 class Library:
     """Main library system that manages books and members"""
 
-    def __init__(self, name, address):
+    def __init__(self, name, address, log_directory=None, clock=None, log_segment_bytes=LOG_SEGMENT_BYTES,
+                 max_log_segments=None):
         self.name = name
         self.address = address
+        self.clock = clock or SystemClock()  # Every "now" the library uses comes from here
         self.books = {}  # {isbn: Book}
         self.members = {}  # {member_id: Member}
-        self.transaction_log = []
+        self.members_by_email = {}  # {normalized email: member_id}
+        self.members_by_phone = {}  # {normalized phone: member_id}
+        self.unindexed_contacts = []  # (member_ids, emails, phones) columns restored from a snapshot
+        self.member_names = PrefixIndex()
+        # Capped by max_log_segments; uncapped, an in-memory log (no log_directory) grows without bound
+        self.transaction_log = TransactionLog(log_directory, log_segment_bytes, max_segments=max_log_segments)
+        self.restoring = False  # True while replaying the log, so replayed changes are not logged again
+        self.title_index = TextIndex()
+        self.author_index = TextIndex()
+        self.books_by_genre = {}  # {BookGenre: {isbn: Book}}
+        self.books_by_year = {}  # {publication_year: {isbn: Book}}
+        self.years = []  # Sorted publication years present in books_by_year
+        self.available = {}  # {isbn: Book} for books with at least one copy on the shelf
+        self.due_dates = DueDateIndex()
+        self.loan_table = LoanTable()  # Open loans as arrays, for library_fines.FineEngine
+        self.popularity = PopularityTracker()
+        self.recommender = CoBorrowIndex()
+        self.sorted_views = {}  # {("books" or "members", sort): SortedView}, built on the first page request
+        self.holds = {}  # {isbn: HoldQueue} for titles with members waiting
+        self.hold_expiry = []  # heap of (expires, sequence, isbn, member_id); stale entries are skipped
+        self.hold_sequence = 0
+        self.metrics = None  # LibraryMetrics once library_metrics.instrument() has wrapped this library
+
+        # Running totals so get_library_stats never has to scan books or members
+        self.total_copies = 0
+        self.available_copies = 0
+        self.pending_fines = 0.0
 
     def add_book(self, book):
+        """Catalog and log book; raises ValueError if its ISBN does not fit the log (TransactionLog.ISBN_BYTES)"""
+        self.log_book(book)
+        if self.store_book(book):
+            return f"New book added: '{book.title}'"
+        self.fill_holds(book.isbn)
+        return f"Added {book.total_copies} more copies of '{book.title}'"
+
+    def store_book(self, book):
+        """Add book to the catalog; returns True for a new title, False if copies were merged"""
         if book.isbn in self.books:
             # If book exists, increase copies
-            self.books[book.isbn].total_copies += book.total_copies
-            self.books[book.isbn].available_copies += book.total_copies
-            return f"Added {book.total_copies} more copies of '{book.title}'"
+            existing = self.books[book.isbn]
+            existing.total_copies += book.total_copies
+            existing.available_copies += book.total_copies
+            self.total_copies += book.total_copies
+            self.on_copies_changed(existing, book.total_copies)
+            return False
         else:
             self.books[book.isbn] = book
-            return f"New book added: '{book.title}'"
+            book.library = self
+            self.total_copies += book.total_copies
+            self.available_copies += book.available_copies
+            self.index_book(book)
+            self.add_to_views("books", book.isbn, book)
+            return True
+
+    def restore_books(self, books):
+        """store_book for a restored catalog, with the indexes filled in one pass; needs an empty catalog"""
+        if self.books:
+            raise ValueError("restore_books needs an empty catalog")
+        books = list(books)
+        isbns = [book.isbn for book in books]
+        self.books.update(zip(isbns, books))
+        if len(self.books) != len(books):
+            raise ValueError("Duplicate ISBN in restored books")
+        self.title_index.add_many(isbns, [book.title for book in books])
+        self.author_index.add_many(isbns, [book.author for book in books])
+        by_genre, by_year, available = self.books_by_genre, self.books_by_year, self.available
+        self.total_copies += sum(book.total_copies for book in books)
+        self.available_copies += sum(book.available_copies for book in books)
+        for book in books:
+            book.library = self
+            by_genre.setdefault(book.genre, {})[book.isbn] = book
+            year = by_year.get(book.publication_year)
+            if year is None:
+                year = by_year[book.publication_year] = {}
+            year[book.isbn] = book
+            if book.available_copies > 0:
+                available[book.isbn] = book
+        self.years[:] = sorted(by_year)
+        if self.sorted_views:
+            for book in books:
+                self.add_to_views("books", book.isbn, book)
+
+    def add_books(self, books):
+        """Bulk version of add_book without per-book messages; returns (new_titles, merged)"""
+        new_titles = merged = 0
+        for book in books:
+            self.log_book(book)
+            if self.store_book(book):
+                new_titles += 1
+            else:
+                merged += 1
+                self.fill_holds(book.isbn)
+        return new_titles, merged
+
+    def index_book(self, book):
+        self.title_index.add(book.isbn, book.title)
+        self.author_index.add(book.isbn, book.author)
+        self.books_by_genre.setdefault(book.genre, {})[book.isbn] = book
+        if book.publication_year not in self.books_by_year:
+            self.books_by_year[book.publication_year] = {}
+            bisect.insort(self.years, book.publication_year)
+        self.books_by_year[book.publication_year][book.isbn] = book
+        if book.is_available():
+            self.available[book.isbn] = book
+
+    def on_copies_changed(self, book, delta):
+        """Called whenever available_copies of a catalogued book changes by delta"""
+        self.available_copies += delta
+        if book.is_available():
+            self.available[book.isbn] = book
+        else:
+            self.available.pop(book.isbn, None)
 
     def register_member(self, member):
-        self.members[member.member_id] = member
-        self.log_transaction(f"New member registered: {member.name} (ID: {member.member_id})")
+        """Add and log a new member; raises ValueError if the email or phone is already registered"""
+        problem = self.claim_contacts(member)
+        if problem:
+            raise ValueError(problem)
+        self.store_member(member)
+        self.log_transaction(TransactionOp.REGISTER, member.member_id, details=json.dumps({
+            "name": member.name, "email": member.email, "phone": member.phone,
+            "type": member.membership_type, "registered": member.registration_date.timestamp()}))
         return member.member_id
 
+    def store_member(self, member):
+        """Add member to the roster without logging a registration"""
+        if member.registration_date is None:
+            member.registration_date = self.clock.now()
+        if member.member_id in self.members:
+            self.pending_fines -= self.members[member.member_id].fines
+            # A replaced member may sort elsewhere now; rebuild the member views on next use
+            for view in [view for view in self.sorted_views if view[0] == "members"]:
+                del self.sorted_views[view]
+        else:
+            self.member_names.add(member.member_id, member.name)
+            self.add_to_views("members", member.member_id, member)
+        self.index_contacts(member)
+        self.members[member.member_id] = member
+        member.library = self
+        self.pending_fines += member.fines
+        for isbn, borrow_date in member.borrowed_books.items():
+            self.on_loan_started(member, isbn, borrow_date)
+
+    def claim_contacts(self, member):
+        """Reserve member's email and phone, or return why not (they belong to another member)"""
+        if self.unindexed_contacts:
+            self.index_restored_contacts()
+        email, phone = normalize_email(member.email), normalize_phone(member.phone)
+        owner = self.members_by_email.get(email) if email else None
+        if owner is not None and owner != member.member_id:
+            return f"Email {member.email.strip()} is already registered to member {owner}"
+        owner = self.members_by_phone.get(phone) if phone else None
+        if owner is not None and owner != member.member_id:
+            return f"Phone {member.phone.strip()} is already registered to member {owner}"
+        self.index_contacts(member)
+        return None
+
+    def index_contacts(self, member):
+        # Restored rosters are indexed as they are: if they hold duplicates, the first member keeps the key
+        email, phone = normalize_email(member.email), normalize_phone(member.phone)
+        if email:
+            self.members_by_email.setdefault(email, member.member_id)
+        if phone:
+            self.members_by_phone.setdefault(phone, member.member_id)
+
+    def index_restored_contacts(self):
+        """Index the contact columns a snapshot restore left behind (see library_snapshot)"""
+        indexes = []
+        for normalize, contacts, registered in ((normalize_email, 1, self.members_by_email),
+                                                (normalize_phone, 2, self.members_by_phone)):
+            index = {}
+            for columns in reversed(self.unindexed_contacts):
+                # Filled from the back, so the first member with a contact keeps it (as index_contacts does)
+                index.update(zip(reversed(list(map(normalize, columns[contacts]))), reversed(columns[0])))
+            index.pop("", None)
+            # Members registered since the restore come after the restored ones
+            for contact, member_id in registered.items():
+                index.setdefault(contact, member_id)
+            indexes.append(index)
+        self.members_by_email, self.members_by_phone = indexes
+        self.unindexed_contacts = []
+
+    def find_member_by_email(self, email):
+        if self.unindexed_contacts:
+            self.index_restored_contacts()
+        member_id = self.members_by_email.get(normalize_email(email))
+        return self.members.get(member_id)
+
+    def find_member_by_phone(self, phone):
+        if self.unindexed_contacts:
+            self.index_restored_contacts()
+        member_id = self.members_by_phone.get(normalize_phone(phone))
+        return self.members.get(member_id)
+
+    def find_members_by_name(self, prefix, limit=20):
+        """Members with a name word starting with each word of prefix ("bob sm" finds Bob Smith)"""
+        return [self.members[member_id] for member_id in self.member_names.search(prefix, limit)]
+
     def find_book_by_title(self, title):
-        results = []
-        for book in self.books.values():
-            if title.lower() in book.title.lower():
-                results.append(book)
-        return results
+        return [self.books[isbn] for isbn in self.title_index.search(title)]
 
     def find_books_by_author(self, author):
-        results = []
-        for book in self.books.values():
-            if author.lower() in book.author.lower():
-                results.append(book)
-        return results
+        return [self.books[isbn] for isbn in self.author_index.search(author)]
 
     def find_books_by_genre(self, genre):
+        return list(self.books_by_genre.get(genre, {}).values())
+
+    def fuzzy_matches(self, query, limit=10):
+        """(score, isbn) for the best typo-tolerant title or author matches, best first"""
+        best = {}
+        for index in (self.title_index, self.author_index):
+            for score, isbn in index.fuzzy(query, limit):
+                if score > best.get(isbn, 0.0):
+                    best[isbn] = score
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(score, isbn) for isbn, score in ranked]
+
+    def search_fuzzy(self, query, limit=10):
+        """Titles and authors close to query even with typos ("Orwel", "Mockingbrd"), best first"""
+        return [self.books[isbn] for _, isbn in self.fuzzy_matches(query, limit)]
+
+    def year_buckets(self, start_year, end_year):
+        lo = bisect.bisect_left(self.years, start_year)
+        hi = bisect.bisect_right(self.years, end_year)
+        return [self.books_by_year[year] for year in self.years[lo:hi]]
+
+    def find_books_by_year(self, start_year, end_year):
+        """Books published between start_year and end_year inclusive, oldest first"""
+        return [book for bucket in self.year_buckets(start_year, end_year) for book in bucket.values()]
+
+    def find_available_books(self):
+        return list(self.available.values())
+
+    def find_books(self, genre=None, start_year=None, end_year=None, available_only=False):
+        """Combined genre / year range / availability query
+
+        Walks whichever index is smallest and checks the other filters per book,
+        so the cost follows the most selective filter rather than the catalog size.
+        """
+        sources = []
+        if genre is not None:
+            genre_books = self.books_by_genre.get(genre, {})
+            sources.append((len(genre_books), [genre_books]))
+        if start_year is not None or end_year is not None:
+            start = start_year if start_year is not None else float("-inf")
+            end = end_year if end_year is not None else float("inf")
+            buckets = self.year_buckets(start, end)
+            sources.append((sum(len(bucket) for bucket in buckets), buckets))
+        if available_only:
+            sources.append((len(self.available), [self.available]))
+        if not sources:
+            return list(self.books.values())
+
+        _, buckets = min(sources, key=lambda source: source[0])
         results = []
-        for book in self.books.values():
-            if book.genre == genre:
+        for bucket in buckets:
+            for book in bucket.values():
+                if genre is not None and book.genre != genre:
+                    continue
+                if start_year is not None and book.publication_year < start_year:
+                    continue
+                if end_year is not None and book.publication_year > end_year:
+                    continue
+                if available_only and not book.is_available():
+                    continue
                 results.append(book)
         return results
 
-    def borrow_book(self, member_id, isbn):
+    def borrow_book(self, member_id, isbn, now=None):
         if member_id not in self.members:
             return False, "Member not found"
         if isbn not in self.books:
@@ -1015,13 +1915,15 @@ class Library:
 
         member = self.members[member_id]
         book = self.books[isbn]
+        now = now or self.clock.now()
 
-        success, message = member.borrow_book(book)
+        success, message = member.borrow_book(book, now)
         if success:
-            self.log_transaction(f"Member {member.name} borrowed '{book.title}'")
+            self.on_borrowed(isbn, now)
+            self.log_transaction(TransactionOp.BORROW, member_id, isbn, now=now)
         return success, message
 
-    def return_book(self, member_id, isbn):
+    def return_book(self, member_id, isbn, now=None):
         if member_id not in self.members:
             return False, "Member not found", 0
         if isbn not in self.books:
@@ -1029,19 +1931,425 @@ class Library:
 
         member = self.members[member_id]
         book = self.books[isbn]
+        now = now or self.clock.now()
 
-        success, message, fine = member.return_book(book)
+        success, message, fine = member.return_book(book, now)
         if success:
-            self.log_transaction(f"Member {member.name} returned '{book.title}'. Fine: ${fine:.2f}")
+            self.log_transaction(TransactionOp.RETURN, member_id, isbn, fine, now=now)
+            self.fill_holds(isbn, now)
         return success, message, fine
 
-    def log_transaction(self, message):
-        self.transaction_log.append({
-            "timestamp": datetime.now(),
-            "message": message
-        })
+    def pay_fine(self, member_id, amount):
+        if member_id not in self.members:
+            return False, "Member not found"
+        return self.members[member_id].pay_fine(amount)
+
+    def borrow_many(self, member_id, isbns, atomic=False, now=None):
+        """Borrow a basket of books with one member check and one log record
+
+        Returns (all_borrowed, results) with one (isbn, success, message) per
+        item. With atomic=True the whole basket is checked first and nothing
+        is borrowed unless every item would succeed.
+        """
+        member = self.members.get(member_id)
+        if member is None:
+            return False, [(isbn, False, "Member not found") for isbn in isbns]
+        now = now or self.clock.now()
+
+        if atomic:
+            problems = self.basket_problems(member, isbns)
+            if problems:
+                return False, [(isbn, False, problems.get(position, "Not borrowed: basket rejected"))
+                               for position, isbn in enumerate(isbns)]
+
+        results = []
+        borrowed = []
+        for isbn in isbns:
+            book = self.books.get(isbn)
+            if book is None:
+                results.append((isbn, False, "Book not found"))
+                continue
+            success, message = member.borrow_book(book, now)
+            results.append((isbn, success, message))
+            if success:
+                borrowed.append(isbn)
+                self.on_borrowed(isbn, now)
+        if borrowed:
+            self.log_transaction(TransactionOp.BORROW_BATCH, member_id, details=json.dumps(borrowed), now=now)
+        return len(borrowed) == len(isbns), results
+
+    def basket_problems(self, member, isbns):
+        """Dry run of borrowing isbns in order; returns {position: failure message}"""
+        problems = {}
+        on_shelf = self.copies_on_shelf(isbns)
+        loans = len(member.borrowed_books)
+        borrowed = set(member.borrowed_books)
+        for position, isbn in enumerate(isbns):
+            if isbn not in on_shelf:
+                problems[position] = "Book not found"
+            elif loans >= member.max_books or member.fines != 0:
+                problems[position] = "Cannot borrow: Limit reached or fines pending"
+            elif isbn in borrowed:
+                problems[position] = "You already have this book"
+            elif on_shelf[isbn] <= 0:
+                problems[position] = "Book not available"
+            else:
+                borrowed.add(isbn)
+                loans += 1
+        return problems
+
+    def copies_on_shelf(self, isbns):
+        """{isbn: available copies} for the catalogued books among isbns"""
+        return {isbn: self.books[isbn].available_copies for isbn in isbns if isbn in self.books}
+
+    def return_many(self, member_id, isbns, now=None):
+        """Return a basket of books with one member check and one log record
+
+        Returns (total_fine, results) with one (isbn, success, message, fine) per item.
+        """
+        member = self.members.get(member_id)
+        if member is None:
+            return 0, [(isbn, False, "Member not found", 0) for isbn in isbns]
+        now = now or self.clock.now()
 
-    def get_library_stats(self):
+        results = []
+        returned = []
+        total_fine = 0
+        for isbn in isbns:
+            book = self.books.get(isbn)
+            if book is None:
+                results.append((isbn, False, "Book not found", 0))
+                continue
+            success, message, fine = member.return_book(book, now)
+            results.append((isbn, success, message, fine))
+            if success:
+                returned.append(isbn)
+                total_fine += fine
+        if returned:
+            self.log_transaction(TransactionOp.RETURN_BATCH, member_id, fine=total_fine,
+                                 details=json.dumps(returned), now=now)
+        for isbn in returned:
+            self.fill_holds(isbn, now)
+        return total_fine, results
+
+    def place_hold(self, member_id, isbn, now=None, days=HOLD_DAYS):
+        """Join the queue for a title with no copy on the shelf; the hold lapses after days
+
+        Returns (success, message). When a copy comes back it is lent straight
+        to the first eligible holder, Premium members first.
+        """
+        member = self.members.get(member_id)
+        if member is None:
+            return False, "Member not found"
+        on_shelf = self.copies_on_shelf([isbn])
+        if isbn not in on_shelf:
+            return False, "Book not found"
+        if isbn in member.borrowed_books:
+            return False, "You already have this book"
+        now = now or self.clock.now()
+        self.expire_holds(now)
+        if member_id in self.holds.get(isbn, ()):
+            return False, "Hold already placed"
+        if on_shelf[isbn] > 0:
+            return False, "Book is available; borrow it instead"
+
+        position = self.add_hold(member, isbn, now + timedelta(days=days))
+        self.log_transaction(TransactionOp.HOLD, member_id, isbn, details=json.dumps({"days": days}), now=now)
+        return True, f"Hold placed: number {position} in the queue"
+
+    def add_hold(self, member, isbn, expires):
+        """Queue a hold without checks or logging; returns its position"""
+        queue = self.holds.get(isbn)
+        if queue is None:
+            queue = self.holds[isbn] = HoldQueue()
+        queue.add(member.member_id, Member.HOLD_PRIORITY[member.membership_type], expires)
+        self.hold_sequence += 1
+        heapq.heappush(self.hold_expiry, (expires, self.hold_sequence, isbn, member.member_id))
+        return queue.position(member.member_id)
+
+    def remove_hold(self, member_id, isbn):
+        """Take a hold off its queue; returns False if there was none"""
+        queue = self.holds.get(isbn)
+        if queue is None or member_id not in queue:
+            return False
+        queue.remove(member_id)
+        if not queue:
+            del self.holds[isbn]
+        return True
+
+    def cancel_hold(self, member_id, isbn, now=None):
+        if not self.remove_hold(member_id, isbn):
+            return False, "No hold on this book"
+        self.log_transaction(TransactionOp.CANCEL_HOLD, member_id, isbn, now=now)
+        return True, "Hold cancelled"
+
+    def hold_position(self, member_id, isbn, as_of=None):
+        """1-based place in the hold queue for isbn, or None without a live hold"""
+        self.expire_holds(as_of)
+        queue = self.holds.get(isbn)
+        return queue.position(member_id) if queue is not None else None
+
+    def expire_holds(self, as_of=None):
+        """Drop holds that lapsed by as_of (default now); returns them as (member_id, isbn)
+
+        Lapsing follows from the HOLD records' timestamps, so it is not logged.
+        """
+        as_of = as_of or self.clock.now()
+        heap = self.hold_expiry
+        lapsed = []
+        while heap and heap[0][0] <= as_of:
+            expires, _, isbn, member_id = heapq.heappop(heap)
+            queue = self.holds.get(isbn)
+            # A cancelled hold, or one placed again later, leaves a stale entry behind
+            if queue is not None and queue.expires(member_id) == expires:
+                self.remove_hold(member_id, isbn)
+                lapsed.append((member_id, isbn))
+        return lapsed
+
+    def next_holder(self, isbn, as_of):
+        """The first live holder of isbn who can borrow right now, or None"""
+        self.expire_holds(as_of)
+        queue = self.holds.get(isbn)
+        if queue is None:
+            return None
+        return queue.first(lambda member_id: self.members[member_id].can_borrow())
+
+    def hand_off(self, member_id, isbn, now):
+        """Lend isbn to a holder picked by next_holder; success is None if their hold went away meanwhile
+
+        ConcurrentLibrary runs the check and the borrow under the holder's
+        stripe, so a walk-in borrow of the same title cannot slip in between.
+        """
+        if member_id not in self.holds.get(isbn, ()):
+            return None, "Hold no longer open"
+        return self.borrow_book(member_id, isbn, now)
+
+    def fill_holds(self, isbn, now=None):
+        """Lend copies of isbn on the shelf to its first eligible holders; returns their member IDs
+
+        Holders at their loan limit or with fines are skipped but keep their
+        place. Each hand-off is an ordinary logged borrow, so replaying the log
+        repeats it without filling holds again.
+        """
+        if self.restoring or not self.holds.get(isbn):
+            return []
+        now = now or self.clock.now()
+        filled = []
+        stale = None
+        while self.copies_on_shelf([isbn]).get(isbn, 0) > 0:
+            member_id = self.next_holder(isbn, now)
+            if member_id is None:
+                break
+            success, _ = self.hand_off(member_id, isbn, now)  # on_loan_started takes the hold off
+            if success is None and member_id != stale:
+                stale = member_id
+                continue  # They borrowed the title or cancelled since next_holder; offer the copy on
+            if not success:
+                break  # Another borrower took the copy first; the hold keeps its place
+            filled.append(member_id)
+        return filled
+
+    def log_transaction(self, op, member_id, isbn="", fine=0.0, details=None, now=None):
+        if self.restoring:
+            return
+        timestamp_us = to_epoch_us(now or self.clock.now())
+        self.transaction_log.append(op, member_id, isbn, fine, timestamp_us, details)
+
+    def flush(self):
+        """Push buffered transaction log records to disk"""
+        self.transaction_log.flush()
+
+    def log_book(self, book):
+        self.log_transaction(TransactionOp.ADD_BOOK, 0, book.isbn, details=json.dumps({
+            "title": book.title, "author": book.author, "genre": book.genre.name,
+            "year": book.publication_year, "copies": book.total_copies}))
+
+    def apply_transaction(self, record):
+        """Replay one TransactionLog record against this library without re-logging it"""
+        now = from_epoch_us(record.timestamp_us)
+        self.restoring = True
+        try:
+            if record.op == TransactionOp.ADD_BOOK:
+                info = json.loads(record.details)
+                self.store_book(Book(record.isbn, info["title"], info["author"], BookGenre[info["genre"]],
+                                     info["year"], info["copies"]))
+            elif record.op == TransactionOp.REGISTER:
+                info = json.loads(record.details)
+                member = Member(info["name"], info["email"], info["phone"], info["type"],
+                                member_id=record.member_id,
+                                registration_date=datetime.fromtimestamp(info["registered"]))
+                self.store_member(member)
+            elif record.op == TransactionOp.BORROW:
+                self.borrow_book(record.member_id, record.isbn, now)
+            elif record.op == TransactionOp.RETURN:
+                self.return_book(record.member_id, record.isbn, now)
+            elif record.op == TransactionOp.PAY_FINE:
+                self.members[record.member_id].pay_fine(record.fine)
+            elif record.op == TransactionOp.BORROW_BATCH:
+                self.borrow_many(record.member_id, json.loads(record.details), now=now)
+            elif record.op == TransactionOp.RETURN_BATCH:
+                self.return_many(record.member_id, json.loads(record.details), now=now)
+            elif record.op == TransactionOp.HOLD:
+                self.place_hold(record.member_id, record.isbn, now, json.loads(record.details)["days"])
+            elif record.op == TransactionOp.CANCEL_HOLD:
+                self.cancel_hold(record.member_id, record.isbn, now)
+        finally:
+            self.restoring = False
+
+    def describe_transaction(self, record):
+        """Render a TransactionLog record as the human-readable log line"""
+        member = self.members.get(record.member_id)
+        name = member.name if member is not None else f"#{record.member_id}"
+        book = self.books.get(record.isbn)
+        title = book.title if book is not None else record.isbn
+        if record.op == TransactionOp.REGISTER:
+            message = f"New member registered: {name} (ID: {record.member_id})"
+        elif record.op == TransactionOp.BORROW:
+            message = f"Member {name} borrowed '{title}'"
+        elif record.op == TransactionOp.ADD_BOOK:
+            message = f"Added copies of '{title}'"
+        elif record.op == TransactionOp.PAY_FINE:
+            message = f"Member {name} paid ${record.fine:.2f} in fines"
+        elif record.op == TransactionOp.BORROW_BATCH:
+            message = f"Member {name} borrowed {len(json.loads(record.details))} books"
+        elif record.op == TransactionOp.RETURN_BATCH:
+            message = f"Member {name} returned {len(json.loads(record.details))} books. Fine: ${record.fine:.2f}"
+        elif record.op == TransactionOp.HOLD:
+            message = f"Member {name} placed a hold on '{title}'"
+        elif record.op == TransactionOp.CANCEL_HOLD:
+            message = f"Member {name} cancelled their hold on '{title}'"
+        else:
+            message = f"Member {name} returned '{title}'. Fine: ${record.fine:.2f}"
+        return {"timestamp": from_epoch_us(record.timestamp_us), "message": message}
+
+    def recent_transactions(self, count=5):
+        return [self.describe_transaction(record) for record in self.transaction_log.recent(count)]
+
+    def transactions_between(self, start, end):
+        """Log entries with start <= timestamp < end (datetimes), rendered for display"""
+        records = self.transaction_log.between(to_epoch_us(start), to_epoch_us(end))
+        return [self.describe_transaction(record) for record in records]
+
+    def on_borrowed(self, isbn, when):
+        """Called once per successful borrow, including replayed ones"""
+        self.popularity.record(isbn, when)
+
+    def top_borrowed(self, k=10, window=None):
+        """The k most borrowed books as (Book, borrows), busiest first
+
+        window is None for all-time counts (exact) or "hour", "day" or "week"
+        for the sliding windows ending now (approximate, see SlidingTopK).
+        """
+        top = self.popularity.top(k, window, self.clock.now())
+        return list(zip(self.lookup_books(isbn for isbn, _ in top), (borrows for _, borrows in top)))
+
+    def archive_history(self, directory, before):
+        """Page history entries returned before the day of `before` out to a new file in directory
+
+        Returns how many entries moved. They stay part of each member's
+        borrowing_history and are read back from disk when it is iterated.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"history-{to_epoch_us(datetime.now())}.jsonl")
+        before_day = before.toordinal() - EPOCH_ORDINAL
+        moved = 0
+        with open(path, "ab") as archive:
+            for member in list(self.members.values()):
+                moved += self.archive_member_history(member, archive, path, before_day)
+        if not moved:
+            os.remove(path)
+        return moved
+
+    def archive_member_history(self, member, archive, path, before_day):
+        return member.borrowing_history.archive(archive, path, before_day)
+
+    def lookup_books(self, isbns):
+        return [self.books[isbn] for isbn in isbns]
+
+    def recommendations(self):
+        """The CoBorrowIndex, built from every member's borrowing history on first use"""
+        if not self.recommender.built:
+            # Archived history stays on disk; entries from before ISBNs were kept cannot be paired
+            self.recommender.build((member_id, member.borrowing_history.recent_isbns())
+                                   for member_id, member in self.members.items())
+        return self.recommender
+
+    def recommend(self, isbn, k=5):
+        """Books most often borrowed by the members who also borrowed isbn"""
+        return self.lookup_books(other for _, other in self.recommendations().similar(isbn, k))
+
+    def recommend_for_member(self, member_id, k=5):
+        """Books borrowed alongside the member's recent titles that they have not borrowed yet"""
+        if member_id not in self.members:
+            return []
+        on_loan = self.members[member_id].borrowed_books
+        return self.lookup_books(isbn for _, isbn in self.recommendations().for_member(member_id, k, on_loan))
+
+    def on_loan_started(self, member, isbn, borrow_date):
+        self.due_dates.add(member.member_id, isbn, borrow_date, member.borrow_duration)
+        self.loan_table.add(member.member_id, isbn, wall_us(borrow_date) + member.borrow_duration * DAY_US,
+                            Member.MEMBERSHIP_CODES[member.membership_type])
+        queue = self.holds.get(isbn)
+        if queue and member.member_id in queue:
+            self.remove_hold(member.member_id, isbn)  # Handed off or borrowed off the shelf: no longer waiting
+
+    def on_loan_ended(self, member, isbn):
+        self.due_dates.remove(member.member_id, isbn)
+        self.loan_table.remove(member.member_id, isbn)
+        self.recommender.add(member.member_id, isbn)
+
+    def overdue_report(self, entries, as_of):
+        return [{"member_id": member_id,
+                 "isbn": isbn,
+                 "due_date": overdue_at - timedelta(days=1),
+                 "days_overdue": (as_of - overdue_at).days + 1}
+                for overdue_at, member_id, isbn in entries]
+
+    def overdue_loans(self, as_of=None):
+        """Every loan accruing a fine at as_of (default now), most overdue first"""
+        as_of = as_of or self.clock.now()
+        return self.overdue_report(self.due_dates.overdue_at(as_of), as_of)
+
+    def newly_overdue_loans(self, as_of=None):
+        """Loans that started accruing fines since the previous call"""
+        as_of = as_of or self.clock.now()
+        return self.overdue_report(self.due_dates.newly_overdue(as_of), as_of)
+
+    def open_loans(self):
+        """Copies of the LoanTable columns (members, due_us, types, isbns), safe to scan while loans change"""
+        table = self.loan_table
+        return table.members[:], table.due_us[:], table.types[:], table.isbns[:]
+
+    def on_fines_changed(self, member, delta):
+        """Called whenever a registered member's fines change by delta"""
+        self.pending_fines += delta
+        if delta < 0:
+            self.log_transaction(TransactionOp.PAY_FINE, member.member_id, fine=-delta)
+
+    def get_library_stats(self, verify=False):
+        """Constant-time stats from the running totals
+
+        With verify=True the totals are also checked against a full recompute
+        and a RuntimeError is raised if they have drifted.
+        """
+        stats = {
+            "total_books": self.total_copies,
+            "unique_titles": len(self.books),
+            "available_books": self.available_copies,
+            "borrowed_books": self.total_copies - self.available_copies,
+            "total_members": len(self.members),
+            "total_fines_pending": self.pending_fines
+        }
+        if verify:
+            expected = self.recompute_stats()
+            drift = {key: (stats[key], value) for key, value in expected.items()
+                     if abs(stats[key] - value) > 1e-6}
+            if drift:
+                raise RuntimeError(f"Library stats out of sync (counter, recomputed): {drift}")
+        return stats
+
+    def recompute_stats(self):
+        """Full-scan version of get_library_stats, used to verify the running totals"""
         total_books = sum(book.total_copies for book in self.books.values())
         available_books = sum(book.available_copies for book in self.books.values())
         borrowed_books = total_books - available_books
@@ -1067,15 +2375,93 @@ class Library:
         print(f"Total Fines Pending: ${stats['total_fines_pending']:.2f}")
         print(f"{'='*60}\n")
 
-    def display_all_books(self):
+    # Paging and bulk rendering
+
+    def add_to_views(self, kind, ident, record):
+        for (view_kind, _), view in self.sorted_views.items():
+            if view_kind == kind:
+                view.add(ident, record)
+
+    def view(self, kind, sort):
+        view = self.sorted_views.get((kind, sort))
+        if view is None:
+            sorts = BOOK_SORTS if kind == "books" else MEMBER_SORTS
+            if sort not in sorts:
+                raise ValueError(f"Unknown sort {sort!r}; expected one of {', '.join(sorts)}")
+            records = self.books if kind == "books" else self.members
+            view = self.sorted_views[kind, sort] = SortedView(sorts[sort], records.items())
+        return view
+
+    def page_books(self, sort="isbn", after=None, limit=50):
+        """Up to limit books in sort order after the cursor `after`; returns (books, cursor of the next page)
+
+        The cursor is None on the last page. Sorts are the keys of BOOK_SORTS.
+        """
+        entries = self.view("books", sort).page(after, limit)
+        cursor = list(entries[-1]) if len(entries) == limit else None
+        return self.lookup_books(isbn for _, isbn in entries), cursor
+
+    def page_members(self, sort="member_id", after=None, limit=50):
+        """Up to limit members in sort order after the cursor `after`; returns (members, next cursor)"""
+        entries = self.view("members", sort).page(after, limit)
+        cursor = list(entries[-1]) if len(entries) == limit else None
+        return [self.members[member_id] for _, member_id in entries], cursor
+
+    def iter_books(self, sort="isbn", after=None, page_size=1000):
+        """Every book after the cursor in sort order, fetched a page at a time"""
+        while True:
+            books, after = self.page_books(sort, after, page_size)
+            yield from books
+            if after is None:
+                return
+
+    def iter_members(self, sort="member_id", after=None, page_size=1000):
+        while True:
+            members, after = self.page_members(sort, after, page_size)
+            yield from members
+            if after is None:
+                return
+
+    def render(self, kind, sink, format="text", sort=None, after=None, limit=None, page_size=5000):
+        """Write books or members to a file-like sink as text, csv or jsonl, one write() per page
+
+        Returns (rows written, cursor to continue from or None at the end),
+        so a limit and the cursor give paged exports.
+        """
+        if format not in RENDER_FORMATS:
+            raise ValueError(f"Unknown format {format!r}; expected one of {', '.join(RENDER_FORMATS)}")
+        as_of = self.clock.now()  # One clock read for every member's "Member for" days
+        if kind == "books":
+            page, sort, columns = self.page_books, sort or "isbn", BOOK_COLUMNS
+            values, text = book_values, book_text
+        else:
+            page, sort, columns = self.page_members, sort or "member_id", MEMBER_COLUMNS
+            values, text = partial(member_values, as_of=as_of), partial(member_text, as_of=as_of)
+        written = 0
+        while limit is None or written < limit:
+            records, after = page(sort, after, page_size if limit is None else min(page_size, limit - written))
+            if format == "text":
+                sink.write("".join(map(text, records)))
+            else:
+                render_rows(sink, format, columns, map(values, records), format == "csv" and not written)
+            written += len(records)
+            if after is None:
+                break
+        return written, after
+
+    def render_books(self, sink, format="text", sort="isbn", after=None, limit=None):
+        return self.render("books", sink, format, sort, after, limit)
+
+    def render_members(self, sink, format="text", sort="member_id", after=None, limit=None):
+        return self.render("members", sink, format, sort, after, limit)
+
+    def display_all_books(self, sort="isbn"):
         print(f"\n--- All Books in {self.name} ---")
-        for book in self.books.values():
-            print(f"  [{book.isbn}] {book}")
+        self.render_books(sys.stdout, "text", sort)
 
-    def display_all_members(self):
+    def display_all_members(self, sort="member_id"):
         print(f"\n--- All Members of {self.name} ---")
-        for member in self.members.values():
-            print(f"\n{member}")
+        self.render_members(sys.stdout, "text", sort)
 
     def __str__(self):
         return f"{self.name} Library\nLocation: {self.address}"
@@ -1090,8 +2476,9 @@ if __name__ == "__main__":
     print("COMPLEX LIBRARY MANAGEMENT SYSTEM")
     print("="*70)
 
-    # Create Library
-    library = Library("City Central Library", "123 Main Street, Downtown")
+    # Create Library on a simulated clock, so the demo can skip ahead in time
+    clock = SimulatedClock(datetime.now())
+    library = Library("City Central Library", "123 Main Street, Downtown", clock=clock)
     print(f"\n{library}\n")
 
     # Create complex book objects
@@ -1128,6 +2515,15 @@ if __name__ == "__main__":
     library.register_member(member4)
     print(f"Registered {len(library.members)} members")
 
+    print("\n--- Member lookup at the desk ---")
+    print(f"  Email 'BOB@email.com': {library.find_member_by_email('BOB@email.com').name}")
+    print(f"  Phone '(555) 0103': {library.find_member_by_phone('(555) 0103').name}")
+    print(f"  Name starting 'di': {[member.name for member in library.find_members_by_name('di')]}")
+    try:
+        library.register_member(Member("Robert Smith", " Bob@Email.com", "555-0199"))
+    except ValueError as exc:
+        print(f"  Duplicate registration rejected: {exc}")
+
     # Display initial state
     library.display_all_books()
     library.display_stats()
@@ -1158,6 +2554,16 @@ if __name__ == "__main__":
     success, msg = library.borrow_book(member3.member_id, book3.isbn)
     print(msg)
 
+    # Diana takes the last copy of Dune, so the next readers have to queue for it
+    print(f"\n--- {member4.name} (Regular Member) Borrowing ---")
+    success, msg = library.borrow_book(member4.member_id, book4.isbn)
+    print(msg)
+    success, msg = library.borrow_book(member2.member_id, book4.isbn)
+    print(f"{member2.name}: {msg}")
+    for member in (member2, member3):
+        success, msg = library.place_hold(member.member_id, book4.isbn)
+        print(f"{member.name}: {msg}")
+
     # Display updated stats
     library.display_stats()
 
@@ -1176,6 +2582,11 @@ if __name__ == "__main__":
     for book in results:
         print(f"  Found: {book}")
 
+    print("\n--- Fuzzy search for 'Mockingbrd' and 'Orwel' ---")
+    for query in ("Mockingbrd", "Orwel"):
+        for book in library.search_fuzzy(query, 3):
+            print(f"  {query}: {book}")
+
     print("\n--- All Fiction books ---")
     results = library.find_books_by_genre(BookGenre.FICTION)
     for book in results:
@@ -1186,9 +2597,9 @@ if __name__ == "__main__":
     print("RETURN OPERATIONS")
     print("="*70)
 
-    # Simulate overdue by manipulating borrow date
-    print(f"\n--- Simulating overdue return for {member2.name} ---")
-    member2.borrowed_books[book2.isbn] = datetime.now() - timedelta(days=20)  # 20 days ago
+    # Twenty days pass: Bob's 14-day loan is now overdue, Alice's 30-day loans are not
+    clock.advance(timedelta(days=20))
+    print(f"\n--- Twenty days later: overdue return for {member2.name} ---")
     success, msg, fine = library.return_book(member2.member_id, book2.isbn)
     print(msg)
     if fine > 0:
@@ -1197,6 +2608,18 @@ if __name__ == "__main__":
     print(f"\n--- {member1.name} returning books (on time) ---")
     success, msg, fine = library.return_book(member1.member_id, book1.isbn)
     print(msg)
+    success, msg, fine = library.return_book(member1.member_id, book3.isbn)
+    print(msg)
+
+    # Bob is first in the queue for Dune but now owes a fine, so the returned copy goes to Charlie
+    print(f"\n--- {member1.name} returns '{book4.title}' to the hold queue ---")
+    success, msg, fine = library.return_book(member1.member_id, book4.isbn)
+    print(msg)
+    for member in (member2, member3):
+        if book4.isbn in member.borrowed_books:
+            print(f"  {member.name} now has it on loan")
+        else:
+            print(f"  {member.name}: number {library.hold_position(member.member_id, book4.isbn)} in the queue")
 
     # Display member information
     print("\n" + "="*70)
@@ -1227,11 +2650,19 @@ if __name__ == "__main__":
     # Final stats
     library.display_stats()
 
+    print(f"\n--- Members who read '{book1.title}' also borrowed ---")
+    for book in library.recommend(book1.isbn, 3):
+        print(f"  {book.title}")
+
+    print("\n--- Most borrowed overall ---")
+    for book, borrows in library.top_borrowed(3):
+        print(f"  {borrows} x {book.title}")
+
     # Transaction log
     print("\n" + "="*70)
     print("RECENT TRANSACTIONS")
     print("="*70)
-    for log in library.transaction_log[-5:]:  # Last 5 transactions
+    for log in library.recent_transactions(5):  # Last 5 transactions
         print(f"[{log['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}] {log['message']}")
 
     print("\n" + "="*70)